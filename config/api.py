@@ -1,7 +1,32 @@
 from ninja import NinjaAPI
+from ninja.parser import Parser
 from forms.api import router as forms_router
 
+
+class FormDataAwareParser(Parser):
+    """JSON parser that also accepts multipart/urlencoded bodies.
+
+    Lets schema payloads (e.g. FormUpdatePayload) arrive alongside an uploaded
+    file in a multipart PATCH, which the default JSON-only parser rejects.
+    Django only parses form data for POST, so it is loaded here for other
+    methods, which also populates request.FILES for the view.
+    """
+
+    def parse_body(self, request):
+        if request.content_type not in ("multipart/form-data", "application/x-www-form-urlencoded"):
+            return super().parse_body(request)
+
+        if request.method != "POST":
+            method = request.method
+            request.method = "POST"
+            try:
+                request._load_post_and_files()
+            finally:
+                request.method = method
+        return request.POST.dict()
+
+
 # Single Ninja API instance used for all project endpoints
-api = NinjaAPI()
+api = NinjaAPI(parser=FormDataAwareParser())
 
 api.add_router("/forms", forms_router)
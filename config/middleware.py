@@ -0,0 +1,70 @@
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import has_vary_header, patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+# Brotli is optional; without it responses are gzip-compressed only.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+
+# Media is already compressed; re-compressing it only costs CPU.
+INCOMPRESSIBLE_TYPES = ("image/", "audio/", "video/", "application/zip", "application/gzip")
+
+
+def _compress_br_sequence(sequence):
+    compressor = brotli.Compressor()
+    for chunk in sequence:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _may_carry_secrets(response) -> bool:
+    """True for responses that set cookies or vary by them, i.e. may embed a
+    CSRF token or session data next to reflected input."""
+    return bool(response.cookies) or has_vary_header(response, "Cookie")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that prefers Brotli when the client accepts it and the
+    ``brotli`` package is installed.
+
+    Partial (206) responses and already-compressed media are left alone:
+    compressing a byte range would break its Content-Range. Responses that
+    may carry secrets stay on gzip, whose random-length header filename is
+    Django's BREACH mitigation; Brotli has no equivalent.
+    """
+
+    def process_response(self, request, response):
+        if response.status_code == 206 or response.get("Content-Type", "").startswith(INCOMPRESSIBLE_TYPES):
+            return response
+        accepts_br = brotli is not None and re_accepts_br.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if not accepts_br or getattr(response, "is_async", False) or _may_carry_secrets(response):
+            return super().process_response(request, response)
+
+        if not response.streaming and len(response.content) < 200:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if response.streaming:
+            response.streaming_content = _compress_br_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed_content = brotli.compress(response.content)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
@@ -57,6 +57,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # gzip, or Brotli when the optional `brotli` package is installed
+    'config.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -106,6 +108,27 @@ else:
         }
     }
 
+# SQLite production mode (default on): WAL journal so readers never block the
+# writer, synchronous=NORMAL (durable at checkpoints, no fsync per commit),
+# memory-mapped reads, a busy timeout so writers wait instead of failing, and
+# BEGIN IMMEDIATE so a transaction takes the write lock up front rather than
+# failing when it first writes. Ingest also serializes writes in-process
+# (see forms/writes.py). Set XFORMS_SQLITE_TUNING=false for stock behaviour.
+XFORMS_SQLITE_TUNING = os.environ.get('XFORMS_SQLITE_TUNING', 'true').lower() == 'true'
+XFORMS_SQLITE_BUSY_TIMEOUT = float(os.environ.get('XFORMS_SQLITE_BUSY_TIMEOUT', '20'))
+XFORMS_SQLITE_MMAP_SIZE = int(os.environ.get('XFORMS_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+
+if XFORMS_SQLITE_TUNING and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': XFORMS_SQLITE_BUSY_TIMEOUT,
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            f'PRAGMA mmap_size={XFORMS_SQLITE_MMAP_SIZE};'
+        ),
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -158,6 +181,62 @@ if FRONTEND_DIST_DIR.exists():
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache backend shared by the conversion cache and the response cache below.
+# XFORMS_CACHE_BACKEND is "locmem" (per process), "file" (shared by the
+# processes of one host, stored in XFORMS_CACHE_LOCATION) or a backend's
+# dotted path, with XFORMS_CACHE_LOCATION passed as its LOCATION.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+XFORMS_CACHE_BACKEND = os.environ.get('XFORMS_CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS.get(XFORMS_CACHE_BACKEND, XFORMS_CACHE_BACKEND),
+        'LOCATION': os.environ.get(
+            'XFORMS_CACHE_LOCATION',
+            str(BASE_DIR / 'cache') if XFORMS_CACHE_BACKEND == 'file' else '',
+        ),
+    },
+}
+
+# Cached form list/detail JSON and SPA shell (see forms/caching.py and
+# config/views.py): Django cache alias (empty disables) and timeout in seconds.
+XFORMS_RESPONSE_CACHE_ALIAS = os.environ.get('XFORMS_RESPONSE_CACHE_ALIAS', 'default') or None
+XFORMS_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('XFORMS_RESPONSE_CACHE_TIMEOUT', '300'))
+
+# XLSForm -> XForm conversion cache (see forms/conversion.py)
+# Entries kept in-process, Django cache alias for the shared tier, and its timeout.
+XFORMS_CONVERSION_CACHE_SIZE = int(os.environ.get('XFORMS_CONVERSION_CACHE_SIZE', '64'))
+XFORMS_CONVERSION_CACHE_ALIAS = os.environ.get('XFORMS_CONVERSION_CACHE_ALIAS', 'default') or None
+XFORMS_CONVERSION_CACHE_TIMEOUT = int(os.environ.get('XFORMS_CONVERSION_CACHE_TIMEOUT', str(24 * 60 * 60)))
+
+# XLSForm conversion worker pool (see forms.conversion.ConversionPool)
+# Workers per web process (0 = convert inline), extra queued jobs before the
+# API answers 503, wall-clock timeout and CPU-seconds limit per conversion.
+XFORMS_CONVERSION_WORKERS = int(os.environ.get('XFORMS_CONVERSION_WORKERS', '2'))
+XFORMS_CONVERSION_QUEUE_SIZE = int(os.environ.get('XFORMS_CONVERSION_QUEUE_SIZE', '4'))
+XFORMS_CONVERSION_TIMEOUT = float(os.environ.get('XFORMS_CONVERSION_TIMEOUT', '60'))
+XFORMS_CONVERSION_CPU_LIMIT = int(os.environ.get('XFORMS_CONVERSION_CPU_LIMIT', '60'))
+
+# OpenRosa submissions (see forms/openrosa.py): largest request accepted, in
+# bytes. Devices split bigger uploads into several requests.
+XFORMS_OPENROSA_MAX_CONTENT_LENGTH = int(os.environ.get('XFORMS_OPENROSA_MAX_CONTENT_LENGTH', str(10 * 1024 * 1024)))
+
+# Directory for partial chunked attachment uploads (see forms/attachments.py);
+# defaults to MEDIA_ROOT/partial_uploads. Must be shared by all web processes.
+XFORMS_ATTACHMENT_UPLOAD_DIR = os.environ.get('XFORMS_ATTACHMENT_UPLOAD_DIR') or None
+
+# Submissions older than this many days are moved to compressed archive
+# segments by `manage.py archive_submissions` (see forms/archive.py).
+XFORMS_ARCHIVE_AFTER_DAYS = int(os.environ.get('XFORMS_ARCHIVE_AFTER_DAYS', '365'))
+
+# Store form definitions and submission XML zlib-compressed (see
+# forms/compression.py). Existing rows stay readable either way; compress them
+# and train per-form dictionaries with `manage.py compress_submissions`.
+XFORMS_XML_COMPRESSION = os.environ.get('XFORMS_XML_COMPRESSION', 'false').lower() == 'true'
+XFORMS_XML_COMPRESSION_LEVEL = int(os.environ.get('XFORMS_XML_COMPRESSION_LEVEL', '6'))
+
 DJANGO_VITE = {
     'default': {
         'dev_mode': DEBUG,
@@ -17,7 +17,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, re_path
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from pathlib import Path
@@ -32,6 +32,7 @@ FRONTEND_DIR = BASE_DIR / 'frontend'
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', api.urls),
+    path('openrosa/', include('forms.urls')),
     
     # Root path should also serve the Vue app
     path('', spa_entrypoint, name='spa_root'),
@@ -1,7 +1,41 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
+
+from forms.caching import response_cache, response_cache_timeout
+
+
+SPA_SHELL_CACHE_KEY = 'xforms:spa-shell'
+
+
+def _manifest_version():
+    """Identify the current frontend build; None in Vite dev mode."""
+    vite = settings.DJANGO_VITE['default']
+    if vite.get('dev_mode'):
+        return None
+    try:
+        return Path(vite['manifest_path']).stat().st_mtime_ns
+    except OSError:
+        return 0
 
 
 def spa_entrypoint(request):
-    """Render the Vue single-page app entry point."""
+    """Render the Vue single-page app entry point.
+
+    The shell is the same for every route and user, so the rendered HTML is
+    cached per frontend build. In Vite dev mode it is rendered every time.
+    """
+    cache = response_cache()
+    version = _manifest_version()
+    if cache is None or version is None:
+        return render(request, 'index.html')
 
-    return render(request, 'index.html')
+    key = f'{SPA_SHELL_CACHE_KEY}:{version}'
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('index.html', request=request)
+        cache.set(key, html, response_cache_timeout())
+    return HttpResponse(html)
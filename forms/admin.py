@@ -1,19 +1,78 @@
 from django.contrib import admin
 
-from .models import Form, FormSubmission
+from .models import (
+    AttachmentUpload,
+    ConversionJob,
+    Form,
+    FormSubmission,
+    FormVersion,
+    SubmissionArchive,
+    SubmissionAttachment,
+)
+from .search import search_submissions, split_search_term
 
 
 @admin.register(Form)
 class FormAdmin(admin.ModelAdmin):
-    list_display = ("name", "version", "updated_at")
-    search_fields = ("name", "description", "version")
+    list_display = ("name", "xform_id", "version", "updated_at")
+    search_fields = ("name", "description", "version", "xform_id")
     readonly_fields = ("created_at", "updated_at")
+    raw_id_fields = ("current_version",)
+
+
+@admin.register(FormVersion)
+class FormVersionAdmin(admin.ModelAdmin):
+    list_display = ("form", "version", "xml_hash", "created_at")
+    list_filter = ("form",)
+    raw_id_fields = ("form",)
+    readonly_fields = ("xml_hash", "xls_hash", "xls_name", "created_at")
 
 
 @admin.register(FormSubmission)
 class FormSubmissionAdmin(admin.ModelAdmin):
     list_display = ("form", "submitted_at", "pk")
     list_filter = ("form",)
-    search_fields = ("xml_submission",)
-    raw_id_fields = ("form",)
+    # Only enables the search box; get_search_results does the (indexed) work.
+    search_fields = ("instance_id",)
+    search_help_text = "Words match answers; /data/field=value matches one field exactly."
+    raw_id_fields = ("form", "form_version")
     readonly_fields = ("submitted_at",)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        if search_term.strip().startswith("uuid:"):
+            return queryset.filter(instance_id=search_term.strip()), False
+        text, fields = split_search_term(search_term)
+        return search_submissions(queryset, text=text, fields=fields), False
+
+
+@admin.register(SubmissionArchive)
+class SubmissionArchiveAdmin(admin.ModelAdmin):
+    list_display = ("form", "period_start", "period_end", "row_count", "size")
+    list_filter = ("form",)
+    raw_id_fields = ("form",)
+    readonly_fields = ("file", "period_start", "period_end", "row_count", "size", "created_at")
+
+
+@admin.register(SubmissionAttachment)
+class SubmissionAttachmentAdmin(admin.ModelAdmin):
+    list_display = ("name", "submission", "content_type", "size", "created_at")
+    search_fields = ("name", "content_hash")
+    raw_id_fields = ("submission",)
+    readonly_fields = ("content_hash", "created_at")
+
+
+@admin.register(AttachmentUpload)
+class AttachmentUploadAdmin(admin.ModelAdmin):
+    list_display = ("name", "submission", "offset", "size", "updated_at")
+    raw_id_fields = ("submission",)
+    readonly_fields = ("upload_id", "created_at", "updated_at")
+
+
+@admin.register(ConversionJob)
+class ConversionJobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "kind", "status", "form", "created_at", "finished_at")
+    list_filter = ("status", "kind")
+    raw_id_fields = ("form",)
+    readonly_fields = ("created_at", "started_at", "finished_at")
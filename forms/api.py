@@ -1,28 +1,62 @@
 from __future__ import annotations
 
-from datetime import datetime
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Literal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import hashlib
+import json
+import logging
 import os
-import tempfile
-import traceback
+import uuid
 
+from asgiref.sync import sync_to_async
 from django.db import IntegrityError
-from django.shortcuts import get_object_or_404
+from django.db.models import Case, Q, TextField, Value, When
+from django.db.models.functions import Length, Substr
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
 from django.utils.encoding import force_str
-from ninja import Field, ModelSchema, Router, Schema
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.text import slugify
+from ninja import Field, Header, ModelSchema, Query, Router, Schema
 from ninja.errors import HttpError
 from ninja.files import UploadedFile
 
-# Try to import pyxform
-try:
-    from pyxform.xls2xform import xls2xform_convert
-    PYXFORM_AVAILABLE = True
-except ImportError as e:
-    PYXFORM_AVAILABLE = False
-    print(f"Warning: pyxform not available. Error: {e}")
-
-from .models import Form, FormSubmission
+from .archive import archived_page, has_archived_after, iter_archived
+from .attachments import (
+    InvalidUploadChunk,
+    UploadOffsetMismatch,
+    attachment_response,
+    start_upload,
+    write_chunk,
+)
+from .caching import form_cache_key, list_cache_key, response_cache, response_cache_timeout
+from .compression import COMPRESSED_PREFIX, CompressedTextField
+from .conversion import (
+    PYXFORM_AVAILABLE,
+    ConversionAborted,
+    ConversionPoolBusy,
+    ConversionTimeout,
+    conversion_pool,
+    convert_upload,
+)
+from .counters import submission_stats
+from .deletion import soft_delete_form
+from .export import export_queryset, iter_csv, iter_ndjson
+from .ingest import SubmissionConflict, SubmissionRejected, ingest_batch, ingest_submission
+from .jobs import enqueue_job
+from .models import AttachmentUpload, ConversionJob, Form, FormSubmission, FormVersion, SubmissionAttachment
+from .pagination import decode_cursor, encode_cursor, set_next_cursor
+from .search import UnknownField, resolve_field_path, search_submissions
+from .streaming import stream_body
+from .versions import set_definition
 
 
+logger = logging.getLogger(__name__)
 router = Router(tags=["forms"])
 
 
@@ -34,19 +68,73 @@ class FormOut(ModelSchema):
             "name",
             "description",
             "xls_form",
+            "xls_name",
             "version",
             "xml_definition",
+            "submission_count",
+            "last_submitted_at",
             "created_at",
             "updated_at",
         ]
 
 
+class FormListItemOut(Schema):
+    """Form metadata for the listing; fields outside the ``fields=`` projection are omitted."""
+
+    id: int | None = None
+    name: str | None = None
+    description: str | None = None
+    xls_form: str | None = None
+    xls_name: str | None = None
+    version: str | None = None
+    submission_count: int | None = None
+    last_submitted_at: datetime | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
+FORM_LIST_FIELDS = tuple(FormListItemOut.model_fields)
+FORM_LIST_DEFAULT_LIMIT = 50
+FORM_LIST_MAX_LIMIT = 200
+SUBMISSION_LIST_DEFAULT_LIMIT = 50
+SUBMISSION_LIST_MAX_LIMIT = 500
+EMBEDDED_SUBMISSIONS_DEFAULT = 10
+EMBEDDED_SUBMISSIONS_MAX = 100
+SUBMISSION_PREVIEW_DEFAULT_LENGTH = 1024
+
+BULK_INGEST_MAX_ITEMS = 1000
+
+SubmissionBodyMode = Literal["full", "truncated", "none"]
+XML_STREAM_CHUNK_SIZE = 64 * 1024
+EXPORT_STREAM_BATCH_SIZE = 500
+STATS_DEFAULT_RANGE = timedelta(days=30)
+STATS_MAX_BUCKETS = 5000
+STATS_INTERVALS = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}
+
+
 class FormSubmissionOut(Schema):
     submission_id: int
     form_id: int
     submitted_at: datetime
     username: str | None = None
-    xml_submission: str
+    instance_id: str | None = None
+    xml_submission: str | None = None
+    xml_truncated: bool = False
+
+
+class BulkIngestItemOut(Schema):
+    index: int
+    status: Literal["created", "duplicate", "rejected"]
+    submission_id: int | None = None
+    instance_id: str | None = None
+    error: str | None = None
+
+
+class BulkIngestOut(Schema):
+    created: int
+    duplicates: int
+    rejected: int
+    results: list[BulkIngestItemOut]
 
 
 class FormDetailOut(Schema):
@@ -54,8 +142,11 @@ class FormDetailOut(Schema):
     name: str
     description: str
     xls_form: str | None = None
+    xls_name: str = ""
     version: str
     xml_definition: str
+    submission_count: int
+    last_submitted_at: datetime | None = None
     created_at: datetime
     updated_at: datetime
     submissions: list[FormSubmissionOut] = []
@@ -71,6 +162,79 @@ class FormUpdatePayload(Schema):
     description: str | None = None
 
 
+class ConversionJobOut(Schema):
+    job_id: int
+    kind: str
+    status: str
+    form_id: int | None = None
+    error: str = ""
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    status_url: str
+
+
+class FormVersionOut(Schema):
+    version_id: int
+    version: str
+    xml_hash: str
+    xls_form: str | None = None
+    xls_name: str = ""
+    created_at: datetime
+    is_current: bool
+
+
+class FormVersionDetailOut(FormVersionOut):
+    xml_definition: str
+
+
+class AttachmentOut(Schema):
+    name: str
+    content_type: str
+    size: int
+    content_hash: str
+    created_at: datetime
+    download_url: str
+
+
+class AttachmentUploadPayload(Schema):
+    name: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., ge=0)
+    content_type: str = Field("", max_length=100)
+
+
+class AttachmentUploadOut(Schema):
+    upload_id: uuid.UUID | None = None
+    name: str
+    size: int
+    offset: int
+    complete: bool
+    upload_url: str | None = None
+    attachment: AttachmentOut | None = None
+
+
+class SubmissionStatsPointOut(Schema):
+    period: datetime
+    count: int
+
+
+class SubmissionStatsUserOut(Schema):
+    user_id: int | None = None
+    username: str | None = None
+    count: int
+
+
+class SubmissionStatsOut(Schema):
+    form_id: int
+    interval: str
+    timezone: str
+    start: datetime
+    end: datetime
+    total: int
+    series: list[SubmissionStatsPointOut]
+    users: list[SubmissionStatsUserOut]
+
+
 class XLSPlayPreviewOut(Schema):
     xml_definition: str
     version: str
@@ -85,6 +249,132 @@ def _assert_unique_name(name: str, *, exclude_id: int | None = None) -> None:
         raise HttpError(400, "A form with this name already exists.")
 
 
+def _parse_fields_param(fields: str | None, allowed: tuple[str, ...]) -> tuple[str, ...]:
+    if not fields:
+        return allowed
+
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HttpError(400, f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}.")
+    return requested or allowed
+
+
+def _iter_text_chunks(text: str, chunk_size: int = XML_STREAM_CHUNK_SIZE):
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size].encode("utf-8")
+
+
+def _submission_out(submission: FormSubmission, *, include_body: bool = True) -> FormSubmissionOut:
+    return FormSubmissionOut(
+        submission_id=submission.pk,
+        form_id=submission.form_id,
+        submitted_at=submission.submitted_at,
+        username=submission.user.username if submission.user else None,
+        instance_id=submission.instance_id,
+        xml_submission=submission.xml_submission if include_body else None,
+    )
+
+
+def _not_modified(request, response: HttpResponse, *, etag: str, last_modified: datetime) -> HttpResponse | None:
+    """Put validators on ``response`` and return a 304 if the client's copy is still current.
+
+    ``Cache-Control: no-cache`` lets browsers keep the body but revalidate
+    it on every load.
+    """
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    result = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()), response=response
+    )
+    return None if result is response else result
+
+
+async def _embedded_submissions(
+    form_id: int, *, limit: int, body: SubmissionBodyMode, preview_length: int
+) -> list[FormSubmissionOut]:
+    """Fetch the newest submissions for the detail view in a single query.
+
+    The user is joined rather than lazily loaded, and the XML body is either
+    loaded in full, cut down to a prefix in SQL, or not selected at all.
+    """
+    if limit == 0:
+        return []
+
+    fields = ["id", "form_id", "submitted_at", "instance_id", "user__username"]
+    queryset = FormSubmission.objects.filter(form_id=form_id).select_related("user")
+
+    if body == "full":
+        fields.append("xml_submission")
+    elif body == "truncated":
+        queryset = queryset.annotate(
+            xml_preview=Substr("xml_submission", 1, preview_length, output_field=TextField()),
+            xml_length=Length("xml_submission"),
+            # Compressed bodies cannot be cut in SQL; they are small, so they are shipped whole.
+            xml_packed=Case(
+                When(xml_submission__startswith=COMPRESSED_PREFIX, then="xml_submission"),
+                default=Value(None),
+                output_field=CompressedTextField(),
+            ),
+        )
+
+    submissions = queryset.only(*fields).order_by("-submitted_at", "-id")[:limit]
+
+    results = []
+    async for sub in submissions:
+        out = _submission_out(sub, include_body=body == "full")
+        if body == "truncated" and sub.xml_packed is not None:
+            out.xml_submission = sub.xml_packed[:preview_length]
+            out.xml_truncated = len(sub.xml_packed) > preview_length
+        elif body == "truncated":
+            out.xml_submission = sub.xml_preview
+            out.xml_truncated = sub.xml_length > preview_length
+        results.append(out)
+    return results
+
+
+async def _submission_page(
+    request, response: HttpResponse, queryset, *, cursor: str | None, limit: int, archived=None
+):
+    """One newest-first keyset page of ``queryset`` on ``(submitted_at, id)``.
+
+    ``archived(before, boundary, count)``, if given, returns archived rows
+    below the cursor key ``before``; ``boundary`` is the oldest live row's
+    time when the live rows already fill the page (None once they ran out).
+    """
+    before = _decode_submission_cursor(cursor) if cursor else None
+    if before is not None:
+        queryset = queryset.filter(
+            Q(submitted_at__lt=before[0])
+            | Q(submitted_at=before[0], id__lt=before[1])
+        )
+
+    submissions = [sub async for sub in queryset.select_related("user").order_by("-submitted_at", "-id")[: limit + 1]]
+    if archived is not None:
+        boundary = submissions[-1].submitted_at if len(submissions) > limit else None
+        older = await sync_to_async(archived)(before, boundary, limit + 1)
+        if older:
+            submissions = sorted(submissions + older, key=lambda sub: (sub.submitted_at, sub.pk), reverse=True)
+            submissions = submissions[: limit + 1]
+    has_more = len(submissions) > limit
+    submissions = submissions[:limit]
+
+    if has_more:
+        last = submissions[-1]
+        set_next_cursor(request, response, encode_cursor([last.submitted_at.isoformat(), last.pk]))
+
+    return [_submission_out(sub) for sub in submissions]
+
+
+def _decode_submission_cursor(cursor: str) -> tuple[datetime, int]:
+    submitted_at_raw, submission_id = decode_cursor(cursor, size=2)
+    submitted_at = parse_datetime(submitted_at_raw) if isinstance(submitted_at_raw, str) else None
+    if submitted_at is None or not isinstance(submission_id, int):
+        raise HttpError(400, "Invalid pagination cursor.")
+    return submitted_at, submission_id
+
+
 def _extract_xml_payload(request) -> str:
     xml_payload = force_str(request.body, encoding=request.encoding or "utf-8").strip()
 
@@ -97,94 +387,208 @@ def _extract_xml_payload(request) -> str:
     return xml_payload
 
 
+def _extract_bulk_payloads(request) -> list[str]:
+    """Split a bulk submission request into individual XML payloads.
+
+    Accepts ``application/x-ndjson`` (one JSON string, or ``{"xml": ...}``
+    object, per line) or ``multipart/form-data`` where every uploaded file
+    and every ``xml`` field is one instance.
+    """
+    if request.content_type == "multipart/form-data":
+        payloads = [
+            force_str(uploaded.read(), encoding="utf-8")
+            for field_name in request.FILES
+            for uploaded in request.FILES.getlist(field_name)
+        ]
+        payloads.extend(request.POST.getlist("xml"))
+    elif request.content_type in ("application/x-ndjson", "application/jsonl"):
+        payloads = []
+        body = force_str(request.body, encoding=request.encoding or "utf-8")
+        for line_number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as exc:
+                raise HttpError(400, f"Line {line_number} is not valid JSON.") from exc
+            if isinstance(item, dict):
+                item = item.get("xml")
+            if not isinstance(item, str):
+                raise HttpError(400, f"Line {line_number} must be a JSON string or an object with an 'xml' string.")
+            payloads.append(item)
+    else:
+        raise HttpError(415, "Bulk submissions must be sent as multipart/form-data or application/x-ndjson.")
+
+    if not payloads:
+        raise HttpError(400, "No submissions found in the request.")
+    if len(payloads) > BULK_INGEST_MAX_ITEMS:
+        raise HttpError(413, f"A batch may contain at most {BULK_INGEST_MAX_ITEMS} submissions.")
+    return payloads
+
+
+def _validate_xls_filename(xls_file) -> None:
+    if not xls_file.name.lower().endswith(('.xlsx', '.xls')):
+        raise HttpError(400, "File must be an Excel file (.xlsx or .xls)")
+
+
 def _validate_and_convert_xls(xls_file):
     """Validate uploaded file looks like Excel and convert to XForm using pyxform.
 
+    Results are cached by workbook content hash (see forms.conversion), so an
+    unchanged re-upload returns without running pyxform. Cache misses run in
+    the bounded conversion pool: 503 when it is saturated, 504 on timeout.
+
     Returns: (xml_definition: str, version: str, form_name: str)
     Raises HttpError on invalid input or conversion errors.
     """
     if not PYXFORM_AVAILABLE:
         raise HttpError(500, "pyxform is not available. Please install it with: pip install pyxform")
     
-    if not xls_file.name.lower().endswith(('.xlsx', '.xls')):
-        raise HttpError(400, "File must be an Excel file (.xlsx or .xls)")
+    _validate_xls_filename(xls_file)
+
+    form_name = os.path.splitext(xls_file.name)[0]
 
     try:
-        # Reset file pointer
-        xls_file.seek(0)
-        
-        # Get the original file name
-        form_name = os.path.splitext(xls_file.name)[0]
-        
-        # Create temp files for input and output
-        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False, mode='wb') as tmp_xls_file:
-            tmp_xls_file.write(xls_file.read())
-            xls_path = tmp_xls_file.name
-        
-        # Create temp file for XML output
-        with tempfile.NamedTemporaryFile(suffix='.xml', delete=False, mode='w', encoding='utf-8') as tmp_xml_file:
-            xml_path = tmp_xml_file.name
-        
-        try:
-            # Convert using pyxform - it writes to the output file
-            # The function returns a list of warnings, but we don't need them for now
-            warnings = xls2xform_convert(
-                xlsform_path=xls_path,
-                xform_path=xml_path,
-                validate=False,
-                pretty_print=True,
-                enketo=False
-            )
-            
-            # Read the generated XML file
-            with open(xml_path, 'r', encoding='utf-8') as f:
-                xml_definition = f.read()
-            
-            # Try to extract version from XML
-            version = ""
-            # Look for version attribute in the XML
-            import re
-            version_match = re.search(r'version="([^"]+)"', xml_definition)
-            if version_match:
-                version = version_match.group(1)
-            
-            return xml_definition, version, form_name
-            
-        except Exception as inner_exc:
-            # Provide more detailed error
-            error_details = traceback.format_exc()
-            print(f"Pyxform conversion error: {error_details}")
-            raise HttpError(400, f"XLSForm conversion failed: {str(inner_exc)}") from inner_exc
-        finally:
-            # Clean up temp files
-            for path in [xls_path, xml_path]:
-                if os.path.exists(path):
-                    os.unlink(path)
-        
+        xml_definition, version = convert_upload(xls_file, pool=conversion_pool)
+    except ConversionPoolBusy as exc:
+        raise HttpError(503, "The server is busy converting other XLSForms. Please retry shortly.") from exc
+    except ConversionTimeout as exc:
+        raise HttpError(504, str(exc)) from exc
+    except ConversionAborted as exc:
+        raise HttpError(400, f"Failed to convert XLSForm: {exc}") from exc
     except Exception as exc:
         error_msg = str(exc)
-        print(f"Overall conversion error: {traceback.format_exc()}")
-        
+        logger.exception("XLSForm conversion of %r failed", xls_file.name)
+
         # Provide more helpful error message
         if "No module named" in error_msg or "cannot import name" in error_msg:
             error_msg = "pyxform is not properly installed. Please install it with: pip install pyxform"
-        
+
         raise HttpError(400, f"Failed to convert XLSForm: {error_msg}") from exc
 
+    return xml_definition, version, form_name
+
 
-def _save_xls_file(form: Form, xls_file) -> None:
-    """Save uploaded xls_file to the form's FileField (ensures pointer reset)."""
-    xls_file.seek(0)
-    form.xls_form.save(xls_file.name, xls_file, save=True)
+def _wants_async(request) -> bool:
+    """True when the client asked for a queued conversion (``?async=1`` or ``Prefer: respond-async``)."""
+    if request.GET.get("async", "").lower() in ("1", "true", "yes"):
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
 
 
-@router.get("/", response=list[FormOut])
-def list_forms(request):
-    return list(Form.objects.order_by("name"))
+def _job_out(job: ConversionJob) -> ConversionJobOut:
+    return ConversionJobOut(
+        job_id=job.pk,
+        kind=job.kind,
+        status=job.status,
+        form_id=job.form_id,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        status_url=f"/api/forms/jobs/{job.pk}/",
+    )
+
+
+def _version_out(form_version: FormVersion, form: Form, *, detail: bool = False) -> FormVersionOut:
+    fields = dict(
+        version_id=form_version.pk,
+        version=form_version.version,
+        xml_hash=form_version.xml_hash,
+        xls_form=form_version.xls_form.name if form_version.xls_form else None,
+        xls_name=form_version.xls_name,
+        created_at=form_version.created_at,
+        is_current=form_version.pk == form.current_version_id,
+    )
+    if detail:
+        return FormVersionDetailOut(**fields, xml_definition=form_version.xml_definition)
+    return FormVersionOut(**fields)
+
+
+def _attachment_out(attachment: SubmissionAttachment) -> AttachmentOut:
+    submission = attachment.submission
+    return AttachmentOut(
+        name=attachment.name,
+        content_type=attachment.content_type,
+        size=attachment.size,
+        content_hash=attachment.content_hash,
+        created_at=attachment.created_at,
+        download_url=(
+            f"/api/forms/{submission.form_id}/submissions/{submission.pk}/attachments/{attachment.name}"
+        ),
+    )
+
+
+def _upload_out(upload: AttachmentUpload | SubmissionAttachment) -> AttachmentUploadOut:
+    if isinstance(upload, SubmissionAttachment):
+        return AttachmentUploadOut(
+            name=upload.name,
+            size=upload.size,
+            offset=upload.size,
+            complete=True,
+            attachment=_attachment_out(upload),
+        )
+    return AttachmentUploadOut(
+        upload_id=upload.upload_id,
+        name=upload.name,
+        size=upload.size,
+        offset=upload.offset,
+        complete=False,
+        upload_url=f"/api/forms/attachments/uploads/{upload.upload_id}/",
+    )
 
 
-@router.post("/", response={201: FormOut})
+@router.get("/", response=list[FormListItemOut], exclude_unset=True)
+async def list_forms(
+    request,
+    response: HttpResponse,
+    cursor: str | None = None,
+    limit: int = Query(FORM_LIST_DEFAULT_LIMIT, ge=1, le=FORM_LIST_MAX_LIMIT),
+    fields: str | None = None,
+):
+    """List form metadata ordered by name, one keyset page at a time.
+
+    ``xml_definition`` is never loaded here; fetch it per form from
+    ``GET /{form_id}/xml/``. The next page's cursor is returned in the
+    ``X-Next-Cursor`` header (and a ``Link: rel="next"`` header). Pages are
+    served from the response cache (see forms.caching) while no form changes.
+    """
+    selected = _parse_fields_param(fields, FORM_LIST_FIELDS)
+    cache = response_cache()
+    if cache is not None:
+        cache_key = await list_cache_key(cache, request)
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            items, next_cursor = cached
+            set_next_cursor(request, response, next_cursor)
+            return items
+
+    queryset = Form.objects.order_by("name")
+
+    if cursor:
+        (after_name,) = decode_cursor(cursor, size=1)
+        queryset = queryset.filter(name__gt=after_name)
+
+    rows = [row async for row in queryset.values(*dict.fromkeys((*selected, "name")))[: limit + 1]]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = encode_cursor([rows[-1]["name"]]) if has_more else None
+    set_next_cursor(request, response, next_cursor)
+
+    items = [{field: row[field] for field in selected} for row in rows]
+    if cache is not None:
+        await cache.aset(cache_key, (items, next_cursor), response_cache_timeout())
+    return items
+
+
+@router.post("/", response={201: FormOut, 202: ConversionJobOut})
 def create_form(request):
+    """Create a form from an uploaded XLSForm.
+
+    With ``?async=1`` (or ``Prefer: respond-async``) the conversion is queued
+    and a ``202`` with the job is returned; poll ``GET /jobs/{job_id}/``.
+    """
     # Extract form data
     name = request.POST.get('name', '').strip()
     description = request.POST.get('description', '').strip()
@@ -199,17 +603,19 @@ def create_form(request):
         raise HttpError(400, "XLS file is required")
     
     xls_file = request.FILES['xls_file']
-    
+
+    if _wants_async(request):
+        _validate_xls_filename(xls_file)
+        job = enqueue_job(
+            ConversionJob.KIND_CREATE, xls_file, payload={"name": name, "description": description}
+        )
+        return 202, _job_out(job)
+
     xml_definition, version, _ = _validate_and_convert_xls(xls_file)
 
     try:
-        form = Form.objects.create(
-            name=name,
-            description=description,
-            xml_definition=xml_definition,
-            version=version,
-        )
-        _save_xls_file(form, xls_file)
+        form = Form(name=name, description=description)
+        set_definition(form, xml_definition, version, xls_file=xls_file)
     except IntegrityError as exc:
         raise HttpError(400, "A form with this name already exists.") from exc
 
@@ -230,38 +636,108 @@ def preview_xlsform(request, file: UploadedFile):
 
 
 @router.get("/{form_id}/", response=FormDetailOut)
-def get_form(request, form_id: int):
-    form = get_object_or_404(Form, pk=form_id)
-    submissions = list(form.submissions.order_by("-submitted_at")[:10])
-    
-    return FormDetailOut(
+async def get_form(
+    request,
+    form_id: int,
+    response: HttpResponse,
+    submissions: int = Query(EMBEDDED_SUBMISSIONS_DEFAULT, ge=0, le=EMBEDDED_SUBMISSIONS_MAX),
+    submission_body: SubmissionBodyMode = "full",
+    preview_length: int = Query(SUBMISSION_PREVIEW_DEFAULT_LENGTH, ge=1),
+):
+    """Return a form with its newest submissions embedded, in at most two queries.
+
+    ``submission_body`` controls how much of each submission's XML is shipped:
+    ``full`` (default), ``truncated`` to ``preview_length`` characters, or ``none``.
+    Supports conditional GET: when neither the form nor its embedded
+    submissions changed, the answer is an empty ``304``. Responses are
+    served from the response cache (see forms.caching) while the form and
+    its submissions are unchanged.
+    """
+    cache = response_cache()
+    if cache is not None:
+        cache_key = await form_cache_key(cache, form_id, request)
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            etag, last_modified, detail = cached
+            return _not_modified(request, response, etag=etag, last_modified=last_modified) or detail
+
+    form = await aget_object_or_404(Form, pk=form_id)
+    embedded = await _embedded_submissions(form.pk, limit=submissions, body=submission_body, preview_length=preview_length)
+
+    # The representation changes with the definition, the counters (which
+    # never bump updated_at) and the embedded submissions, so all of them
+    # go into the validators.
+    variant = hashlib.md5(
+        json.dumps(
+            [
+                request.GET.urlencode(),
+                form.submission_count,
+                form.last_submitted_at.isoformat() if form.last_submitted_at else None,
+                [[item.submission_id, item.submitted_at.isoformat()] for item in embedded],
+            ]
+        ).encode()
+    ).hexdigest()
+    last_modified = max(
+        [form.updated_at, *filter(None, [form.last_submitted_at]), *(item.submitted_at for item in embedded)]
+    )
+    etag = f'W/"{form.xml_hash}-{int(form.updated_at.timestamp() * 1_000_000)}-{variant}"'
+    detail = FormDetailOut(
         id=form.pk,
         name=form.name,
         description=form.description,
         xls_form=form.xls_form.name if form.xls_form else None,
+        xls_name=form.xls_name,
         version=form.version,
         xml_definition=form.xml_definition,
+        submission_count=form.submission_count,
+        last_submitted_at=form.last_submitted_at,
         created_at=form.created_at,
         updated_at=form.updated_at,
-        submissions=[
-            FormSubmissionOut(
-                submission_id=sub.pk,
-                form_id=form.pk,
-                submitted_at=sub.submitted_at,
-                username=sub.user.username if sub.user else None,
-                xml_submission=sub.xml_submission,
-            )
-            for sub in submissions
-        ],
+        submissions=embedded,
     )
+    if cache is not None:
+        await cache.aset(cache_key, (etag, last_modified, detail), response_cache_timeout())
+    return _not_modified(request, response, etag=etag, last_modified=last_modified) or detail
+
+
+@router.get("/{form_id}/xml/")
+def get_form_xml(request, form_id: int):
+    """Stream a single form's XForm definition.
+
+    The ETag is the stored definition hash, so a client holding the current
+    copy gets ``304`` without the definition being read from the database.
+    """
+    xml_hash, updated_at = get_object_or_404(Form.objects.values_list("xml_hash", "updated_at"), pk=form_id)
+    response = StreamingHttpResponse(content_type="application/xml; charset=utf-8")
+    not_modified = _not_modified(request, response, etag=f'"{xml_hash}"', last_modified=updated_at)
+    if not_modified is not None:
+        return not_modified
 
+    xml_definition = get_object_or_404(Form.objects.values_list("xml_definition", flat=True), pk=form_id)
+    response.streaming_content = stream_body(request, _iter_text_chunks(xml_definition))
+    return response
 
-@router.patch("/{form_id}/", response=FormOut)
+
+@router.patch("/{form_id}/", response={200: FormOut, 202: ConversionJobOut})
 def update_form(request, form_id: int, payload: FormUpdatePayload):
     form = get_object_or_404(Form, pk=form_id)
 
     if 'xls_file' in request.FILES:
         xls_file = request.FILES['xls_file']
+
+        if _wants_async(request):
+            _validate_xls_filename(xls_file)
+            job_payload = {}
+            for field_name in payload.model_fields_set:
+                value = getattr(payload, field_name)
+                if value is None:
+                    raise HttpError(400, f"The '{field_name}' field must be a string.")
+                job_payload[field_name] = value
+            if "name" in job_payload:
+                _assert_unique_name(job_payload["name"], exclude_id=form.pk)
+            job = enqueue_job(ConversionJob.KIND_UPDATE, xls_file, form=form, payload=job_payload)
+            return 202, _job_out(job)
+
         xml_definition, version, _ = _validate_and_convert_xls(xls_file)
 
         if payload.model_fields_set and 'name' in payload.model_fields_set:
@@ -277,13 +753,13 @@ def update_form(request, form_id: int, payload: FormUpdatePayload):
                 raise HttpError(400, "The 'description' field must be a string.")
             form.description = desc_val
 
-        form.xml_definition = xml_definition
-        if version:
-            form.version = version
-
+        # Re-uploading a workbook that converts to the current definition
+        # changes nothing; only new name/description values are saved.
         try:
-            form.save()
-            _save_xls_file(form, xls_file)
+            if not set_definition(form, xml_definition, version, xls_file=xls_file):
+                metadata = [field for field in ("name", "description") if field in payload.model_fields_set]
+                if metadata:
+                    form.save(update_fields=[*metadata, "updated_at"])
         except IntegrityError as exc:
             raise HttpError(400, "A form with this name already exists.") from exc
 
@@ -313,28 +789,326 @@ def update_form(request, form_id: int, payload: FormUpdatePayload):
     return form
 
 
+@router.get("/{form_id}/versions/", response=list[FormVersionOut])
+def list_form_versions(request, form_id: int):
+    """List every definition the form has had, newest first."""
+    form = get_object_or_404(Form.objects.only("id", "current_version_id"), pk=form_id)
+    versions = form.versions.defer("xml_definition")
+    return [_version_out(form_version, form) for form_version in versions]
+
+
+@router.get("/{form_id}/versions/{version_id}/", response=FormVersionDetailOut)
+def get_form_version(request, form_id: int, version_id: int):
+    form = get_object_or_404(Form.objects.only("id", "current_version_id"), pk=form_id)
+    form_version = get_object_or_404(FormVersion, pk=version_id, form=form)
+    return _version_out(form_version, form, detail=True)
+
+
+@router.get("/jobs/{job_id}/", response=ConversionJobOut)
+def get_conversion_job(request, job_id: int):
+    """Poll an asynchronous conversion job; ``form_id`` is set once it succeeds."""
+    return _job_out(get_object_or_404(ConversionJob, pk=job_id))
+
+
 @router.delete("/{form_id}/", response={204: None})
 def delete_form(request, form_id: int):
+    """Delete a form. It disappears at once; its submissions and files are
+    removed in the background by ``manage.py reap_deleted_forms``."""
     form = get_object_or_404(Form, pk=form_id)
-    form.delete()
+    soft_delete_form(form)
     return 204
 
 
-@router.post("/{form_id}/submissions/", response={201: FormSubmissionOut})
-def submit_form(request, form_id: int):
-    form = get_object_or_404(Form, pk=form_id)
+@router.post("/{form_id}/submissions/", response={200: FormSubmissionOut, 201: FormSubmissionOut})
+async def submit_form(request, form_id: int):
+    """Store a submission. Resending an already stored instanceID returns the
+    stored submission with 200; a different body under that instanceID is 409."""
+    form = await aget_object_or_404(Form, pk=form_id)
     xml_payload = _extract_xml_payload(request)
+    user = await request.auser()
+
+    try:
+        # Validation and the insert run in one transaction, which the async ORM cannot open.
+        submission, created = await sync_to_async(ingest_submission)(
+            form, xml_payload, user if user.is_authenticated else None
+        )
+    except SubmissionConflict as exc:
+        raise HttpError(409, str(exc)) from exc
+    except SubmissionRejected as exc:
+        raise HttpError(400, str(exc)) from exc
+
+    return (201 if created else 200), _submission_out(submission)
+
+
+@router.post("/{form_id}/submissions/bulk/", response=BulkIngestOut)
+def submit_form_bulk(request, form_id: int):
+    """Ingest a batch of XML instances in one request and one transaction.
+
+    Items that fail validation are reported individually, already stored
+    instanceIDs come back as ``duplicate``; the rest are written with a
+    single ``bulk_create``.
+    """
+    form = get_object_or_404(Form, pk=form_id)
+    payloads = _extract_bulk_payloads(request)
+    results = ingest_batch(form, payloads, request.user if request.user.is_authenticated else None)
 
-    submission = FormSubmission.objects.create(
-        form=form,
-        user=request.user if request.user.is_authenticated else None,
-        xml_submission=xml_payload,
+    def item_status(result) -> str:
+        if result.submission is None:
+            return "rejected"
+        return "duplicate" if result.duplicate else "created"
+
+    items = [
+        BulkIngestItemOut(
+            index=result.index,
+            status=item_status(result),
+            submission_id=result.submission.pk if result.submission is not None else None,
+            instance_id=result.submission.instance_id if result.submission is not None else None,
+            error=result.error,
+        )
+        for result in results
+    ]
+    counts = Counter(item.status for item in items)
+    return BulkIngestOut(
+        created=counts["created"], duplicates=counts["duplicate"], rejected=counts["rejected"], results=items
     )
 
-    return 201, FormSubmissionOut(
-        submission_id=submission.pk,
-        form_id=form.pk,
-        submitted_at=submission.submitted_at,
-        username=submission.user.username if submission.user else None,
-        xml_submission=submission.xml_submission,
-    )
\ No newline at end of file
+
+@router.get("/{form_id}/submissions/", response=list[FormSubmissionOut])
+async def list_submissions(
+    request,
+    response: HttpResponse,
+    form_id: int,
+    cursor: str | None = None,
+    limit: int = Query(SUBMISSION_LIST_DEFAULT_LIMIT, ge=1, le=SUBMISSION_LIST_MAX_LIMIT),
+    submitted_after: datetime | None = None,
+    submitted_before: datetime | None = None,
+    user_id: int | None = None,
+    instance_id: str | None = None,
+):
+    """List a form's submissions newest first, keyset-paginated on ``(submitted_at, id)``.
+
+    Every filter combination is served by one of the ``(form, ...)`` composite
+    indexes on FormSubmission, so a page is an index range scan. Pages that
+    reach past the live rows continue into archived segments (forms.archive).
+    """
+    if not await Form.objects.filter(pk=form_id).aexists():
+        raise HttpError(404, "Not Found")
+
+    queryset = FormSubmission.objects.filter(form_id=form_id)
+
+    if submitted_after is not None:
+        queryset = queryset.filter(submitted_at__gte=submitted_after)
+    if submitted_before is not None:
+        queryset = queryset.filter(submitted_at__lt=submitted_before)
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    if instance_id:
+        queryset = queryset.filter(instance_id=instance_id)
+
+    def archived(before, boundary, count):
+        if boundary is not None and not has_archived_after(form_id, boundary):
+            return []
+        return archived_page(
+            form_id,
+            limit=count,
+            before=before,
+            submitted_after=submitted_after,
+            submitted_before=submitted_before,
+            user_id=user_id,
+            instance_id=instance_id,
+        )
+
+    return await _submission_page(request, response, queryset, cursor=cursor, limit=limit, archived=archived)
+
+
+@router.get("/{form_id}/submissions/search/", response=list[FormSubmissionOut])
+async def search_form_submissions(
+    request,
+    response: HttpResponse,
+    form_id: int,
+    q: str = "",
+    field: list[str] = Query([]),
+    cursor: str | None = None,
+    limit: int = Query(SUBMISSION_LIST_DEFAULT_LIMIT, ge=1, le=SUBMISSION_LIST_MAX_LIMIT),
+):
+    """Search a form's submissions, newest first, keyset-paginated like the listing.
+
+    ``q`` is matched against the answers (web-search syntax: quoted phrases,
+    ``or``, ``-word``); each ``field=name=value`` requires an exact answer,
+    ``name`` being a field name or its full XPath. On PostgreSQL both are
+    served by GIN indexes (see forms.search).
+    """
+    xml_definition = await Form.objects.filter(pk=form_id).values_list("xml_definition", flat=True).afirst()
+    if xml_definition is None:
+        raise HttpError(404, "Not Found")
+
+    conditions = {}
+    for condition in field:
+        name, sep, value = condition.partition("=")
+        if not sep:
+            raise HttpError(400, f"Field conditions must look like name=value: {condition}")
+        try:
+            conditions[resolve_field_path(xml_definition, name.strip())] = value
+        except UnknownField as exc:
+            raise HttpError(400, str(exc)) from exc
+    if not q.strip() and not conditions:
+        raise HttpError(400, "Provide q or at least one field condition.")
+
+    queryset = search_submissions(FormSubmission.objects.filter(form_id=form_id), text=q, fields=conditions)
+    return await _submission_page(request, response, queryset, cursor=cursor, limit=limit)
+
+
+@router.get("/{form_id}/submissions/export/")
+def export_submissions(
+    request,
+    form_id: int,
+    format: Literal["csv", "ndjson"] = "csv",
+    submitted_after: datetime | None = None,
+    submitted_before: datetime | None = None,
+):
+    """Stream all of a form's submissions as CSV or NDJSON, oldest first.
+
+    Each XML instance is flattened into one column per field of the form's
+    definition (``/data/group/question``).
+    """
+    form = get_object_or_404(Form.objects.only("id", "name", "xml_definition"), pk=form_id)
+    queryset = export_queryset(form)
+    if submitted_after is not None:
+        queryset = queryset.filter(submitted_at__gte=submitted_after)
+    if submitted_before is not None:
+        queryset = queryset.filter(submitted_at__lt=submitted_before)
+
+    archived = iter_archived(form.pk, submitted_after=submitted_after, submitted_before=submitted_before)
+    if format == "ndjson":
+        rows, content_type = iter_ndjson(form, queryset, archived), "application/x-ndjson"
+    else:
+        rows, content_type = iter_csv(form, queryset, archived), "text/csv; charset=utf-8"
+    response = StreamingHttpResponse(
+        stream_body(request, rows, batch_size=EXPORT_STREAM_BATCH_SIZE), content_type=content_type
+    )
+
+    filename = f"{slugify(form.name) or 'form'}-submissions.{format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@router.get("/{form_id}/stats/", response=SubmissionStatsOut)
+def get_submission_stats(
+    request,
+    form_id: int,
+    interval: Literal["hour", "day", "week"] = "day",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    tz: str = "UTC",
+):
+    """Submission counts per period and per user, read from the hourly rollup table.
+
+    Defaults to the last 30 days. Day and week periods start at midnight in
+    ``tz`` (an IANA zone name); the underlying buckets are UTC hours.
+    """
+    if not Form.objects.filter(pk=form_id).exists():
+        raise HttpError(404, "Not Found")
+    try:
+        tzinfo = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HttpError(400, f"Unknown time zone: {tz}")
+
+    # Naive bounds are read in the requested zone.
+    if end is not None and timezone.is_naive(end):
+        end = timezone.make_aware(end, tzinfo)
+    if start is not None and timezone.is_naive(start):
+        start = timezone.make_aware(start, tzinfo)
+    end = end or timezone.now()
+    start = start or end - STATS_DEFAULT_RANGE
+    if start >= end:
+        raise HttpError(400, "start must be before end.")
+    if (end - start) / STATS_INTERVALS[interval] > STATS_MAX_BUCKETS:
+        raise HttpError(400, f"Range spans more than {STATS_MAX_BUCKETS} {interval} periods; use a longer interval.")
+
+    stats = submission_stats(form_id, interval=interval, start=start, end=end, tzinfo=tzinfo)
+    return {"form_id": form_id, "interval": interval, "timezone": tz, "start": start, "end": end, **stats}
+
+
+# Attachments of soft-deleted forms are gone as far as clients are concerned
+# (see forms.deletion); the reaper removes their files.
+LIVE_SUBMISSIONS = FormSubmission.objects.filter(form__deleted_at__isnull=True)
+
+
+def _live_submission(form_id: int, submission_id: int) -> FormSubmission:
+    return get_object_or_404(LIVE_SUBMISSIONS.only("id", "form_id"), pk=submission_id, form_id=form_id)
+
+
+@router.get("/{form_id}/submissions/{submission_id}/attachments/", response=list[AttachmentOut])
+def list_attachments(request, form_id: int, submission_id: int):
+    submission = _live_submission(form_id, submission_id)
+    return [_attachment_out(attachment) for attachment in submission.attachments.all()]
+
+
+@router.post("/{form_id}/submissions/{submission_id}/attachments/", response={201: AttachmentUploadOut})
+def start_attachment_upload(request, form_id: int, submission_id: int, payload: AttachmentUploadPayload):
+    """Open (or resume) a chunked upload of one attachment.
+
+    Send the bytes with ``PATCH upload_url`` and an ``Upload-Offset``
+    header; a resumed upload reports how many bytes were already received.
+    If the attachment is already stored the response is ``complete``.
+    """
+    submission = _live_submission(form_id, submission_id)
+    upload = start_upload(submission, payload.name, payload.size, content_type=payload.content_type)
+    return 201, _upload_out(upload)
+
+
+def _get_upload(upload_id: uuid.UUID) -> AttachmentUpload:
+    upload = (
+        AttachmentUpload.objects.select_related("submission")
+        .filter(upload_id=upload_id, submission__form__deleted_at__isnull=True)
+        .first()
+    )
+    if upload is None:
+        raise HttpError(404, "Upload not found or already completed.")
+    return upload
+
+
+@router.get("/attachments/uploads/{upload_id}/", response=AttachmentUploadOut)
+def get_attachment_upload(request, upload_id: uuid.UUID, response: HttpResponse):
+    upload = _get_upload(upload_id)
+    response["Upload-Offset"] = str(upload.offset)
+    return _upload_out(upload)
+
+
+@router.patch("/attachments/uploads/{upload_id}/", response={200: AttachmentUploadOut, 409: AttachmentUploadOut})
+def upload_attachment_chunk(
+    request, upload_id: uuid.UUID, response: HttpResponse, upload_offset: int = Header(..., alias="Upload-Offset")
+):
+    """Append one chunk (the raw request body) at ``Upload-Offset``.
+
+    The body is copied to disk as it is read. A chunk for the wrong offset
+    is answered with 409 and the upload's current offset.
+    """
+    upload = _get_upload(upload_id)
+    length = int(request.META.get("CONTENT_LENGTH") or 0)
+    try:
+        attachment = write_chunk(upload, upload_offset, request, length)
+    except UploadOffsetMismatch as exc:
+        upload.offset = exc.offset
+        response["Upload-Offset"] = str(upload.offset)
+        return 409, _upload_out(upload)
+    except InvalidUploadChunk as exc:
+        raise HttpError(400, str(exc)) from exc
+
+    if attachment is not None:
+        return 200, _upload_out(attachment)
+    response["Upload-Offset"] = str(upload.offset)
+    return 200, _upload_out(upload)
+
+
+@router.get("/{form_id}/submissions/{submission_id}/attachments/{name}")
+def download_attachment(request, form_id: int, submission_id: int, name: str):
+    """Stream an attachment; single ``Range`` requests get a 206 partial response."""
+    attachment = get_object_or_404(
+        SubmissionAttachment.objects.select_related("submission"),
+        submission_id=submission_id,
+        submission__form_id=form_id,
+        submission__form__deleted_at__isnull=True,
+        name=name,
+    )
+    return attachment_response(request, attachment)
@@ -0,0 +1,233 @@
+"""Archival tier for old submissions.
+
+``manage.py archive_submissions`` moves submissions older than
+``XFORMS_ARCHIVE_AFTER_DAYS`` out of FormSubmission into gzipped NDJSON
+segments in Django's storage (``archives/<form>/<first>-<last>.ndjson.gz``),
+one :class:`~forms.models.SubmissionArchive` row per segment. The live table
+and its indexes then only hold recent data, which is all the hot queries
+touch.
+
+Archived rows stay readable: the submission listing and export continue
+into the segments once the live rows run out, and ingest still recognises
+archived instanceIDs as duplicates (via the narrow ArchivedSubmission
+table). Segments are only read on demand. Submissions with attachments or
+pending uploads are never archived, since their media hangs off the live
+row. Counters and rollups keep counting archived submissions, also when
+rebuilt by ``manage.py rebuild_submission_counters``.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+import gzip
+import io
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.deletion import Collector
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .caching import invalidate_form_responses
+from .models import (
+    ArchivedSubmission,
+    AttachmentUpload,
+    Form,
+    FormSubmission,
+    SubmissionArchive,
+    SubmissionAttachment,
+)
+
+
+ARCHIVE_SEGMENT_SIZE = 5000
+ROW_FIELDS = ("id", "form_id", "user_id", "form_version_id", "instance_id", "xml_submission", "data")
+
+
+def archive_after() -> timedelta:
+    return timedelta(days=getattr(settings, "XFORMS_ARCHIVE_AFTER_DAYS", 365))
+
+
+def _storage():
+    return SubmissionArchive._meta.get_field("file").storage
+
+
+def _archivable(form_id: int, before: datetime):
+    return FormSubmission.objects.filter(form_id=form_id, submitted_at__lt=before).filter(
+        ~Exists(SubmissionAttachment.objects.filter(submission=OuterRef("pk"))),
+        ~Exists(AttachmentUpload.objects.filter(submission=OuterRef("pk"))),
+    )
+
+
+def _encode(submission: FormSubmission) -> bytes:
+    row = {field: getattr(submission, field) for field in ROW_FIELDS}
+    row["submitted_at"] = submission.submitted_at.isoformat()
+    return json.dumps(row, ensure_ascii=False).encode() + b"\n"
+
+
+def _write_segment(form_id: int, submissions: list[FormSubmission]) -> SubmissionArchive:
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as segment:
+        for submission in submissions:
+            segment.write(_encode(submission))
+    first, last = submissions[0], submissions[-1]
+    name = _storage().save(
+        f"archives/{form_id}/{first.pk}-{last.pk}.ndjson.gz", ContentFile(buffer.getvalue())
+    )
+
+    try:
+        with transaction.atomic():
+            archive = SubmissionArchive.objects.create(
+                form_id=form_id,
+                file=name,
+                period_start=first.submitted_at,
+                period_end=last.submitted_at,
+                row_count=len(submissions),
+                size=buffer.tell(),
+            )
+            ArchivedSubmission.objects.bulk_create(
+                ArchivedSubmission(submission_id=s.pk, form_id=form_id, archive=archive, instance_id=s.instance_id)
+                for s in submissions
+            )
+            # Attributing the delete to the archive leaves counters and rollups alone.
+            collector = Collector(using=router.db_for_write(FormSubmission), origin=archive)
+            collector.collect(FormSubmission.objects.filter(pk__in=[s.pk for s in submissions]))
+            collector.delete()
+            invalidate_form_responses(form_id)
+    except Exception:
+        _storage().delete(name)
+        raise
+    return archive
+
+
+def archive_form_submissions(form_id: int, before: datetime, *, segment_size: int = ARCHIVE_SEGMENT_SIZE) -> int:
+    """Archive a form's submissions older than ``before``, oldest first; returns the number moved."""
+    moved = 0
+    while True:
+        batch = list(_archivable(form_id, before).order_by("submitted_at", "id")[:segment_size])
+        if not batch:
+            return moved
+        _write_segment(form_id, batch)
+        moved += len(batch)
+        if len(batch) < segment_size:
+            return moved
+
+
+def archive_submissions(
+    older_than: timedelta | None = None, *, form_ids=None, segment_size: int = ARCHIVE_SEGMENT_SIZE
+) -> int:
+    """Archive every live form's submissions older than ``older_than``; returns the number moved."""
+    before = timezone.now() - (older_than if older_than is not None else archive_after())
+    forms = Form.objects.all() if form_ids is None else Form.objects.filter(pk__in=form_ids)
+    return sum(
+        archive_form_submissions(form_id, before, segment_size=segment_size)
+        for form_id in forms.order_by("pk").values_list("pk", flat=True)
+    )
+
+
+def _decode(line: bytes) -> FormSubmission:
+    row = json.loads(line)
+    submitted_at = parse_datetime(row.pop("submitted_at"))
+    submission = FormSubmission(**row)
+    submission.submitted_at = submitted_at
+    return submission
+
+
+def read_segment(archive: SubmissionArchive) -> list[FormSubmission]:
+    """Decode one segment's submissions, oldest first, with their users loaded."""
+    with _storage().open(archive.file.name, "rb") as stored, gzip.GzipFile(fileobj=stored) as segment:
+        submissions = [_decode(line) for line in segment if line.strip()]
+    _attach_users(submissions)
+    return submissions
+
+
+def _attach_users(submissions: list[FormSubmission]) -> None:
+    user_ids = {submission.user_id for submission in submissions if submission.user_id}
+    users = get_user_model()._base_manager.in_bulk(user_ids) if user_ids else {}
+    for submission in submissions:
+        submission.user = users.get(submission.user_id)
+
+
+def archived_page(
+    form_id: int,
+    *,
+    limit: int,
+    before: tuple[datetime, int] | None = None,
+    submitted_after: datetime | None = None,
+    submitted_before: datetime | None = None,
+    user_id: int | None = None,
+    instance_id: str | None = None,
+) -> list[FormSubmission]:
+    """Up to ``limit`` archived submissions newest first, below the ``(submitted_at, id)`` key ``before``.
+
+    Segments are read newest first and only until the page is full.
+    """
+    archives = SubmissionArchive.objects.filter(form_id=form_id).order_by("-period_end", "-pk")
+    if before is not None:
+        archives = archives.filter(period_start__lte=before[0])
+    if submitted_after is not None:
+        archives = archives.filter(period_end__gte=submitted_after)
+    if submitted_before is not None:
+        archives = archives.filter(period_start__lt=submitted_before)
+    if instance_id:
+        archives = archives.filter(entries__instance_id=instance_id)
+
+    page: list[FormSubmission] = []
+    for archive in archives.iterator():
+        for submission in reversed(read_segment(archive)):
+            key = (submission.submitted_at, submission.pk)
+            if before is not None and key >= before:
+                continue
+            if submitted_after is not None and submission.submitted_at < submitted_after:
+                continue
+            if submitted_before is not None and submission.submitted_at >= submitted_before:
+                continue
+            if user_id is not None and submission.user_id != user_id:
+                continue
+            if instance_id and submission.instance_id != instance_id:
+                continue
+            page.append(submission)
+        if len(page) >= limit:
+            break
+    page.sort(key=lambda submission: (submission.submitted_at, submission.pk), reverse=True)
+    return page[:limit]
+
+
+def has_archived_after(form_id: int, moment: datetime) -> bool:
+    """Whether any archived submission of the form may be newer than ``moment``."""
+    return SubmissionArchive.objects.filter(form_id=form_id, period_end__gte=moment).exists()
+
+
+def iter_archived(form_id: int, *, submitted_after: datetime | None = None, submitted_before: datetime | None = None):
+    """Yield archived submissions oldest first, one segment in memory at a time."""
+    archives = SubmissionArchive.objects.filter(form_id=form_id).order_by("period_start", "pk")
+    if submitted_after is not None:
+        archives = archives.filter(period_end__gte=submitted_after)
+    if submitted_before is not None:
+        archives = archives.filter(period_start__lt=submitted_before)
+    for archive in archives.iterator():
+        for submission in read_segment(archive):
+            if submitted_after is not None and submission.submitted_at < submitted_after:
+                continue
+            if submitted_before is not None and submission.submitted_at >= submitted_before:
+                continue
+            yield submission
+
+
+def find_archived(form_id: int, instance_ids) -> dict[str, FormSubmission]:
+    """Archived submissions of the form keyed by instanceID, reading each needed segment once."""
+    entries = ArchivedSubmission.objects.filter(form_id=form_id, instance_id__in=instance_ids)
+    wanted: dict[int, set[int]] = defaultdict(set)
+    for archive_id, submission_id in entries.values_list("archive_id", "submission_id"):
+        wanted[archive_id].add(submission_id)
+
+    found = {}
+    for archive in SubmissionArchive.objects.filter(pk__in=wanted):
+        for submission in read_segment(archive):
+            if submission.pk in wanted[archive.pk]:
+                found[submission.instance_id] = submission
+    return found
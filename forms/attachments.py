@@ -0,0 +1,265 @@
+"""Submission attachment storage: content-addressed blobs, resumable uploads, ranged downloads.
+
+Attachment bytes live in Django's storage under ``attachments/<aa>/<sha256><ext>``,
+so the same photo attached to several submissions is stored once. Rows
+reference blobs by name; a blob is removed when its last row is deleted.
+
+Large media can be uploaded in chunks: :func:`start_upload` opens (or
+resumes) an :class:`~forms.models.AttachmentUpload`, :func:`write_chunk`
+writes each chunk at its offset into a partial file, and the last chunk
+turns the upload into a SubmissionAttachment. A client that lost its
+connection asks for the session's offset and continues from there.
+
+Downloads stream from storage in fixed-size pieces (under ASGI too, see
+forms.streaming) and honour single ``Range: bytes=...`` requests, so media
+players can seek without the worker holding the file in memory.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+import os
+from pathlib import Path
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+from .conversion import hash_upload
+from .models import AttachmentUpload, FormSubmission, SubmissionAttachment
+from .streaming import stream_body
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class UploadOffsetMismatch(Exception):
+    """A chunk was sent for an offset other than the upload's current one."""
+
+    def __init__(self, offset: int) -> None:
+        super().__init__(f"Upload is at offset {offset}.")
+        self.offset = offset
+
+
+class InvalidUploadChunk(Exception):
+    """A chunk that cannot be applied to its upload; the message is safe to return to clients."""
+
+
+def _storage():
+    return SubmissionAttachment._meta.get_field("file").storage
+
+
+def blob_name(content_hash: str, filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    return f"attachments/{content_hash[:2]}/{content_hash}{extension}"
+
+
+def _store_blob(content: File, content_hash: str, filename: str) -> str:
+    """Return the storage name holding ``content``, saving it only if no identical blob exists."""
+    shared = SubmissionAttachment.objects.filter(content_hash=content_hash).values_list("file", flat=True).first()
+    if shared:
+        return shared
+    storage = _storage()
+    name = blob_name(content_hash, filename)
+    if storage.exists(name):
+        return name
+    # Uploads spooled to disk are moved into FileSystemStorage, not copied.
+    return storage.save(name, content)
+
+
+def release_blob(name: str) -> None:
+    """Delete a stored blob once no attachment references it."""
+    if name and not SubmissionAttachment.objects.filter(file=name).exists():
+        _storage().delete(name)
+
+
+def store_attachment(
+    submission: FormSubmission, name: str, content: File, *, content_type: str = ""
+) -> tuple[SubmissionAttachment, bool]:
+    """Attach ``content`` to a submission under ``name``; returns ``(attachment, created)``.
+
+    An attachment already stored under that name is kept as is, so clients
+    may resend media safely.
+    """
+    name = os.path.basename(name)
+    existing = SubmissionAttachment.objects.filter(submission=submission, name=name).first()
+    if existing is not None:
+        return existing, False
+
+    content_hash = hash_upload(content)
+    attachment = SubmissionAttachment(
+        submission=submission,
+        name=name,
+        content_type=content_type,
+        size=content.size,
+        content_hash=content_hash,
+    )
+    attachment.file.name = _store_blob(content, content_hash, name)
+    try:
+        with transaction.atomic():
+            attachment.save()
+    except IntegrityError:
+        # A concurrent request stored the same name first.
+        release_blob(attachment.file.name)
+        return SubmissionAttachment.objects.get(submission=submission, name=name), False
+    return attachment, True
+
+
+def upload_dir() -> Path:
+    configured = getattr(settings, "XFORMS_ATTACHMENT_UPLOAD_DIR", None)
+    return Path(configured) if configured else Path(settings.MEDIA_ROOT) / "partial_uploads"
+
+
+def partial_path(upload: AttachmentUpload) -> Path:
+    return upload_dir() / str(upload.upload_id)
+
+
+def start_upload(
+    submission: FormSubmission, name: str, size: int, *, content_type: str = ""
+) -> AttachmentUpload | SubmissionAttachment:
+    """Open or resume the upload of ``name``; returns the attachment if it is already stored.
+
+    Starting again with a different size discards the bytes received so far.
+    """
+    name = os.path.basename(name)
+    existing = SubmissionAttachment.objects.filter(submission=submission, name=name).first()
+    if existing is not None:
+        return existing
+
+    upload, created = AttachmentUpload.objects.get_or_create(
+        submission=submission, name=name, defaults={"size": size, "content_type": content_type}
+    )
+    if not created and upload.size != size:
+        upload.size, upload.offset, upload.content_type = size, 0, content_type
+        upload.save(update_fields=["size", "offset", "content_type", "updated_at"])
+        partial_path(upload).unlink(missing_ok=True)
+
+    if upload.size == 0:
+        partial_path(upload).parent.mkdir(parents=True, exist_ok=True)
+        partial_path(upload).touch()
+        return finish_upload(upload)
+    return upload
+
+
+def write_chunk(upload: AttachmentUpload, offset: int, stream, length: int) -> SubmissionAttachment | None:
+    """Write ``length`` bytes read from ``stream`` at ``offset``.
+
+    Bytes are written in place rather than appended, so a retried chunk
+    simply overwrites what an interrupted attempt left behind; the offset
+    only advances (with a conditional UPDATE) once the whole chunk is on
+    disk. Returns the stored attachment when this chunk completed the file.
+    """
+    if offset != upload.offset:
+        raise UploadOffsetMismatch(upload.offset)
+    if length <= 0 or offset + length > upload.size:
+        raise InvalidUploadChunk(f"Chunk of {length} bytes at offset {offset} does not fit a {upload.size}-byte upload.")
+
+    path = partial_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open(path, "r+b" if path.exists() else "wb") as partial:
+        partial.seek(offset)
+        while written < length:
+            piece = stream.read(min(STREAM_CHUNK_SIZE, length - written))
+            if not piece:
+                break
+            partial.write(piece)
+            written += len(piece)
+    if written != length:
+        raise InvalidUploadChunk(f"Expected {length} bytes, received {written}.")
+
+    advanced = AttachmentUpload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=offset + written, updated_at=timezone.now()
+    )
+    if not advanced:
+        upload.refresh_from_db(fields=["offset"])
+        raise UploadOffsetMismatch(upload.offset)
+    upload.offset = offset + written
+
+    if upload.offset == upload.size:
+        return finish_upload(upload)
+    return None
+
+
+class _PartialFile(File):
+    # Lets FileSystemStorage move the partial file into place instead of copying it.
+    def temporary_file_path(self) -> str:
+        return self.file.name
+
+
+def finish_upload(upload: AttachmentUpload) -> SubmissionAttachment:
+    path = partial_path(upload)
+    with open(path, "rb") as handle:
+        attachment, _ = store_attachment(
+            upload.submission, upload.name, _PartialFile(handle, name=upload.name), content_type=upload.content_type
+        )
+    upload.delete()
+    return attachment
+
+
+def purge_stale_uploads(older_than: timedelta) -> int:
+    """Delete uploads (and their partial files) not written to within ``older_than``."""
+    stale = AttachmentUpload.objects.filter(updated_at__lt=timezone.now() - older_than)
+    count = 0
+    for upload in stale.iterator():
+        upload.delete()
+        count += 1
+    return count
+
+
+def _iter_range(handle, start: int, length: int):
+    try:
+        handle.seek(start)
+        while length > 0:
+            piece = handle.read(min(STREAM_CHUNK_SIZE, length))
+            if not piece:
+                break
+            length -= len(piece)
+            yield piece
+    finally:
+        handle.close()
+
+
+def attachment_response(request, attachment: SubmissionAttachment) -> HttpResponse:
+    """Stream an attachment, honouring a single-range ``Range`` header."""
+    storage = _storage()
+    size = attachment.size
+    content_type = attachment.content_type or "application/octet-stream"
+    match = RANGE_RE.match(request.headers.get("Range", "").strip())
+
+    if match is None or not (match[1] or match[2]):
+        handle = storage.open(attachment.file.name, "rb")
+        response = StreamingHttpResponse(
+            stream_body(request, _iter_range(handle, 0, size)), content_type=content_type
+        )
+        response["Content-Length"] = str(size)
+    else:
+        if match[1]:
+            start = int(match[1])
+            end = min(int(match[2]), size - 1) if match[2] else size - 1
+        else:
+            start, end = max(size - int(match[2]), 0), size - 1
+            if not int(match[2]):
+                start = size
+        if start > end or start >= size:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        handle = storage.open(attachment.file.name, "rb")
+        response = StreamingHttpResponse(
+            stream_body(request, _iter_range(handle, start, end - start + 1)), status=206, content_type=content_type
+        )
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = content_disposition_header(False, attachment.name)
+    if attachment.content_hash:
+        response["ETag"] = f'"{attachment.content_hash}"'
+    return response
@@ -0,0 +1,88 @@
+"""Cache for form list and form detail responses.
+
+Both endpoints serve read-mostly data that changes only when a form or its
+submissions do. Their payloads are kept in the Django cache named by
+``XFORMS_RESPONSE_CACHE_ALIAS`` (see ``CACHES`` in ``config.settings``) for
+``XFORMS_RESPONSE_CACHE_TIMEOUT`` seconds, so repeat reads skip the ORM.
+
+Entries are never deleted one by one; every key embeds a generation token
+instead. There is one token for the list and one per form. A change
+replaces the affected tokens, and the old entries simply age out. This
+covers every cursor, limit and field projection at once. Tokens are
+replaced on ``Form`` and ``FormSubmission`` save/delete signals, after bulk
+ingest, and when a segment is archived. Inside a transaction they are
+replaced again on commit, so a reader that cached pre-commit data during
+the transaction does not keep serving it.
+
+The local-memory backend is private to each process. With several worker
+processes use a shared backend (e.g. the file-based one), or other workers
+keep serving a changed form until the timeout.
+"""
+
+from __future__ import annotations
+
+from functools import partial
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+CACHE_KEY_PREFIX = "xforms:responses"
+LIST_GENERATION_KEY = f"{CACHE_KEY_PREFIX}:list"
+
+
+def response_cache():
+    """The configured cache, or None when response caching is disabled."""
+    alias = getattr(settings, "XFORMS_RESPONSE_CACHE_ALIAS", "default")
+    return caches[alias] if alias else None
+
+
+def response_cache_timeout() -> int:
+    return getattr(settings, "XFORMS_RESPONSE_CACHE_TIMEOUT", 300)
+
+
+def _form_generation_key(form_id: int) -> str:
+    return f"{CACHE_KEY_PREFIX}:form:{form_id}"
+
+
+def _new_generation() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def _variant(request) -> str:
+    return hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+
+
+async def _entry_key(cache, generation_key: str, request) -> str:
+    generation = await cache.aget(generation_key)
+    if generation is None:
+        # Tokens outlive the entries they cover.
+        generation = _new_generation()
+        if not await cache.aadd(generation_key, generation, None):
+            generation = await cache.aget(generation_key, generation)
+    return f"{generation_key}:{generation}:{_variant(request)}"
+
+
+async def list_cache_key(cache, request) -> str:
+    return await _entry_key(cache, LIST_GENERATION_KEY, request)
+
+
+async def form_cache_key(cache, form_id: int, request) -> str:
+    return await _entry_key(cache, _form_generation_key(form_id), request)
+
+
+def _replace_generations(keys: list[str]) -> None:
+    cache = response_cache()
+    if cache is not None:
+        cache.set_many({key: _new_generation() for key in keys}, None)
+
+
+def invalidate_form_responses(*form_ids: int) -> None:
+    """Drop cached list pages and the detail responses of ``form_ids``."""
+    keys = [LIST_GENERATION_KEY, *(_form_generation_key(form_id) for form_id in form_ids)]
+    _replace_generations(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(_replace_generations, keys))
@@ -0,0 +1,172 @@
+"""Optional transparent compression of stored XML.
+
+``Form.xml_definition``, ``FormVersion.xml_definition`` and
+``FormSubmission.xml_submission`` are :class:`CompressedTextField` columns.
+Models always see plain text. With ``XFORMS_XML_COMPRESSION`` on, writes
+store zlib-compressed text instead. Submissions are compressed with their
+form's newest :class:`~forms.models.CompressionDictionary`, a preset
+dictionary built from sample submissions. Verbose, repetitive instances of
+one form then shrink to a fraction of their size, even short ones that
+PostgreSQL's TOAST compression never touches.
+
+Compressed values stay in the text column (no type change, no table
+rewrite) as ``zx:<dictionary id or 0>:<base64 zlib stream>``. Reads
+recognise that prefix, so plain and compressed rows can coexist and the
+setting can be switched either way at any time. SQL cannot look inside
+compressed values: search uses the structured ``data`` column instead.
+``manage.py compress_submissions`` trains dictionaries and compresses
+existing rows in batches.
+"""
+
+from __future__ import annotations
+
+import base64
+from collections import OrderedDict
+import threading
+import time
+import zlib
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+
+COMPRESSED_PREFIX = "zx:"
+ZLIB_WINDOW_SIZE = 32 * 1024
+DICTIONARY_SAMPLE_COUNT = 200
+DICTIONARY_CACHE_SIZE = 64
+DICTIONARY_RECHECK_SECONDS = 60
+
+
+def compression_enabled() -> bool:
+    return getattr(settings, "XFORMS_XML_COMPRESSION", False)
+
+
+def compression_level() -> int:
+    return getattr(settings, "XFORMS_XML_COMPRESSION_LEVEL", 6)
+
+
+def is_compressed(value) -> bool:
+    return isinstance(value, str) and value.startswith(COMPRESSED_PREFIX)
+
+
+class _DictionaryCache:
+    """Dictionary bytes by id (rows are immutable) and each form's newest dictionary.
+
+    A form's newest dictionary id is looked up again once it is
+    ``DICTIONARY_RECHECK_SECONDS`` old. Dictionaries trained by another
+    process (``compress_submissions``) are therefore picked up without a
+    restart; the bytes themselves are only ever loaded once.
+    """
+
+    def __init__(self, maxsize: int = DICTIONARY_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._by_id: OrderedDict[int, bytes] = OrderedDict()
+        self._current: OrderedDict[int, tuple[float, int | None]] = OrderedDict()
+
+    def _remember(self, cache: OrderedDict, key, value) -> None:
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.maxsize:
+                cache.popitem(last=False)
+
+    def get(self, dictionary_id: int) -> bytes:
+        with self._lock:
+            data = self._by_id.get(dictionary_id)
+        if data is None:
+            model = apps.get_model("forms", "CompressionDictionary")
+            data = bytes(model.objects.values_list("data", flat=True).get(pk=dictionary_id))
+            self._remember(self._by_id, dictionary_id, data)
+        return data
+
+    def current(self, form_id: int) -> tuple[int, bytes] | None:
+        with self._lock:
+            entry = self._current.get(form_id)
+        if entry is None or time.monotonic() - entry[0] >= DICTIONARY_RECHECK_SECONDS:
+            model = apps.get_model("forms", "CompressionDictionary")
+            newest = model.objects.filter(form_id=form_id).order_by("-pk").values_list("pk", flat=True).first()
+            entry = (time.monotonic(), newest)
+            self._remember(self._current, form_id, entry)
+        return (entry[1], self.get(entry[1])) if entry[1] is not None else None
+
+    def forget(self, form_id: int) -> None:
+        with self._lock:
+            self._current.pop(form_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_id.clear()
+            self._current.clear()
+
+
+dictionary_cache = _DictionaryCache()
+
+
+def compress_text(text: str, dictionary: tuple[int, bytes] | None = None) -> str:
+    dictionary_id, zdict = dictionary or (0, b"")
+    compressor = (
+        zlib.compressobj(compression_level(), zdict=zdict) if zdict else zlib.compressobj(compression_level())
+    )
+    packed = compressor.compress(text.encode("utf-8")) + compressor.flush()
+    return f"{COMPRESSED_PREFIX}{dictionary_id}:{base64.b64encode(packed).decode('ascii')}"
+
+
+def decompress_text(value: str) -> str:
+    dictionary_id, _, payload = value[len(COMPRESSED_PREFIX):].partition(":")
+    dictionary_id = int(dictionary_id)
+    if dictionary_id:
+        decompressor = zlib.decompressobj(zdict=dictionary_cache.get(dictionary_id))
+    else:
+        decompressor = zlib.decompressobj()
+    return (decompressor.decompress(base64.b64decode(payload)) + decompressor.flush()).decode("utf-8")
+
+
+def train_dictionary(samples: list[str]) -> bytes:
+    """Build a zlib preset dictionary from sample documents.
+
+    zlib has no dictionary trainer. It matches against the last 32 KiB of
+    the preset, so this keeps the most recent samples and places them
+    nearest the end, where matches are cheapest to encode.
+    """
+    data = b""
+    for sample in samples:
+        data = sample.encode("utf-8") + data
+        if len(data) >= ZLIB_WINDOW_SIZE:
+            break
+    return data[-ZLIB_WINDOW_SIZE:]
+
+
+class CompressedTextField(models.TextField):
+    """A TextField whose stored value may be zlib-compressed; see the module docstring.
+
+    ``dictionary_from`` names the instance attribute holding the form id
+    whose dictionary compresses the value (none for definitions).
+    """
+
+    def __init__(self, *args, dictionary_from: str | None = None, **kwargs) -> None:
+        self.dictionary_from = dictionary_from
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dictionary_from:
+            kwargs["dictionary_from"] = self.dictionary_from
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return decompress_text(value) if is_compressed(value) else value
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if not compression_enabled() or not isinstance(value, str) or is_compressed(value):
+            return value
+        form_id = getattr(model_instance, self.dictionary_from, None) if self.dictionary_from else None
+        return compress_text(value, dictionary_cache.current(form_id) if form_id else None)
+
+    def get_db_prep_save(self, value, connection):
+        # Queryset update() and bulk_update() bypass pre_save: compress without a dictionary.
+        if compression_enabled() and isinstance(value, str) and not is_compressed(value):
+            value = compress_text(value)
+        return super().get_db_prep_save(value, connection)
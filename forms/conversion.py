@@ -0,0 +1,326 @@
+"""XLSForm -> XForm conversion and its result cache.
+
+Conversion runs entirely in memory using pyxform's building blocks: the
+workbook is passed as bytes and the XForm comes back as a string. ``pyxform.convert``
+itself is avoided because ``Survey.to_xml`` round-trips through a temp file.
+
+Conversions are keyed by the SHA-256 of the uploaded workbook bytes, the
+fallback form name and the installed pyxform version, so re-uploading an
+unchanged workbook skips pyxform entirely and upgrading pyxform naturally
+invalidates old results. Lookups go
+through a bounded in-process LRU first and then the configured Django cache.
+
+Cache misses are converted in a bounded pool of worker processes (see
+:class:`ConversionPool`) so a pathological workbook cannot pin a request
+worker or its GIL.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import threading
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; CPU limits are skipped there.
+    resource = None
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Try to import pyxform
+try:
+    from pyxform import __version__ as PYXFORM_VERSION
+    from pyxform.builder import create_survey_element_from_dict
+    from pyxform.xls2json import workbook_to_json
+    from pyxform.xls2json_backends import get_xlsform
+    PYXFORM_AVAILABLE = True
+except ImportError as e:
+    PYXFORM_VERSION = "unavailable"
+    PYXFORM_AVAILABLE = False
+    logging.getLogger(__name__).warning("pyxform not available: %s", e)
+
+
+CACHE_KEY_PREFIX = "xforms:xls2xform"
+VERSION_ATTR_RE = re.compile(r'version="([^"]+)"')
+UNSAFE_NAME_CHARS_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+DEFAULT_FORM_NAME = "data"
+
+
+def fallback_form_name(filename: str) -> str:
+    """Form id and title for a workbook without ``form_id``/``form_title`` settings.
+
+    Derived from the upload's file name (``Household Survey.xlsx`` ->
+    ``Household_Survey``), as pyxform itself does for files on disk.
+    """
+    stem = os.path.splitext(os.path.basename(filename or ""))[0]
+    name = UNSAFE_NAME_CHARS_RE.sub("_", stem).strip("_.-")
+    if not name:
+        return DEFAULT_FORM_NAME
+    return name if name[0].isalpha() or name[0] == "_" else f"_{name}"
+
+
+def convert_xlsform(
+    source: bytes | str | os.PathLike[str],
+    *,
+    file_type: str | None = None,
+    form_name: str | None = None,
+) -> tuple[str, str]:
+    """Convert an XLSForm to an XForm and return ``(xml_definition, version)``.
+
+    ``source`` is either the workbook bytes or a filesystem path and
+    ``file_type`` its extension (e.g. ``".xlsx"``). ``form_name`` is the
+    fallback form id and title; without it pyxform uses the path's stem, or
+    ``"data"`` for bytes. pyxform errors propagate unchanged; callers
+    translate them for the API.
+    """
+    workbook_dict = get_xlsform(xlsform=source, file_type=file_type)
+    pyxform_data = workbook_to_json(
+        workbook_dict=workbook_dict,
+        fallback_form_name=form_name or workbook_dict.fallback_form_name,
+        warnings=[],
+    )
+    survey = create_survey_element_from_dict(pyxform_data)
+
+    to_pretty_xml = getattr(survey, "_to_pretty_xml", None)
+    if to_pretty_xml is not None:
+        xml_definition = to_pretty_xml()
+    else:
+        xml_definition = survey.to_xml(validate=False, pretty_print=True)
+
+    version_match = VERSION_ATTR_RE.search(xml_definition)
+    return xml_definition, version_match.group(1) if version_match else ""
+
+
+class ConversionPoolBusy(Exception):
+    """Raised when every conversion slot (running + queued) is taken."""
+
+
+class ConversionTimeout(Exception):
+    """Raised when a conversion does not finish within the wall-clock timeout."""
+
+
+class ConversionAborted(Exception):
+    """Raised when a worker died mid-conversion, e.g. after hitting its CPU limit."""
+
+
+def _run_with_cpu_limit(cpu_limit: int | None, fn, *args, **kwargs):
+    """Worker-side wrapper: cap the CPU seconds this job may use, then run it.
+
+    RLIMIT_CPU is cumulative for the process, so the soft limit is set to the
+    CPU already used plus ``cpu_limit``. Exceeding it kills the worker with
+    SIGXCPU, which the parent sees as a broken pool.
+    """
+    if not cpu_limit or resource is None:
+        return fn(*args, **kwargs)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    limit = int(usage.ru_utime + usage.ru_stime) + cpu_limit
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+class ConversionPool:
+    """Bounded process pool for CPU-bound conversions, created lazily per process.
+
+    Configured from settings on each call (the pool is rebuilt if they change):
+
+    - ``XFORMS_CONVERSION_WORKERS``: worker processes; 0 runs jobs inline.
+    - ``XFORMS_CONVERSION_QUEUE_SIZE``: jobs allowed to wait for a free worker.
+      Beyond workers + queue, :meth:`run` fails fast with ConversionPoolBusy.
+    - ``XFORMS_CONVERSION_TIMEOUT``: seconds a caller waits for a result.
+    - ``XFORMS_CONVERSION_CPU_LIMIT``: CPU seconds a single job may consume.
+
+    A slot is only released when its job actually finishes, so a job that
+    outlives the caller's timeout keeps counting against the bound until its
+    CPU limit kills it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots: threading.BoundedSemaphore | None = None
+        self._config: tuple | None = None
+
+    @staticmethod
+    def _settings() -> tuple[int, int, float, int]:
+        return (
+            getattr(settings, "XFORMS_CONVERSION_WORKERS", 2),
+            getattr(settings, "XFORMS_CONVERSION_QUEUE_SIZE", 4),
+            getattr(settings, "XFORMS_CONVERSION_TIMEOUT", 60),
+            getattr(settings, "XFORMS_CONVERSION_CPU_LIMIT", 60),
+        )
+
+    def _ensure_executor(self, workers: int, queue_size: int) -> tuple[ProcessPoolExecutor, threading.BoundedSemaphore]:
+        with self._lock:
+            if self._executor is None or self._config != (workers, queue_size):
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                # spawn rather than fork: request workers are multi-threaded.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._slots = threading.BoundedSemaphore(workers + queue_size)
+                self._config = (workers, queue_size)
+            return self._executor, self._slots
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._config = None
+
+    def run(self, fn, *args, **kwargs):
+        workers, queue_size, timeout, cpu_limit = self._settings()
+        if workers <= 0:
+            return fn(*args, **kwargs)
+
+        executor, slots = self._ensure_executor(workers, queue_size)
+        if not slots.acquire(blocking=False):
+            raise ConversionPoolBusy("All XLSForm conversion workers are busy.")
+
+        try:
+            future = executor.submit(_run_with_cpu_limit, cpu_limit, fn, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _future: slots.release())
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError as exc:
+            raise ConversionTimeout(f"XLSForm conversion did not finish within {timeout} seconds.") from exc
+        except BrokenProcessPool as exc:
+            self._discard_executor(executor)
+            raise ConversionAborted("XLSForm conversion was aborted (CPU limit exceeded).") from exc
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._config = None
+
+
+conversion_pool = ConversionPool()
+
+
+def convert_upload(uploaded_file, *, pool: ConversionPool | None = None) -> tuple[str, str]:
+    """Convert an uploaded (or stored) workbook, going through the conversion cache.
+
+    Returns ``(xml_definition, version)``. Workbooks without a ``form_id``
+    setting get an id and title derived from ``uploaded_file.name`` (see
+    :func:`fallback_form_name`). With a ``pool`` the conversion runs there
+    and may raise its ConversionPoolBusy/Timeout/Aborted errors; without
+    one it runs inline. pyxform errors propagate unchanged.
+    """
+    form_name = fallback_form_name(uploaded_file.name)
+    cache_key = conversion_cache_key(hash_upload(uploaded_file), form_name)
+    cached = conversion_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    file_type = os.path.splitext(uploaded_file.name)[1].lower()
+
+    # Always bytes, also for uploads Django spooled to disk, whose temp
+    # file name says nothing about the upload.
+    uploaded_file.seek(0)
+    source = uploaded_file.read()
+
+    if pool is not None:
+        result = pool.run(convert_xlsform, source, file_type=file_type, form_name=form_name)
+    else:
+        result = convert_xlsform(source, file_type=file_type, form_name=form_name)
+
+    conversion_cache.set(cache_key, result)
+    return result
+
+
+def hash_upload(uploaded_file) -> str:
+    """Return the SHA-256 hex digest of an uploaded file, read chunk by chunk."""
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def conversion_cache_key(content_hash: str, form_name: str = DEFAULT_FORM_NAME) -> str:
+    return f"{CACHE_KEY_PREFIX}:{PYXFORM_VERSION}:{content_hash}:{form_name}"
+
+
+class ConversionCache:
+    """Two-tier (local LRU + Django cache) store of ``(xml_definition, version)`` results.
+
+    Tier sizes are read from settings on every call so ``override_settings``
+    works in tests:
+
+    - ``XFORMS_CONVERSION_CACHE_SIZE``: max entries kept in-process (0 disables the tier).
+    - ``XFORMS_CONVERSION_CACHE_ALIAS``: Django cache alias for the shared tier (None disables it).
+    - ``XFORMS_CONVERSION_CACHE_TIMEOUT``: shared-tier timeout in seconds.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _max_entries() -> int:
+        return getattr(settings, "XFORMS_CONVERSION_CACHE_SIZE", 64)
+
+    @staticmethod
+    def _shared_cache():
+        alias = getattr(settings, "XFORMS_CONVERSION_CACHE_ALIAS", "default")
+        return caches[alias] if alias else None
+
+    def get(self, key: str) -> tuple[str, str] | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+
+        shared = self._shared_cache()
+        value = shared.get(key) if shared is not None else None
+        if value is not None:
+            value = tuple(value)
+            self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: tuple[str, str]) -> None:
+        self._remember(key, value)
+        shared = self._shared_cache()
+        if shared is not None:
+            shared.set(key, value, getattr(settings, "XFORMS_CONVERSION_CACHE_TIMEOUT", 24 * 60 * 60))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, value: tuple[str, str]) -> None:
+        max_entries = self._max_entries()
+        if max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+
+conversion_cache = ConversionCache()
@@ -0,0 +1,185 @@
+"""Denormalized per-form submission counters and hourly rollups.
+
+``Form.submission_count`` and ``Form.last_submitted_at`` are maintained with
+single-row ``UPDATE``s using database-side expressions, in the same
+transaction as the inserts/deletes they account for, so concurrent writers
+never lose an increment. :class:`~forms.models.SubmissionRollup` rows (one
+per form, UTC hour and user) are kept the same way and back the statistics
+endpoint. ``manage.py rebuild_submission_counters`` recomputes both from
+``FormSubmission`` and the archive segments (see forms.archive) if they
+ever drift.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, TruncDay, TruncHour, TruncWeek
+
+from .caching import invalidate_form_responses
+from .archive import iter_archived
+from .models import Form, FormSubmission, SubmissionArchive, SubmissionRollup
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    """The start of the UTC hour containing ``moment``."""
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+STATS_TRUNCATORS = {"hour": TruncHour, "day": TruncDay, "week": TruncWeek}
+
+
+def _rollup_rows(form_id: int, bucket_start: datetime, user_id: int | None):
+    return SubmissionRollup.objects.filter(form_id=form_id, bucket_start=bucket_start, user_id=user_id)
+
+
+def record_submissions(form_id: int, submissions: Sequence[FormSubmission]) -> None:
+    """Account for newly stored ``submissions`` of one form; call inside their transaction."""
+    if not submissions:
+        return
+    last_submitted_at = max(submission.submitted_at for submission in submissions)
+    Form.objects.filter(pk=form_id).update(
+        submission_count=F("submission_count") + len(submissions),
+        # Greatest() is NULL on SQLite if any argument is, hence the Coalesce.
+        last_submitted_at=Greatest(Coalesce("last_submitted_at", Value(last_submitted_at)), Value(last_submitted_at)),
+    )
+
+    buckets = Counter((hour_bucket(submission.submitted_at), submission.user_id) for submission in submissions)
+    for (bucket_start, user_id), count in buckets.items():
+        rows = _rollup_rows(form_id, bucket_start, user_id)
+        if rows.update(count=F("count") + count):
+            continue
+        try:
+            with transaction.atomic():
+                SubmissionRollup.objects.create(form_id=form_id, bucket_start=bucket_start, user_id=user_id, count=count)
+        except IntegrityError:
+            # A concurrent writer opened the bucket first.
+            rows.update(count=F("count") + count)
+
+
+def _latest_submitted_at():
+    """The newest live or archived submission time of the outer form."""
+    live = Subquery(
+        FormSubmission.objects.filter(form=OuterRef("pk")).order_by("-submitted_at").values("submitted_at")[:1]
+    )
+    archived = Subquery(
+        SubmissionArchive.objects.filter(form=OuterRef("pk")).order_by("-period_end").values("period_end")[:1]
+    )
+    # Greatest() is NULL on SQLite if any argument is, hence the Coalesces.
+    return Greatest(Coalesce(live, archived), Coalesce(archived, live))
+
+
+def forget_submission(form_id: int, submitted_at: datetime, user_id: int | None = None) -> None:
+    """Account for one deleted submission.
+
+    ``last_submitted_at`` is only recomputed (one lookup on the
+    (form, submitted_at) index) when the deleted row was the newest.
+    """
+    _rollup_rows(form_id, hour_bucket(submitted_at), user_id).update(count=Greatest(F("count") - 1, Value(0)))
+    Form.objects.filter(pk=form_id).update(
+        submission_count=Greatest(F("submission_count") - 1, Value(0)),
+        last_submitted_at=Case(
+            When(last_submitted_at__lte=submitted_at, then=_latest_submitted_at()),
+            default=F("last_submitted_at"),
+        ),
+    )
+
+
+def rebuild_counters(form_ids=None) -> int:
+    """Recompute the counters from FormSubmission and the archive segments'
+    row counts and periods; returns the number of forms updated."""
+    counts = (
+        FormSubmission.objects.filter(form=OuterRef("pk"))
+        .order_by()
+        .values("form")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    archived_counts = (
+        SubmissionArchive.objects.filter(form=OuterRef("pk"))
+        .order_by()
+        .values("form")
+        .annotate(total=Sum("row_count"))
+        .values("total")
+    )
+    forms = Form.objects.all() if form_ids is None else Form.objects.filter(pk__in=form_ids)
+    updated = forms.update(
+        submission_count=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+        + Coalesce(Subquery(archived_counts, output_field=IntegerField()), Value(0)),
+        last_submitted_at=_latest_submitted_at(),
+    )
+    invalidate_form_responses(*forms.values_list("pk", flat=True))
+    return updated
+
+
+def _archived_buckets(form_ids=None) -> Counter:
+    """Archived submissions per (form, UTC hour, user), read from the segments."""
+    archives = SubmissionArchive.objects.all() if form_ids is None else SubmissionArchive.objects.filter(form__in=form_ids)
+    buckets = Counter()
+    for form_id in archives.order_by("form_id").values_list("form_id", flat=True).distinct():
+        for submission in iter_archived(form_id):
+            buckets[(form_id, hour_bucket(submission.submitted_at), submission.user_id)] += 1
+    return buckets
+
+
+def _rebuilt_rollups(groups, archived: Counter):
+    for row in groups.iterator():
+        key = (row["form_id"], row["bucket"], row["user_id"])
+        yield SubmissionRollup(
+            form_id=key[0], bucket_start=key[1], user_id=key[2], count=row["total"] + archived.pop(key, 0)
+        )
+    for (form_id, bucket_start, user_id), count in archived.items():
+        yield SubmissionRollup(form_id=form_id, bucket_start=bucket_start, user_id=user_id, count=count)
+
+
+def rebuild_rollups(form_ids=None) -> int:
+    """Recompute the hourly rollups from FormSubmission and the archive
+    segments; returns the number of rows written."""
+    submissions = FormSubmission.objects.all() if form_ids is None else FormSubmission.objects.filter(form__in=form_ids)
+    groups = (
+        submissions.order_by()
+        .annotate(bucket=TruncHour("submitted_at", tzinfo=timezone.utc))
+        .values("form_id", "bucket", "user_id")
+        .annotate(total=Count("pk"))
+    )
+    rollups = SubmissionRollup.objects.all() if form_ids is None else SubmissionRollup.objects.filter(form__in=form_ids)
+    archived = _archived_buckets(form_ids)
+    with transaction.atomic():
+        rollups.delete()
+        created = SubmissionRollup.objects.bulk_create(_rebuilt_rollups(groups, archived), batch_size=1000)
+    return len(created)
+
+
+def submission_stats(form_id: int, *, interval: str, start: datetime, end: datetime, tzinfo) -> dict:
+    """Aggregate a form's rollups between ``start`` and ``end`` into per-period and per-user counts.
+
+    Reads only SubmissionRollup rows, so the cost grows with the number of
+    hours and users in the range, never with the number of submissions.
+    Periods are truncated in ``tzinfo``; periods without submissions are omitted.
+    """
+    rollups = SubmissionRollup.objects.filter(
+        form_id=form_id, bucket_start__gte=hour_bucket(start), bucket_start__lt=end, count__gt=0
+    ).order_by()
+    series = (
+        rollups.annotate(period=STATS_TRUNCATORS[interval]("bucket_start", tzinfo=tzinfo))
+        .values("period")
+        .annotate(count=Sum("count"))
+        .order_by("period")
+    )
+    users = (
+        rollups.values("user_id", "user__username")
+        .annotate(count=Sum("count"))
+        .order_by("-count", "user_id")
+    )
+    series = [{"period": row["period"], "count": row["count"]} for row in series]
+    return {
+        "total": sum(row["count"] for row in series),
+        "series": series,
+        "users": [
+            {"user_id": row["user_id"], "username": row["user__username"], "count": row["count"]} for row in users
+        ],
+    }
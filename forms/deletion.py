@@ -0,0 +1,91 @@
+"""Deferred deletion of forms with large submission histories.
+
+Deleting a form through the API only sets ``Form.deleted_at``: the form
+disappears from ``Form.objects`` (and so from every endpoint) at once, and
+its name is free for reuse. ``manage.py reap_deleted_forms`` then removes
+the submissions in small batches, each in its own short transaction, so
+concurrent ingest into other forms never waits behind one huge cascade.
+Attachment blobs, archive segments and workbooks no longer referenced are
+deleted from storage once their rows are gone.
+"""
+
+from __future__ import annotations
+
+from functools import partial
+import time
+
+from django.db import router, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from .models import Form, FormSubmission, SubmissionRollup
+from .versions import release_workbook
+
+
+REAP_BATCH_SIZE = 500
+
+
+def soft_delete_form(form: Form) -> None:
+    """Hide ``form`` immediately; its data is removed by :func:`reap_deleted_forms`."""
+    form.deleted_at = timezone.now()
+    form.save(update_fields=["deleted_at"])
+
+
+def _delete_submission_batch(form: Form, batch_size: int) -> int:
+    ids = list(FormSubmission.objects.filter(form=form).order_by().values_list("pk", flat=True)[:batch_size])
+    if not ids:
+        return 0
+    # Attributing the delete to the form skips the per-row counter updates.
+    collector = Collector(using=router.db_for_write(FormSubmission), origin=form)
+    collector.collect(FormSubmission.objects.filter(pk__in=ids))
+    collector.delete()
+    return len(ids)
+
+
+def _delete_rollups(form: Form, batch_size: int) -> None:
+    while True:
+        ids = list(SubmissionRollup.objects.filter(form=form).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return
+        SubmissionRollup.objects.filter(pk__in=ids).delete()
+
+
+def _finish(form: Form, batch_size: int) -> None:
+    _delete_rollups(form, batch_size)
+    # One segment (and its index entries) per transaction.
+    for archive in form.archives.all():
+        archive.delete()
+    workbooks = {name for name in form.versions.values_list("xls_form", flat=True) if name}
+    if form.xls_form:
+        workbooks.add(form.xls_form.name)
+    with transaction.atomic():
+        form.delete()
+        for name in workbooks:
+            transaction.on_commit(partial(release_workbook, name))
+
+
+def reap_deleted_forms(
+    *, batch_size: int = REAP_BATCH_SIZE, max_batches: int | None = None, pause: float = 0
+) -> tuple[int, int]:
+    """Remove soft-deleted forms and their data; returns ``(forms, submissions)`` removed.
+
+    Stops after ``max_batches`` submission batches, leaving the rest for the
+    next run, and sleeps ``pause`` seconds between batches to give other
+    writers the database.
+    """
+    forms_removed = submissions_removed = batches = 0
+    for form in Form.all_objects.filter(deleted_at__isnull=False).order_by("deleted_at", "pk"):
+        while True:
+            if max_batches is not None and batches >= max_batches:
+                return forms_removed, submissions_removed
+            deleted = _delete_submission_batch(form, batch_size)
+            if deleted:
+                batches += 1
+                submissions_removed += deleted
+            if deleted < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        _finish(form, batch_size)
+        forms_removed += 1
+    return forms_removed, submissions_removed
@@ -0,0 +1,234 @@
+"""Submission ingest shared by the single and bulk submission endpoints.
+
+Every payload goes through :func:`prepare_submission`, which parses the XML
+once and builds an unsaved FormSubmission, including its flattened ``data``
+so later readers never have to re-parse the XML. The single path saves it directly;
+the bulk path collects the valid ones and writes them with one
+``bulk_create`` inside a single transaction. On SQLite both writes are
+queued on an in-process lock (see forms.writes).
+
+Both paths are idempotent on the OpenRosa ``meta/instanceID``: it is unique
+per form, so a device retrying a submission gets the stored row back instead
+of creating a duplicate. A retry whose body differs from the stored one is a
+conflict and is rejected.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import xml.etree.ElementTree as ET
+
+from django.db import IntegrityError, transaction
+
+from .archive import find_archived
+from .caching import invalidate_form_responses
+from .counters import record_submissions
+from .models import Form, FormSubmission
+from .schema import MAX_REPORTED_ERRORS, FormSchema, get_form_schema, get_version_schema
+from .versions import version_for_submission
+from .writes import serialized_write
+from .xforms import extract_instance_id, flatten_instance
+
+
+BULK_CREATE_BATCH_SIZE = 500
+
+
+class SubmissionRejected(Exception):
+    """A payload that cannot be stored; the message is safe to return to clients."""
+
+
+class SubmissionConflict(SubmissionRejected):
+    """A different submission with the same instanceID is already stored."""
+
+
+DUPLICATE_INSTANCE_ERROR = "A different submission with instanceID '{}' already exists for this form."
+
+
+@dataclass
+class IngestResult:
+    index: int
+    submission: FormSubmission | None = None
+    error: str | None = None
+    duplicate: bool = False
+
+
+def parse_submission(xml_payload: str) -> ET.Element:
+    if not xml_payload or not xml_payload.strip():
+        raise SubmissionRejected("Missing XML submission payload.")
+    try:
+        return ET.fromstring(xml_payload)
+    except ET.ParseError as exc:
+        raise SubmissionRejected(f"Submission is not well-formed XML: {exc}") from exc
+
+
+def validate_submission(schema: FormSchema | None, root: ET.Element) -> None:
+    """Check a parsed instance against the form's compiled schema index.
+
+    Forms whose definition could not be compiled accept any instance.
+    """
+    if schema is None:
+        return
+    errors = schema.validate(root)
+    if errors:
+        raise SubmissionRejected(
+            "Submission does not match the form definition: " + " ".join(errors[:MAX_REPORTED_ERRORS])
+        )
+
+
+def prepare_submission(
+    form: Form,
+    xml_payload: str,
+    user=None,
+    *,
+    schema: FormSchema | None = None,
+    version_cache: dict | None = None,
+) -> FormSubmission:
+    """Parse and check one payload, returning an unsaved FormSubmission.
+
+    A submission filled in with an earlier version of the form (its root
+    ``version`` attribute) is validated against, and linked to, that
+    version; otherwise the current one is used, with ``schema`` defaulting
+    to the form's cached compiled schema. Raises SubmissionRejected if the
+    payload cannot be accepted.
+    """
+    xml_payload = xml_payload.strip()
+    root = parse_submission(xml_payload)
+    form_version_id = form.current_version_id
+    older_version = version_for_submission(form, root.get("version"), version_cache)
+    if older_version is not None:
+        form_version_id = older_version.pk
+        schema = get_version_schema(older_version)
+    elif schema is None:
+        schema = get_form_schema(form)
+    validate_submission(schema, root)
+    return FormSubmission(
+        form=form,
+        form_version_id=form_version_id,
+        user=user,
+        xml_submission=xml_payload,
+        data=flatten_instance(root),
+        instance_id=extract_instance_id(root),
+    )
+
+
+def _existing_submission(form: Form, instance_id: str | None) -> FormSubmission | None:
+    if instance_id is None:
+        return None
+    existing = FormSubmission.objects.filter(form=form, instance_id=instance_id).select_related("user").first()
+    if existing is None:
+        existing = find_archived(form.pk, [instance_id]).get(instance_id)
+    return existing
+
+
+def _check_duplicate(existing: FormSubmission, submission: FormSubmission) -> None:
+    if existing.xml_submission != submission.xml_submission:
+        raise SubmissionConflict(DUPLICATE_INSTANCE_ERROR.format(submission.instance_id))
+
+
+@serialized_write
+def _store_submissions(form: Form, submissions: list[FormSubmission]) -> None:
+    with transaction.atomic():
+        if len(submissions) == 1:
+            submissions[0].save()
+        else:
+            FormSubmission.objects.bulk_create(submissions, batch_size=BULK_CREATE_BATCH_SIZE)
+            # bulk_create() sends no post_save signals.
+            invalidate_form_responses(form.pk)
+        record_submissions(form.pk, submissions)
+
+
+def ingest_submission(form: Form, xml_payload: str, user=None) -> tuple[FormSubmission, bool]:
+    """Store one payload and return ``(submission, created)``.
+
+    A resubmission of an already stored instance returns the stored row with
+    ``created=False``; a different body under the same instanceID raises
+    SubmissionConflict.
+    """
+    submission = prepare_submission(form, xml_payload, user)
+    existing = _existing_submission(form, submission.instance_id)
+    if existing is None:
+        try:
+            _store_submissions(form, [submission])
+            return submission, True
+        except IntegrityError:
+            # A concurrent retry of the same instance won the insert.
+            existing = _existing_submission(form, submission.instance_id)
+            if existing is None:
+                raise
+    _check_duplicate(existing, submission)
+    return existing, False
+
+
+def _resolve_duplicates(form: Form, accepted: list[tuple[IngestResult, FormSubmission]]) -> list[FormSubmission]:
+    """Mark items whose instanceID is already stored (or repeated earlier in
+    the batch) and return the submissions that still need inserting.
+
+    Stored instanceIDs are fetched with one lookup on the unique index.
+    """
+    instance_ids = {submission.instance_id for _, submission in accepted if submission.instance_id}
+    known = {
+        existing.instance_id: existing
+        for existing in FormSubmission.objects.filter(form=form, instance_id__in=instance_ids).only(
+            "id", "instance_id", "xml_submission"
+        )
+    } if instance_ids else {}
+    if instance_ids - known.keys():
+        known.update(find_archived(form.pk, instance_ids - known.keys()))
+
+    to_create = []
+    for result, submission in accepted:
+        result.submission, result.error, result.duplicate = None, None, False
+        existing = known.get(submission.instance_id) if submission.instance_id else None
+        if existing is None:
+            result.submission = submission
+            to_create.append(submission)
+            if submission.instance_id:
+                known[submission.instance_id] = submission
+            continue
+        try:
+            _check_duplicate(existing, submission)
+        except SubmissionConflict as exc:
+            result.error = str(exc)
+        else:
+            result.submission = existing
+            result.duplicate = True
+    return to_create
+
+
+def ingest_batch(form: Form, payloads: list[str], user=None) -> list[IngestResult]:
+    """Store a batch of payloads with partial-failure semantics.
+
+    Invalid items are reported and skipped, and already stored instances
+    are reported as duplicates; all new items are inserted together with
+    ``bulk_create`` in one transaction. Results are returned in input order.
+    """
+    results = [IngestResult(index=index) for index in range(len(payloads))]
+    accepted: list[tuple[IngestResult, FormSubmission]] = []
+    schema = get_form_schema(form)
+    version_cache: dict = {}
+
+    for result, xml_payload in zip(results, payloads):
+        try:
+            submission = prepare_submission(form, xml_payload, user, schema=schema, version_cache=version_cache)
+            accepted.append((result, submission))
+        except SubmissionRejected as exc:
+            result.error = str(exc)
+
+    # A concurrent request may store one of our instanceIDs between the
+    # lookup and the insert; the unique constraint then aborts the whole
+    # transaction, so resolve again against the new state and retry once.
+    for attempt in range(2):
+        to_create = _resolve_duplicates(form, accepted) if accepted else []
+        if not to_create:
+            break
+        try:
+            _store_submissions(form, to_create)
+            break
+        except IntegrityError:
+            if attempt:
+                raise
+            for submission in to_create:
+                submission.pk = None
+                submission._state.adding = True
+
+    return results
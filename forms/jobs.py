@@ -0,0 +1,182 @@
+"""Background processing of queued XLSForm conversions.
+
+Uploads sent with ``?async=1`` (or ``Prefer: respond-async``) are stored as
+:class:`~forms.models.ConversionJob` rows and answered with ``202``. A worker
+(``manage.py process_conversion_jobs``) claims queued jobs from the database,
+converts the workbook and creates or updates the Form. No external broker is
+involved: the jobs table is the queue.
+
+Conversions run in the same bounded pool as synchronous uploads (see
+forms.conversion.ConversionPool), with its timeout and CPU limit. A job
+left ``running`` by a crashed worker is requeued, at most
+``MAX_JOB_ATTEMPTS`` times in all, so a workbook that keeps killing
+workers ends up ``failed`` instead of cycling forever.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+import logging
+import os
+
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .conversion import (
+    ConversionAborted,
+    ConversionPoolBusy,
+    ConversionTimeout,
+    conversion_pool,
+    convert_upload,
+)
+from .models import ConversionJob, Form
+from .versions import set_definition
+
+
+logger = logging.getLogger(__name__)
+
+
+DUPLICATE_NAME_ERROR = "A form with this name already exists."
+MAX_JOB_ATTEMPTS = 3
+
+
+class JobError(Exception):
+    """A job failed for a reason that should be reported to the client verbatim."""
+
+
+def enqueue_job(kind: str, xls_file, *, form: Form | None = None, payload: dict | None = None) -> ConversionJob:
+    job = ConversionJob(kind=kind, form=form, payload={**(payload or {}), "filename": xls_file.name})
+    xls_file.seek(0)
+    job.xls_file.save(xls_file.name, xls_file, save=False)
+    job.save()
+    return job
+
+
+def claim_next_job() -> ConversionJob | None:
+    """Atomically move the oldest queued job to ``running`` and return it.
+
+    The conditional UPDATE makes claiming safe with several workers: only the
+    worker whose UPDATE matched the still-queued row gets the job.
+    """
+    while True:
+        job = ConversionJob.objects.filter(status=ConversionJob.STATUS_QUEUED).order_by("created_at", "pk").first()
+        if job is None:
+            return None
+
+        now = timezone.now()
+        claimed = ConversionJob.objects.filter(pk=job.pk, status=ConversionJob.STATUS_QUEUED).update(
+            status=ConversionJob.STATUS_RUNNING, started_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            job.status = ConversionJob.STATUS_RUNNING
+            job.started_at = now
+            job.attempts += 1
+            return job
+
+
+def requeue_stale_jobs(older_than: timedelta) -> tuple[int, int]:
+    """Return jobs stuck in ``running`` (e.g. after a worker crash) to the
+    queue, failing those already claimed ``MAX_JOB_ATTEMPTS`` times.
+
+    Returns ``(requeued, failed)``.
+    """
+    stale = ConversionJob.objects.filter(
+        status=ConversionJob.STATUS_RUNNING, started_at__lt=timezone.now() - older_than
+    )
+    failed = 0
+    for job in stale.filter(attempts__gte=MAX_JOB_ATTEMPTS):
+        # Conditional, like claiming: the job may have finished meanwhile.
+        if ConversionJob.objects.filter(pk=job.pk, status=ConversionJob.STATUS_RUNNING).update(
+            status=ConversionJob.STATUS_FAILED,
+            error=f"The conversion did not finish after {job.attempts} attempts.",
+            finished_at=timezone.now(),
+        ):
+            job.xls_file.delete(save=False)
+            job.save(update_fields=["xls_file"])
+            failed += 1
+    requeued = stale.filter(attempts__lt=MAX_JOB_ATTEMPTS).update(status=ConversionJob.STATUS_QUEUED, started_at=None)
+    return requeued, failed
+
+
+def _uploaded_workbook(job: ConversionJob, stored) -> File:
+    """The stored workbook under the name it was uploaded with (storage may have renamed it)."""
+    return File(stored, name=os.path.basename(job.payload.get("filename") or stored.name))
+
+
+def _apply_job(job: ConversionJob, xml_definition: str, version: str) -> Form:
+    payload = job.payload
+    name = payload.get("name")
+
+    if job.kind == ConversionJob.KIND_CREATE:
+        form = Form(name=name, description=payload.get("description", ""))
+    else:
+        form = job.form
+        if form is None or form.deleted_at is not None:
+            raise JobError("The form this job was updating no longer exists.")
+        if name is not None:
+            form.name = name
+        if payload.get("description") is not None:
+            form.description = payload["description"]
+
+    existing = Form.objects.filter(name=form.name)
+    if form.pk is not None:
+        existing = existing.exclude(pk=form.pk)
+    if existing.exists():
+        raise JobError(DUPLICATE_NAME_ERROR)
+
+    with job.xls_file.open("rb") as stored:
+        workbook = _uploaded_workbook(job, stored)
+        try:
+            with transaction.atomic():
+                if not set_definition(form, xml_definition, version, xls_file=workbook):
+                    form.save()
+        except IntegrityError as exc:
+            raise JobError(DUPLICATE_NAME_ERROR) from exc
+    return form
+
+
+def run_job(job: ConversionJob) -> ConversionJob:
+    """Convert a claimed job's workbook and create/update its Form, recording the outcome."""
+    try:
+        with job.xls_file.open("rb") as stored:
+            xml_definition, version = convert_upload(_uploaded_workbook(job, stored), pool=conversion_pool)
+        job.form = _apply_job(job, xml_definition, version)
+        job.status = ConversionJob.STATUS_SUCCEEDED
+        job.error = ""
+    except ConversionPoolBusy:
+        # Only this worker's own timed-out conversions hold slots; try again later.
+        ConversionJob.objects.filter(pk=job.pk).update(
+            status=ConversionJob.STATUS_QUEUED, started_at=None, attempts=F("attempts") - 1
+        )
+        job.refresh_from_db()
+        return job
+    except (ConversionTimeout, ConversionAborted) as exc:
+        job.status = ConversionJob.STATUS_FAILED
+        job.error = f"Failed to convert XLSForm: {exc}"
+    except JobError as exc:
+        job.status = ConversionJob.STATUS_FAILED
+        job.error = str(exc)
+    except Exception as exc:
+        logger.exception("Conversion job %s failed", job.pk)
+        job.status = ConversionJob.STATUS_FAILED
+        job.error = f"Failed to convert XLSForm: {exc}"
+
+    job.finished_at = timezone.now()
+    job.xls_file.delete(save=False)
+    job.save(update_fields=["form", "status", "error", "finished_at", "xls_file"])
+    return job
+
+
+def run_pending_jobs(limit: int | None = None) -> int:
+    """Process queued jobs until the queue is empty (or ``limit`` jobs ran)."""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        if run_job(job).status == ConversionJob.STATUS_QUEUED:
+            break  # The pool is saturated; the next poll retries.
+        processed += 1
+    return processed
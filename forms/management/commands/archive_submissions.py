@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from forms.archive import ARCHIVE_SEGMENT_SIZE, archive_after, archive_submissions
+
+
+class Command(BaseCommand):
+    help = "Move old submissions out of the live table into compressed archive segments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=float,
+            help="Archive submissions older than this many days (default: XFORMS_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument("--form", type=int, action="append", help="Only archive this form id (repeatable).")
+        parser.add_argument(
+            "--segment-size",
+            type=int,
+            default=ARCHIVE_SEGMENT_SIZE,
+            help=f"Submissions per archive segment (default: {ARCHIVE_SEGMENT_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options["older_than"]) if options["older_than"] is not None else archive_after()
+        moved = archive_submissions(older_than, form_ids=options["form"], segment_size=options["segment_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} submission(s)."))
@@ -0,0 +1,107 @@
+import xml.etree.ElementTree as ET
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from forms.caching import invalidate_form_responses
+from forms.models import ArchivedSubmission, FormSubmission, SubmissionAttachment
+from forms.xforms import extract_instance_id, flatten_instance
+
+
+class Command(BaseCommand):
+    help = (
+        "Parse stored submission XML into the structured `data` column and the instanceID column for rows "
+        "that lack them, collapsing rows that turn out to repeat an already stored instance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Submissions parsed and updated per batch (default: 1000).",
+        )
+        parser.add_argument("--form", type=int, help="Only backfill submissions of this form id.")
+
+    def handle(self, *args, **options):
+        submissions = FormSubmission.objects.all()
+        if options["form"]:
+            submissions = submissions.filter(form_id=options["form"])
+
+        updated = self.backfill_data(submissions.filter(data={}), options["batch_size"])
+        identified, collapsed = self.backfill_instance_ids(submissions.filter(instance_id=None), options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfilled {updated} submission(s); set {identified} instanceID(s) "
+                f"and removed {collapsed} duplicate(s)."
+            )
+        )
+
+    def batches(self, queryset, batch_size):
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id).order_by("id")[:batch_size])
+            if not batch:
+                return
+            last_id = batch[-1].pk
+            yield batch
+
+    def backfill_data(self, queryset, batch_size) -> int:
+        updated = 0
+        for batch in self.batches(queryset.only("id", "xml_submission"), batch_size):
+            for submission in batch:
+                try:
+                    submission.data = flatten_instance(ET.fromstring(submission.xml_submission))
+                except ET.ParseError:
+                    submission.data = {}
+            FormSubmission.objects.bulk_update(batch, ["data"])
+            updated += len(batch)
+        return updated
+
+    def backfill_instance_ids(self, queryset, batch_size) -> tuple[int, int]:
+        """Set instance_id from ``meta/instanceID``; a row whose instance is
+        already stored (live or archived) is a retry and is deleted, its
+        attachments moving to the kept row where their names are free."""
+        identified = collapsed = 0
+        queryset = queryset.only("id", "form_id", "user_id", "submitted_at", "xml_submission")
+        for batch in self.batches(queryset, batch_size):
+            parsed = [(submission, extract_instance_id(submission.xml_submission)) for submission in batch]
+            parsed = [(submission, instance_id) for submission, instance_id in parsed if instance_id]
+            if not parsed:
+                continue
+            form_ids = {submission.form_id for submission, _ in parsed}
+            instance_ids = {instance_id for _, instance_id in parsed}
+            kept = {
+                (form_id, instance_id): pk
+                for form_id, instance_id, pk in FormSubmission.objects.filter(
+                    form_id__in=form_ids, instance_id__in=instance_ids
+                ).values_list("form_id", "instance_id", "pk")
+            }
+            archived = set(
+                ArchivedSubmission.objects.filter(form_id__in=form_ids, instance_id__in=instance_ids).values_list(
+                    "form_id", "instance_id"
+                )
+            )
+
+            identify, duplicates = [], []
+            for submission, instance_id in parsed:
+                key = (submission.form_id, instance_id)
+                if key in kept or key in archived:
+                    duplicates.append((submission, kept.get(key)))
+                else:
+                    submission.instance_id = instance_id
+                    kept[key] = submission.pk
+                    identify.append(submission)
+
+            with transaction.atomic():
+                FormSubmission.objects.bulk_update(identify, ["instance_id"])
+                invalidate_form_responses(*{submission.form_id for submission in identify})
+                for duplicate, kept_pk in duplicates:
+                    if kept_pk is not None:
+                        taken = SubmissionAttachment.objects.filter(submission_id=kept_pk).values("name")
+                        duplicate.attachments.exclude(name__in=taken).update(submission_id=kept_pk)
+                    # Signals keep counters, rollups and attachment files in step.
+                    duplicate.delete()
+            identified += len(identify)
+            collapsed += len(duplicates)
+        return identified, collapsed
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from forms.compression import (
+    COMPRESSED_PREFIX,
+    DICTIONARY_SAMPLE_COUNT,
+    compress_text,
+    dictionary_cache,
+    train_dictionary,
+)
+from forms.models import CompressionDictionary, Form, FormSubmission, FormVersion
+
+
+class Command(BaseCommand):
+    help = (
+        "Train a compression dictionary per form from sample submissions and compress stored "
+        "submission and definition XML in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", type=int, action="append", help="Only process this form id (repeatable).")
+        parser.add_argument(
+            "--no-train",
+            action="store_true",
+            help="Keep existing dictionaries and only compress rows that are still plain text.",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=DICTIONARY_SAMPLE_COUNT,
+            help=f"Recent submissions sampled per dictionary (default: {DICTIONARY_SAMPLE_COUNT}).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows compressed and updated per batch (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        forms = Form.objects.order_by("pk")
+        if options["form"]:
+            forms = forms.filter(pk__in=options["form"])
+
+        compressed = dictionaries = 0
+        for form_id in forms.values_list("pk", flat=True):
+            trained = not options["no_train"] and self.train(form_id, options["samples"])
+            dictionaries += trained
+            submissions = FormSubmission.objects.filter(form_id=form_id)
+            if not trained:
+                # Rows already compressed keep their (still valid) dictionary.
+                submissions = submissions.filter(~Q(xml_submission__startswith=COMPRESSED_PREFIX))
+            compressed += self.compress(
+                submissions, "xml_submission", dictionary_cache.current(form_id), options["batch_size"]
+            )
+
+        plain_definition = ~Q(xml_definition__startswith=COMPRESSED_PREFIX)
+        compressed += self.compress(forms.filter(plain_definition), "xml_definition", None, options["batch_size"])
+        compressed += self.compress(
+            FormVersion.objects.filter(plain_definition, form__in=forms), "xml_definition", None, options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Trained {dictionaries} dictionary(ies) and compressed {compressed} row(s).")
+        )
+
+    def train(self, form_id, sample_count) -> bool:
+        samples = list(
+            FormSubmission.objects.filter(form_id=form_id)
+            .order_by("-submitted_at", "-id")
+            .values_list("xml_submission", flat=True)[:sample_count]
+        )
+        if not samples:
+            return False
+        CompressionDictionary.objects.create(form_id=form_id, data=train_dictionary(samples), sample_count=len(samples))
+        dictionary_cache.forget(form_id)
+        return True
+
+    def compress(self, queryset, field, dictionary, batch_size) -> int:
+        queryset = queryset.only("pk", field)
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+            if not batch:
+                return updated
+            last_pk = batch[-1].pk
+            for row in batch:
+                setattr(row, field, compress_text(getattr(row, field), dictionary))
+            queryset.model.objects.bulk_update(batch, [field])
+            updated += len(batch)
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from forms.jobs import requeue_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued asynchronous XLSForm conversion jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue once and exit instead of polling forever.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep between polls when the queue is empty (default: 2).",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=15 * 60,
+            help="Requeue jobs left running for longer than this many seconds (default: 900).",
+        )
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options["stale_after"])
+
+        while True:
+            requeued, failed = requeue_stale_jobs(stale_after)
+            if requeued or failed:
+                self.stdout.write(f"Requeued {requeued} stale job(s); failed {failed} after too many attempts.")
+
+            processed = run_pending_jobs()
+            if processed:
+                self.stdout.write(f"Processed {processed} job(s).")
+
+            if options["once"]:
+                return
+            if not processed:
+                time.sleep(options["interval"])
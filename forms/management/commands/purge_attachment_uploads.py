@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from forms.attachments import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete chunked attachment uploads (and their partial files) that were abandoned."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=float,
+            default=24,
+            help="Hours since an upload last received a chunk (default: 24).",
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_stale_uploads(timedelta(hours=options["older_than"]))
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} stale upload(s)."))
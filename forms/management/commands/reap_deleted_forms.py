@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from forms.deletion import REAP_BATCH_SIZE, reap_deleted_forms
+
+
+class Command(BaseCommand):
+    help = "Remove deleted forms and their submissions and files in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Reap everything pending once and exit instead of polling forever.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=30.0,
+            help="Seconds to sleep between polls when nothing is pending (default: 30).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=REAP_BATCH_SIZE,
+            help=f"Submissions deleted per transaction (default: {REAP_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Seconds to sleep between batches so ingest is not starved (default: 0.05).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            forms, submissions = reap_deleted_forms(batch_size=options["batch_size"], pause=options["pause"])
+            if forms or submissions:
+                self.stdout.write(f"Removed {forms} form(s) and {submissions} submission(s).")
+
+            if options["once"]:
+                return
+            if not forms:
+                time.sleep(options["interval"])
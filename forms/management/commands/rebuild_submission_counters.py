@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from forms.counters import rebuild_counters, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute each form's submission_count, last_submitted_at and hourly rollups from its submissions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", type=int, action="append", help="Only rebuild this form id (repeatable).")
+
+    def handle(self, *args, **options):
+        updated = rebuild_counters(options["form"])
+        rollups = rebuild_rollups(options["form"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {updated} form(s) and {rollups} rollup row(s)."))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0003_formsubmission_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formsubmission',
+            name='instance_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['form', 'submitted_at', 'id'], name='forms_sub_form_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['form', 'user'], name='forms_sub_form_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['form', 'instance_id'], name='forms_sub_form_instance_idx'),
+        ),
+    ]
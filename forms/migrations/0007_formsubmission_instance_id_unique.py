@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_instances(apps, schema_editor):
+    """Keep the first stored row of each (form, instanceID) and drop the retries."""
+    FormSubmission = apps.get_model("forms", "FormSubmission")
+    duplicates = (
+        FormSubmission.objects.exclude(instance_id=None)
+        .values("form_id", "instance_id")
+        .annotate(first_id=Min("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates.iterator():
+        FormSubmission.objects.filter(form_id=group["form_id"], instance_id=group["instance_id"]).exclude(
+            id=group["first_id"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0006_formsubmission_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_instances, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='formsubmission',
+            name='forms_sub_form_instance_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='formsubmission',
+            constraint=models.UniqueConstraint(fields=('form', 'instance_id'), name='forms_sub_form_instance_uniq'),
+        ),
+    ]
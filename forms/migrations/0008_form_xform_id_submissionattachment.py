@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from forms.xforms import xform_id
+
+
+def populate_xform_id(apps, schema_editor):
+    Form = apps.get_model("forms", "Form")
+    for form in Form.objects.only("id", "xml_definition").iterator():
+        Form.objects.filter(pk=form.pk).update(xform_id=xform_id(form.xml_definition) or "")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0007_formsubmission_instance_id_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='xform_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255),
+        ),
+        migrations.RunPython(populate_xform_id, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='SubmissionAttachment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('file', models.FileField(upload_to='attachments/')),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='forms.formsubmission')),
+            ],
+            options={
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(fields=('submission', 'name'), name='forms_attachment_name_uniq')],
+            },
+        ),
+    ]
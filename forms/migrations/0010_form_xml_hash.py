@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:51
+
+from django.db import migrations, models
+
+from forms.xforms import definition_hash
+
+
+def populate_xml_hash(apps, schema_editor):
+    Form = apps.get_model("forms", "Form")
+    for form in Form.objects.only("id", "xml_definition").iterator():
+        Form.objects.filter(pk=form.pk).update(xml_hash=definition_hash(form.xml_definition))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0009_attachment_content_hash_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='xml_hash',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.RunPython(populate_xml_hash, migrations.RunPython.noop),
+    ]
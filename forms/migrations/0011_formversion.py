@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from forms.xforms import definition_hash
+
+
+def record_current_versions(apps, schema_editor):
+    """Give every existing form a first FormVersion holding its current definition.
+
+    Submissions stored so far keep form_version unset: which definition
+    they were collected against is not known.
+    """
+    Form = apps.get_model("forms", "Form")
+    FormVersion = apps.get_model("forms", "FormVersion")
+    for form in Form.objects.iterator():
+        form_version = FormVersion.objects.create(
+            form=form,
+            version=form.version,
+            xml_definition=form.xml_definition,
+            xml_hash=form.xml_hash or definition_hash(form.xml_definition),
+            xls_form=form.xls_form.name or None,
+        )
+        Form.objects.filter(pk=form.pk).update(current_version=form_version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0010_form_xml_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(blank=True, max_length=64)),
+                ('xml_definition', models.TextField()),
+                ('xml_hash', models.CharField(max_length=32)),
+                ('xls_form', models.FileField(blank=True, max_length=255, null=True, upload_to='xlsforms/')),
+                ('xls_hash', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='forms.form')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='form',
+            name='current_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='forms.formversion'),
+        ),
+        migrations.AddField(
+            model_name='formsubmission',
+            name='form_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='forms.formversion'),
+        ),
+        migrations.AddIndex(
+            model_name='formversion',
+            index=models.Index(fields=['form', 'version'], name='forms_version_form_ver_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='formversion',
+            constraint=models.UniqueConstraint(fields=('form', 'xml_hash'), name='forms_version_form_hash_uniq'),
+        ),
+        migrations.RunPython(record_current_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:56
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def compute_counters(apps, schema_editor):
+    Form = apps.get_model("forms", "Form")
+    FormSubmission = apps.get_model("forms", "FormSubmission")
+    submissions = FormSubmission.objects.filter(form=OuterRef("pk")).order_by()
+    Form.objects.update(
+        submission_count=Coalesce(
+            Subquery(submissions.values("form").annotate(total=Count("pk")).values("total"), output_field=IntegerField()),
+            Value(0),
+        ),
+        last_submitted_at=Subquery(submissions.order_by("-submitted_at").values("submitted_at")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0011_formversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='last_submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='form',
+            name='submission_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(compute_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:58
+
+import django.db.models.deletion
+from django.conf import settings
+from datetime import timezone
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+
+def compute_rollups(apps, schema_editor):
+    FormSubmission = apps.get_model("forms", "FormSubmission")
+    SubmissionRollup = apps.get_model("forms", "SubmissionRollup")
+    groups = (
+        FormSubmission.objects.order_by()
+        .annotate(bucket=TruncHour("submitted_at", tzinfo=timezone.utc))
+        .values("form_id", "bucket", "user_id")
+        .annotate(total=Count("pk"))
+    )
+    SubmissionRollup.objects.bulk_create(
+        (
+            SubmissionRollup(form_id=row["form_id"], bucket_start=row["bucket"], user_id=row["user_id"], count=row["total"])
+            for row in groups.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0012_form_submission_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='forms.form')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('form', 'bucket_start', 'user'), name='forms_rollup_user_uniq'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('form', 'bucket_start'), name='forms_rollup_anon_uniq')],
+            },
+        ),
+        migrations.RunPython(compute_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# PostgreSQL only: the expressions and operator classes have no SQLite
+# equivalent, and the indexes are kept out of the model state so table
+# rebuilds on other backends never try to recreate them. Built
+# CONCURRENTLY so existing tables stay writable meanwhile.
+SEARCH_INDEXES = {
+    "forms_sub_search_gin": "USING gin (jsonb_to_tsvector('simple', data, '[\"string\"]'))",
+    "forms_sub_data_gin": "USING gin (data jsonb_path_ops)",
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("forms", "FormSubmission")._meta.db_table
+    for name, definition in SEARCH_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" {definition}')
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('forms', '0014_form_deleted_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
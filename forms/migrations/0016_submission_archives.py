@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0015_submission_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(max_length=255, upload_to='archives/')),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('row_count', models.PositiveIntegerField()),
+                ('size', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='forms.form')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedSubmission',
+            fields=[
+                ('submission_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('instance_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='forms.form')),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='forms.submissionarchive')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='submissionarchive',
+            index=models.Index(fields=['form', 'period_end'], name='forms_archive_form_end_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedsubmission',
+            constraint=models.UniqueConstraint(fields=('form', 'instance_id'), name='forms_archived_instance_uniq'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:13
+
+import django.db.models.deletion
+import forms.compression
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0016_submission_archives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='form',
+            name='xml_definition',
+            field=forms.compression.CompressedTextField(),
+        ),
+        migrations.AlterField(
+            model_name='formsubmission',
+            name='xml_submission',
+            field=forms.compression.CompressedTextField(dictionary_from='form_id'),
+        ),
+        migrations.AlterField(
+            model_name='formversion',
+            name='xml_definition',
+            field=forms.compression.CompressedTextField(),
+        ),
+        migrations.CreateModel(
+            name='CompressionDictionary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('sample_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compression_dictionaries', to='forms.form')),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:50
+
+import os
+import re
+
+from django.db import migrations, models
+
+
+CONTENT_ADDRESSED_RE = re.compile(r"^xlsforms/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$")
+
+
+def populate_xls_name(apps, schema_editor):
+    """Workbooks stored before content addressing still carry their upload name."""
+    for model_name in ("Form", "FormVersion"):
+        model = apps.get_model("forms", model_name)
+        rows = model._base_manager.exclude(xls_form="").exclude(xls_form=None).filter(xls_name="")
+        for pk, name in rows.values_list("pk", "xls_form").iterator():
+            if not CONTENT_ADDRESSED_RE.match(name):
+                model._base_manager.filter(pk=pk).update(xls_name=os.path.basename(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0018_conversionjob_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='xls_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='formversion',
+            name='xls_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(populate_xls_name, migrations.RunPython.noop),
+    ]
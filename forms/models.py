@@ -1,35 +1,318 @@
+import uuid
+
 from django.conf import settings
 from django.db import models
 
+from .compression import CompressedTextField
+from .xforms import definition_hash, xform_id
+
+
+class LiveFormManager(models.Manager):
+    """Forms that have not been deleted (see forms.deletion)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 class Form(models.Model):
     """Stores a single form definition as XML."""
 
-    name = models.CharField(max_length=255, unique=True)
+    # Unique among live forms only, so a deleted form's name can be reused at once.
+    name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     xls_form = models.FileField(upload_to="xlsforms/", blank=True, null=True)
-    xml_definition = models.TextField()
+    # The name xls_form was uploaded under; the stored file is named by its hash.
+    xls_name = models.CharField(max_length=255, blank=True)
+    xml_definition = CompressedTextField()
     version = models.CharField(max_length=64, blank=True)
+    # The primary instance's id attribute, i.e. the OpenRosa formID; kept in sync on save.
+    xform_id = models.CharField(max_length=255, blank=True, db_index=True)
+    # MD5 hex digest of xml_definition: the OpenRosa form hash and the definition's ETag.
+    xml_hash = models.CharField(max_length=32, blank=True)
+    # The FormVersion row holding xml_definition / xls_form / xls_name (see forms.versions).
+    current_version = models.ForeignKey(
+        "FormVersion", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    # Maintained by forms.counters on ingest and delete; never bumps updated_at.
+    submission_count = models.PositiveIntegerField(default=0)
+    last_submitted_at = models.DateTimeField(null=True, blank=True)
+    # Set by a delete; the row and its submissions are removed later by the reaper.
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LiveFormManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name"], condition=models.Q(deleted_at__isnull=True), name="forms_form_live_name_uniq"
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.xform_id = xform_id(self.xml_definition) or ""
+        self.xml_hash = definition_hash(self.xml_definition)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "xml_definition" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "xform_id", "xml_hash"}
+        super().save(*args, **kwargs)
+
+
+class FormVersion(models.Model):
+    """One distinct XForm definition a form has had, with the workbook it came from.
+
+    Rows are immutable and unique per (form, definition hash); workbooks are
+    stored content-addressed, so identical uploads share one file.
+    """
+
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="versions")
+    version = models.CharField(max_length=64, blank=True)
+    xml_definition = CompressedTextField()
+    # MD5 hex digest of xml_definition, as Form.xml_hash.
+    xml_hash = models.CharField(max_length=32)
+    xls_form = models.FileField(upload_to="xlsforms/", blank=True, null=True, max_length=255)
+    xls_name = models.CharField(max_length=255, blank=True)
+    # SHA-256 hex digest of the source workbook.
+    xls_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["form", "version"], name="forms_version_form_ver_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["form", "xml_hash"], name="forms_version_form_hash_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.form.name} {self.version or self.xml_hash[:8]}"
+
 
 class FormSubmission(models.Model):
     """Stores an XML submission for a particular form."""
 
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="submissions")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
-    xml_submission = models.TextField()
+    xml_submission = CompressedTextField(dictionary_from="form_id")
+    # Leaf answers keyed by XPath (e.g. "/data/group/question"), parsed once at ingest.
+    data = models.JSONField(default=dict, blank=True)
+    # Definition the submission was filled in with; null for rows stored before versions were tracked.
+    form_version = models.ForeignKey(
+        FormVersion, on_delete=models.SET_NULL, null=True, blank=True, related_name="submissions"
+    )
+    # OpenRosa meta/instanceID; unique per form so device retries are idempotent.
+    instance_id = models.CharField(max_length=255, blank=True, null=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-submitted_at"]
+        indexes = [
+            models.Index(fields=["form", "submitted_at", "id"], name="forms_sub_form_time_idx"),
+            models.Index(fields=["form", "user"], name="forms_sub_form_user_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["form", "instance_id"], name="forms_sub_form_instance_uniq"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.form.name} submission {self.pk}"
+
+
+class CompressionDictionary(models.Model):
+    """A zlib preset dictionary for one form's submissions (see forms.compression).
+
+    Rows are immutable: compressed values name the dictionary they need.
+    """
+
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="compression_dictionaries")
+    data = models.BinaryField()
+    sample_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Dictionary {self.pk} for form {self.form_id} ({len(self.data)} bytes)"
+
+
+class ConversionJob(models.Model):
+    """A queued XLSForm conversion that creates or updates a Form in the background."""
+
+    KIND_CREATE = "create"
+    KIND_UPDATE = "update"
+    KIND_CHOICES = [
+        (KIND_CREATE, "Create form"),
+        (KIND_UPDATE, "Update form"),
+    ]
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    form = models.ForeignKey(
+        Form, on_delete=models.CASCADE, null=True, blank=True, related_name="conversion_jobs"
+    )
+    xls_file = models.FileField(upload_to="conversion_jobs/")
+    # Form fields to apply once the conversion succeeds (name, description).
+    payload = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    # Times a worker claimed the job; a job that keeps stalling fails after forms.jobs.MAX_JOB_ATTEMPTS.
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="forms_job_status_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} job {self.pk} ({self.status})"
+
+
+class SubmissionRollup(models.Model):
+    """Submissions per form, UTC hour and user, maintained incrementally on ingest and delete.
+
+    Statistics read these rows instead of grouping FormSubmission, so their
+    cost depends on the number of hours and users, not on submissions.
+    """
+
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="rollups")
+    bucket_start = models.DateTimeField()
+    # No database constraint: rows keep counting a deleted user's submissions.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["form", "bucket_start", "user"],
+                condition=models.Q(user__isnull=False),
+                name="forms_rollup_user_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["form", "bucket_start"],
+                condition=models.Q(user__isnull=True),
+                name="forms_rollup_anon_uniq",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.form_id} {self.bucket_start:%Y-%m-%d %H:00} {self.count}"
+
+
+class SubmissionArchive(models.Model):
+    """A gzipped NDJSON segment of old submissions moved out of FormSubmission.
+
+    Written by forms.archive; segments of a form cover disjoint, increasing
+    ``submitted_at`` ranges and are never modified after they are written.
+    """
+
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="archives")
+    file = models.FileField(upload_to="archives/", max_length=255)
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    row_count = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["form", "period_end"], name="forms_archive_form_end_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.form_id} {self.period_start:%Y-%m-%d}..{self.period_end:%Y-%m-%d} ({self.row_count})"
+
+
+class ArchivedSubmission(models.Model):
+    """Where an archived submission went, so it can still be found by id or instanceID."""
+
+    # The FormSubmission primary key the row had while it was live.
+    submission_id = models.BigIntegerField(primary_key=True)
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="+")
+    archive = models.ForeignKey(SubmissionArchive, on_delete=models.CASCADE, related_name="entries")
+    instance_id = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["form", "instance_id"], name="forms_archived_instance_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Archived submission {self.submission_id}"
+
+
+class SubmissionAttachment(models.Model):
+    """A media file sent alongside a submission (photo, audio, signature, ...).
+
+    Files are stored content-addressed (see forms.attachments), so identical
+    media attached to several submissions shares one stored blob.
+    """
+
+    submission = models.ForeignKey(FormSubmission, on_delete=models.CASCADE, related_name="attachments")
+    name = models.CharField(max_length=255)
+    file = models.FileField(upload_to="attachments/", max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField(default=0)
+    # SHA-256 hex digest of the file contents.
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(fields=["submission", "name"], name="forms_attachment_name_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class AttachmentUpload(models.Model):
+    """A resumable, chunked upload of one submission attachment in progress.
+
+    Received bytes are written to a partial file outside storage; ``offset``
+    is how many of them have been durably written. Once it reaches ``size``
+    the file is hashed, moved into storage and becomes a SubmissionAttachment.
+    """
+
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    submission = models.ForeignKey(FormSubmission, on_delete=models.CASCADE, related_name="attachment_uploads")
+    name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["submission", "name"], name="forms_upload_name_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.offset}/{self.size})"
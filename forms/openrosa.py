@@ -0,0 +1,183 @@
+"""OpenRosa endpoints so ODK Collect (and compatible clients) can use this server.
+
+Point a device at ``https://<host>/openrosa`` and it will use:
+
+- ``GET  formList``: the OpenRosa form discovery document.
+- ``GET  forms/<id>/form.xml``: a form's XForm definition.
+- ``HEAD submission``: preflight, answered with ``204`` and the largest
+  request the server accepts (``X-OpenRosa-Accept-Content-Length``); clients
+  split bigger uploads into several requests.
+- ``POST submission``: multipart ``xml_submission_file`` plus media files,
+  routed to the live form with the instance's formID.
+
+Devices route by formID, but forms are not required to have distinct ones.
+Forms that share a formID are left out of the formList, and submissions for
+them are refused with ``409`` rather than guessed.
+
+Multipart bodies are parsed by Django's streaming parser with every part
+written straight to a temporary file, so a request's media never has to sit
+in worker memory; attachments are stored content-addressed (see
+forms.attachments). Each request resends the same XML with a share of the
+attachments; the instanceID makes those retries land on one submission.
+"""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db.models import Count
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_GET, require_http_methods
+
+from .attachments import store_attachment
+from .ingest import SubmissionConflict, SubmissionRejected, ingest_submission, parse_submission
+from .models import Form, FormSubmission
+
+
+OPENROSA_VERSION = "1.0"
+XFORMS_LIST_NS = "http://openrosa.org/xforms/xformsList"
+RESPONSE_NS = "http://openrosa.org/http/response"
+XML_SUBMISSION_FIELD = "xml_submission_file"
+
+
+def max_content_length() -> int:
+    return getattr(settings, "XFORMS_OPENROSA_MAX_CONTENT_LENGTH", 10 * 1024 * 1024)
+
+
+def _xml_response(root: ET.Element, status: int = 200) -> HttpResponse:
+    body = ET.tostring(root, encoding="utf-8", xml_declaration=True)
+    response = HttpResponse(body, status=status, content_type="text/xml; charset=utf-8")
+    response["X-OpenRosa-Version"] = OPENROSA_VERSION
+    response["Date"] = http_date()
+    return response
+
+
+def _submission_response(message: str, status: int, *, nature: str = "") -> HttpResponse:
+    root = ET.Element("OpenRosaResponse", xmlns=RESPONSE_NS)
+    ET.SubElement(root, "message", nature=nature).text = message
+    response = _xml_response(root, status)
+    response["X-OpenRosa-Accept-Content-Length"] = str(max_content_length())
+    return response
+
+
+def _shared_xform_ids():
+    """formIDs used by more than one live form; devices cannot be routed to these."""
+    return (
+        Form.objects.exclude(xform_id="")
+        .order_by()
+        .values("xform_id")
+        .annotate(forms=Count("pk"))
+        .filter(forms__gt=1)
+        .values("xform_id")
+    )
+
+
+@require_GET
+def form_list(request):
+    # A formID shared by several forms cannot be routed, so it is not offered.
+    forms = (
+        Form.objects.exclude(xform_id="")
+        .exclude(xform_id__in=_shared_xform_ids())
+        .only("id", "name", "version", "xform_id", "xml_hash")
+    )
+    if request.GET.get("formID"):
+        forms = forms.filter(xform_id=request.GET["formID"])
+
+    root = ET.Element("xforms", xmlns=XFORMS_LIST_NS)
+    for form in forms:
+        item = ET.SubElement(root, "xform")
+        ET.SubElement(item, "formID").text = form.xform_id
+        ET.SubElement(item, "name").text = form.name
+        ET.SubElement(item, "version").text = form.version
+        ET.SubElement(item, "hash").text = f"md5:{form.xml_hash}"
+        ET.SubElement(item, "downloadUrl").text = request.build_absolute_uri(
+            reverse("openrosa-form-download", args=[form.pk])
+        )
+    return _xml_response(root)
+
+
+def _definition_etag(request, form_id: int) -> str | None:
+    xml_hash = Form.objects.filter(pk=form_id).values_list("xml_hash", flat=True).first()
+    return f'"{xml_hash}"' if xml_hash else None
+
+
+def _definition_last_modified(request, form_id: int):
+    return Form.objects.filter(pk=form_id).values_list("updated_at", flat=True).first()
+
+
+@require_GET
+@condition(etag_func=_definition_etag, last_modified_func=_definition_last_modified)
+def form_download(request, form_id: int):
+    form = get_object_or_404(Form.objects.only("xml_definition"), pk=form_id)
+    response = HttpResponse(form.xml_definition, content_type="text/xml; charset=utf-8")
+    response["X-OpenRosa-Version"] = OPENROSA_VERSION
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["HEAD", "GET", "POST"])
+def submission(request):
+    if request.method != "POST":
+        response = HttpResponse(status=204)
+        response["X-OpenRosa-Version"] = OPENROSA_VERSION
+        response["X-OpenRosa-Accept-Content-Length"] = str(max_content_length())
+        return response
+
+    content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    if content_length > max_content_length():
+        return _submission_response("Request exceeds the maximum accepted size.", 413, nature="error")
+    if not request.content_type.startswith("multipart/"):
+        return _submission_response("Submissions must be sent as multipart/form-data.", 400, nature="error")
+
+    # Must be set before request.FILES is first touched.
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+    xml_file = request.FILES.get(XML_SUBMISSION_FIELD)
+    if xml_file is None:
+        return _submission_response(f"Missing {XML_SUBMISSION_FIELD} part.", 400, nature="error")
+
+    try:
+        xml_payload = b"".join(xml_file.chunks()).decode("utf-8")
+        root = parse_submission(xml_payload)
+    except (UnicodeDecodeError, SubmissionRejected) as exc:
+        return _submission_response(str(exc), 400, nature="error")
+
+    matches = list(Form.objects.filter(xform_id=root.get("id") or "")[:2])
+    if not matches:
+        return _submission_response("No form on this server matches the submission.", 404, nature="error")
+    if len(matches) > 1:
+        return _submission_response(
+            f"Several forms on this server use the form ID '{root.get('id')}'.", 409, nature="error"
+        )
+    form = matches[0]
+
+    user = request.user if request.user.is_authenticated else None
+    try:
+        stored, created = ingest_submission(form, xml_payload, user)
+    except SubmissionConflict as exc:
+        return _submission_response(str(exc), 409, nature="error")
+    except SubmissionRejected as exc:
+        return _submission_response(str(exc), 400, nature="error")
+
+    if not created and not FormSubmission.objects.filter(pk=stored.pk).exists():
+        # A retry of an archived instance; archived rows have no media and
+        # cannot take new attachments, so the resent files are dropped.
+        return _submission_response("Submission already received.", 202, nature="submit_success")
+
+    media = [
+        uploaded
+        for field, files in request.FILES.lists()
+        if field != XML_SUBMISSION_FIELD
+        for uploaded in files
+    ]
+    for uploaded in media:
+        store_attachment(stored, uploaded.name, uploaded, content_type=uploaded.content_type or "")
+
+    if created:
+        return _submission_response("Form received.", 201, nature="submit_success")
+    return _submission_response("Submission already received.", 202, nature="submit_success")
@@ -0,0 +1,52 @@
+"""Keyset (cursor) pagination helpers shared by the forms API.
+
+Cursors are opaque, URL-safe tokens wrapping the ordering key of the last row
+on a page. The next page is fetched with a ``WHERE key > cursor`` range scan
+instead of an ``OFFSET``, so deep pages cost the same as the first one.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from typing import Any
+
+from ninja.errors import HttpError
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: list[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *, size: int) -> list[Any]:
+    """Decode a cursor produced by :func:`encode_cursor`.
+
+    Raises HttpError(400) when the token is malformed or has the wrong arity.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise HttpError(400, "Invalid pagination cursor.") from exc
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HttpError(400, "Invalid pagination cursor.")
+
+    return values
+
+
+def set_next_cursor(request, response, cursor: str | None) -> None:
+    """Expose the next page's cursor via ``X-Next-Cursor`` and a ``Link`` header."""
+    if cursor is None:
+        return
+
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    response[NEXT_CURSOR_HEADER] = cursor
+    response["Link"] = f'<{request.path}?{params.urlencode()}>; rel="next"'
+    response["Access-Control-Expose-Headers"] = f"{NEXT_CURSOR_HEADER}, Link"
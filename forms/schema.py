@@ -0,0 +1,237 @@
+"""Compiled XForm schema index used to validate incoming submissions.
+
+A form's ``xml_definition`` is compiled once into a :class:`FormSchema` —
+instance root and form id, every node path with its bind type, and which
+groups repeat — and cached per process. A
+submission is then checked in a single pass over its elements, so
+validation costs O(size of the instance) instead of re-reading the
+definition on every request.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import re
+import threading
+import xml.etree.ElementTree as ET
+
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+from .xforms import local_name, primary_instance_root
+
+
+SCHEMA_CACHE_SIZE = 256
+MAX_REPORTED_ERRORS = 5
+JR_TEMPLATE_ATTR = "{http://openrosa.org/javarosa}template"
+
+_INT_RE = re.compile(r"^[+-]?\d+$")
+_DECIMAL_RE = re.compile(r"^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$")
+_GEOPOINT_RE = re.compile(r"^-?\d+(\.\d+)?( -?\d+(\.\d+)?){1,3}$")
+
+
+def _is_int(value: str) -> bool:
+    return bool(_INT_RE.match(value))
+
+
+def _is_decimal(value: str) -> bool:
+    return bool(_DECIMAL_RE.match(value))
+
+
+def _is_date(value: str) -> bool:
+    try:
+        return parse_date(value) is not None
+    except ValueError:
+        return False
+
+
+def _is_datetime(value: str) -> bool:
+    try:
+        return parse_datetime(value) is not None
+    except ValueError:
+        return False
+
+
+def _is_time(value: str) -> bool:
+    # XForm times may carry a UTC offset, e.g. 10:15:00.000+03:00.
+    try:
+        return parse_time(re.sub(r"([+-]\d{2}:\d{2}|Z)$", "", value)) is not None
+    except ValueError:
+        return False
+
+
+TYPE_CHECKS = {
+    "int": _is_int,
+    "integer": _is_int,
+    "decimal": _is_decimal,
+    "date": _is_date,
+    "dateTime": _is_datetime,
+    "time": _is_time,
+    "boolean": lambda value: value in ("true", "false", "1", "0"),
+    "geopoint": lambda value: bool(_GEOPOINT_RE.match(value)),
+}
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    path: str
+    type: str = "string"
+    is_leaf: bool = True
+    repeat: bool = False
+
+
+@dataclass
+class FormSchema:
+    root_tag: str
+    form_id: str | None
+    nodes: dict[str, NodeSpec] = field(default_factory=dict)
+
+    @property
+    def repeats(self) -> set[str]:
+        return {path for path, spec in self.nodes.items() if spec.repeat}
+
+    def validate(self, root: ET.Element) -> list[str]:
+        """Return a list of problems with a submitted instance (empty when valid)."""
+        errors: list[str] = []
+        root_tag = local_name(root.tag)
+        if root_tag != self.root_tag:
+            return [f"Submission root <{root_tag}> does not match the form's <{self.root_tag}>."]
+
+        submitted_id = root.get("id")
+        if self.form_id and submitted_id and submitted_id != self.form_id:
+            errors.append(f"Submission is for form '{submitted_id}', not '{self.form_id}'.")
+
+        self._validate_children(root, f"/{root_tag}", errors)
+        return errors
+
+    def _validate_children(self, element: ET.Element, path: str, errors: list[str]) -> None:
+        seen: set[str] = set()
+        for child in element:
+            child_path = f"{path}/{local_name(child.tag)}"
+            spec = self.nodes.get(child_path)
+
+            if spec is None:
+                # Clients add their own metadata (instanceName, deprecatedID, ...).
+                if not path.endswith("/meta"):
+                    errors.append(f"Unexpected element {child_path}.")
+                continue
+            if child_path in seen and not spec.repeat:
+                errors.append(f"Element {child_path} appears more than once but is not a repeat.")
+            seen.add(child_path)
+
+            if spec.is_leaf:
+                if len(child):
+                    errors.append(f"Element {child_path} should not contain child elements.")
+                    continue
+                value = (child.text or "").strip()
+                check = TYPE_CHECKS.get(spec.type)
+                if value and check is not None and not check(value):
+                    errors.append(f"Value {value!r} of {child_path} is not a valid {spec.type}.")
+            else:
+                self._validate_children(child, child_path, errors)
+
+            if len(errors) >= MAX_REPORTED_ERRORS:
+                return
+
+
+def compile_schema(xml_definition: str) -> FormSchema | None:
+    """Compile an XForm definition into a FormSchema.
+
+    Returns None when the definition has no parsable primary instance, in
+    which case submissions cannot be checked against it.
+    """
+    try:
+        document = ET.fromstring(xml_definition)
+    except ET.ParseError:
+        return None
+    root = primary_instance_root(document)
+    if root is None:
+        return None
+
+    binds: dict[str, dict[str, str]] = {}
+    repeat_paths: set[str] = set()
+    for element in document.iter():
+        name = local_name(element.tag)
+        if name == "bind" and element.get("nodeset"):
+            binds[element.get("nodeset")] = element.attrib
+        elif name == "repeat" and element.get("nodeset"):
+            repeat_paths.add(element.get("nodeset"))
+
+    root_tag = local_name(root.tag)
+    schema = FormSchema(root_tag=root_tag, form_id=root.get("id"))
+
+    def visit(element: ET.Element, path: str) -> None:
+        for child in element:
+            child_path = f"{path}/{local_name(child.tag)}"
+            bind = binds.get(child_path, {})
+            bind_type = bind.get("type", "string")
+            schema.nodes[child_path] = NodeSpec(
+                path=child_path,
+                type=bind_type.split(":")[-1],
+                is_leaf=len(child) == 0,
+                repeat=child_path in repeat_paths or JR_TEMPLATE_ATTR in child.attrib,
+            )
+            visit(child, child_path)
+
+    visit(root, f"/{root_tag}")
+    return schema
+
+
+class SchemaCache:
+    """Per-process LRU of compiled schemas.
+
+    Forms are keyed by id and entries remember the form's ``updated_at`` they
+    were compiled from, so a definition changed by another process is
+    recompiled on next use; local changes invalidate the entry immediately
+    (see forms.signals). FormVersion rows never change, so their entries
+    are keyed by version id and definition hash.
+    """
+
+    def __init__(self, max_entries: int = SCHEMA_CACHE_SIZE) -> None:
+        self._entries: OrderedDict[tuple, tuple[object, FormSchema | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+    def get(self, form) -> FormSchema | None:
+        return self._get(("form", form.pk), form.updated_at, form.xml_definition)
+
+    def get_version(self, form_version) -> FormSchema | None:
+        return self._get(("version", form_version.pk), form_version.xml_hash, form_version.xml_definition)
+
+    def _get(self, key: tuple, stamp, xml_definition: str) -> FormSchema | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        schema = compile_schema(xml_definition)
+        with self._lock:
+            self._entries[key] = (stamp, schema)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return schema
+
+    def invalidate(self, form_id: int) -> None:
+        with self._lock:
+            self._entries.pop(("form", form_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+schema_cache = SchemaCache()
+
+
+def get_form_schema(form) -> FormSchema | None:
+    return schema_cache.get(form)
+
+
+def get_version_schema(form_version) -> FormSchema | None:
+    return schema_cache.get_version(form_version)
+
+
+def invalidate_form_schema(form_id: int) -> None:
+    schema_cache.invalidate(form_id)
@@ -0,0 +1,99 @@
+"""Submission search: full-text over answers and exact matches on fields.
+
+On PostgreSQL both kinds of search are index-driven (see migration 0015):
+
+- text is matched against ``jsonb_to_tsvector('simple', data, '["string"]')``,
+  the answer values of the structured ``data`` column, through a GIN
+  expression index;
+- ``field = value`` conditions become ``data @> {"<xpath>": "<value>"}``,
+  served by a ``jsonb_path_ops`` GIN index on ``data``.
+
+SQLite gets the same results from unindexed scans (a substring match over
+the answer values with ``json_each`` and a JSON key lookup), which is fine
+at SQLite sizes. Neither path reads the XML body, which may be compressed
+(see forms.compression).
+"""
+
+from __future__ import annotations
+
+from django.contrib.postgres.search import SearchQuery, SearchVectorField
+from django.db import connections
+from django.db.models import BooleanField, Func
+from django.db.models.expressions import RawSQL
+
+from .models import FormSubmission
+from .xforms import definition_field_paths
+
+
+class SubmissionDocument(Func):
+    """The tsvector of a submission's answers; must match the index expression exactly."""
+
+    function = "jsonb_to_tsvector"
+    template = "%(function)s('simple', %(expressions)s, '[\"string\"]')"
+    output_field = SearchVectorField()
+
+
+def _answers_contain(term: str) -> RawSQL:
+    """SQLite: any answer value contains ``term`` (case-insensitively for ASCII)."""
+    pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    table = FormSubmission._meta.db_table
+    return RawSQL(
+        f'EXISTS (SELECT 1 FROM json_each("{table}"."data") WHERE json_each.value LIKE %s ESCAPE \'\\\')',
+        [pattern],
+        output_field=BooleanField(),
+    )
+
+
+class UnknownField(ValueError):
+    """A field condition names no field (or several) of the form; safe to return to clients."""
+
+
+def resolve_field_path(xml_definition: str, name: str) -> str:
+    """Map ``name`` to one of the form's field XPaths.
+
+    Full paths (``/data/group/village``) must exist in the definition; a bare
+    name (``village``) must be the last segment of exactly one field.
+    """
+    paths = definition_field_paths(xml_definition)
+    if name.startswith("/"):
+        if name in paths:
+            return name
+        raise UnknownField(f"Unknown field: {name}")
+    matches = [path for path in paths if path.rsplit("/", 1)[-1] == name]
+    if len(matches) != 1:
+        raise UnknownField(f"Unknown field: {name}" if not matches else f"Ambiguous field {name}: use its full path.")
+    return matches[0]
+
+
+def search_submissions(queryset, *, text: str = "", fields: dict[str, str] | None = None):
+    """Narrow a FormSubmission queryset to rows matching ``text`` and every ``{xpath: value}``."""
+    postgres = connections[queryset.db].vendor == "postgresql"
+
+    for path, value in (fields or {}).items():
+        if postgres:
+            queryset = queryset.filter(data__contains={path: value})
+        else:
+            queryset = queryset.filter(**{f"data__{path}": value})
+
+    text = text.strip()
+    if text:
+        if postgres:
+            queryset = queryset.annotate(document=SubmissionDocument("data")).filter(
+                document=SearchQuery(text, config="simple", search_type="websearch")
+            )
+        else:
+            for term in text.split():
+                queryset = queryset.filter(_answers_contain(term))
+    return queryset
+
+
+def split_search_term(term: str) -> tuple[str, dict[str, str]]:
+    """Split an admin search box entry into free text and ``/xpath=value`` conditions."""
+    words, fields = [], {}
+    for word in term.split():
+        path, sep, value = word.partition("=")
+        if sep and path.startswith("/"):
+            fields[path] = value
+        else:
+            words.append(word)
+    return " ".join(words), fields
@@ -0,0 +1,56 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .attachments import partial_path, release_blob
+from .caching import invalidate_form_responses
+from .counters import forget_submission
+from .models import AttachmentUpload, Form, FormSubmission, SubmissionArchive, SubmissionAttachment
+from .schema import invalidate_form_schema
+
+
+@receiver(post_save, sender=Form)
+@receiver(post_delete, sender=Form)
+def invalidate_compiled_schema(sender, instance: Form, **kwargs) -> None:
+    """Drop the compiled schema whenever a form's definition may have changed."""
+    invalidate_form_schema(instance.pk)
+
+
+@receiver(post_save, sender=Form)
+@receiver(post_delete, sender=Form)
+def invalidate_form_cache(sender, instance: Form, **kwargs) -> None:
+    """Drop cached list pages and detail responses that may show the form."""
+    invalidate_form_responses(instance.pk)
+
+
+@receiver(post_save, sender=FormSubmission)
+def invalidate_submission_form_cache(sender, instance: FormSubmission, **kwargs) -> None:
+    invalidate_form_responses(instance.form_id)
+
+
+@receiver(post_delete, sender=FormSubmission)
+def update_submission_counters(sender, instance: FormSubmission, origin=None, **kwargs) -> None:
+    """Keep the form's counters and rollups in step; skipped when the form itself
+    is being deleted and when the submission is only moving to an archive."""
+    if isinstance(origin, (Form, SubmissionArchive)):
+        return
+    forget_submission(instance.form_id, instance.submitted_at, instance.user_id)
+    invalidate_form_responses(instance.form_id)
+
+
+@receiver(post_delete, sender=SubmissionAttachment)
+def release_attachment_blob(sender, instance: SubmissionAttachment, **kwargs) -> None:
+    """Delete the stored file once the last attachment sharing it is gone (after commit)."""
+    transaction.on_commit(partial(release_blob, instance.file.name))
+
+
+@receiver(post_delete, sender=SubmissionArchive)
+def remove_archive_segment(sender, instance: SubmissionArchive, **kwargs) -> None:
+    transaction.on_commit(partial(instance.file.storage.delete, instance.file.name))
+
+
+@receiver(post_delete, sender=AttachmentUpload)
+def remove_partial_upload(sender, instance: AttachmentUpload, **kwargs) -> None:
+    partial_path(instance).unlink(missing_ok=True)
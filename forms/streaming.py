@@ -0,0 +1,38 @@
+"""Streamed response bodies that stay streamed under both WSGI and ASGI.
+
+``StreamingHttpResponse`` only streams an iterator of the kind its server
+consumes. Under ASGI a synchronous iterator is first collected into a list
+(``sync_to_async(list)``), and under WSGI an asynchronous one is, so either
+mismatch holds the whole body in memory. :func:`stream_body` hands the
+response the right kind for the request's handler.
+
+Under ASGI the synchronous iterator still does the work (reading storage,
+or rows through a server-side cursor); it is advanced in the request's
+sync thread, ``batch_size`` items per hop.
+"""
+
+from __future__ import annotations
+
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+def stream_body(request, iterator, *, batch_size: int = 1):
+    """Return ``iterator``, or an async iterator over it when ``request`` came in over ASGI."""
+    if isinstance(request, ASGIRequest):
+        return _aiterate(iter(iterator), batch_size)
+    return iterator
+
+
+async def _aiterate(iterator, batch_size: int):
+    next_batch = sync_to_async(lambda: list(islice(iterator, batch_size)))
+    try:
+        while batch := await next_batch():
+            for item in batch:
+                yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await sync_to_async(close)()
@@ -1,17 +1,132 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+import hashlib
 import json
-from io import BytesIO
+from io import BytesIO, StringIO
 from pathlib import Path
+from types import SimpleNamespace
+import gzip
+import tempfile
+import zlib
+import xml.etree.ElementTree as ET
+from unittest import mock
 
+from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, RequestFactory, TestCase
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import Workbook
 
+from config import middleware
+
+from . import api
 from .api import FormSubmissionOut, submit_form
-from .models import Form, FormSubmission
+from . import conversion
+from .archive import archive_submissions
+from .attachments import store_attachment
+from .conversion import (
+    ConversionPool,
+    ConversionPoolBusy,
+    ConversionTimeout,
+    conversion_cache,
+    convert_xlsform,
+)
+from .compression import COMPRESSED_PREFIX, DICTIONARY_RECHECK_SECONDS, compress_text, dictionary_cache
+from .counters import hour_bucket, rebuild_counters, rebuild_rollups
+from .deletion import reap_deleted_forms, soft_delete_form
+from .ingest import ingest_batch, ingest_submission
+from . import jobs
+from .jobs import claim_next_job, requeue_stale_jobs, run_pending_jobs
+from . import schema as schema_module
+from .models import (
+    AttachmentUpload,
+    CompressionDictionary,
+    ConversionJob,
+    Form,
+    FormSubmission,
+    ArchivedSubmission,
+    FormVersion,
+    SubmissionArchive,
+    SubmissionAttachment,
+    SubmissionRollup,
+)
+from .schema import get_form_schema, schema_cache
+from .search import SubmissionDocument, search_submissions
+from .versions import set_definition
+from .xforms import xform_id
+from .writes import serialized_write
 
 User = get_user_model()
 
 
+SAMPLE_XFORM = """<?xml version="1.0"?>
+<h:html xmlns="http://www.w3.org/2002/xforms" xmlns:h="http://www.w3.org/1999/xhtml"
+        xmlns:jr="http://openrosa.org/javarosa" xmlns:orx="http://openrosa.org/xforms">
+  <h:head>
+    <h:title>Household</h:title>
+    <model>
+      <instance>
+        <data id="household" version="2024010101">
+          <village/>
+          <details>
+            <age/>
+          </details>
+          <child jr:template="">
+            <child_name/>
+          </child>
+          <meta>
+            <instanceID/>
+          </meta>
+        </data>
+      </instance>
+      <bind nodeset="/data/village" type="string" required="true()"/>
+      <bind nodeset="/data/details/age" type="int"/>
+      <bind nodeset="/data/child/child_name" type="string"/>
+      <bind nodeset="/data/meta/instanceID" type="string" readonly="true()" jqm:preload="uid"
+            xmlns:jqm="http://openrosa.org/javarosa"/>
+    </model>
+  </h:head>
+  <h:body/>
+</h:html>
+"""
+
+
+def sample_instance(village="Kebele 01", age="34", children=("Abebe",), instance_id="uuid:1"):
+    child_xml = "".join(f"<child><child_name>{name}</child_name></child>" for name in children)
+    return (
+        f'<data id="household" version="2024010101"><village>{village}</village>'
+        f"<details><age>{age}</age></details>{child_xml}"
+        f"<meta><instanceID>{instance_id}</instanceID></meta></data>"
+    )
+
+
+def build_xlsform(*questions: tuple[str, str, str]) -> bytes:
+    """Build a minimal XLSForm workbook from (type, name, label) survey rows."""
+    workbook = Workbook()
+    survey = workbook.active
+    survey.title = "survey"
+    survey.append(["type", "name", "label"])
+    for row in questions or [("text", "village", "Village")]:
+        survey.append(list(row))
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def xlsform_upload(content: bytes, name: str = "test_form.xlsx") -> SimpleUploadedFile:
+    return SimpleUploadedFile(
+        name,
+        content,
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
 class FormCollectionViewTests(TestCase):
     def setUp(self) -> None:
         self.client = Client()
@@ -126,6 +241,46 @@ class FormCollectionViewTests(TestCase):
         self.assertIsInstance(payload, list)
         self.assertEqual(len(payload), 2)
         self.assertEqual({item["name"] for item in payload}, {"Water", "Health"})
+        self.assertNotIn("xml_definition", payload[0])
+
+    def test_list_forms_paginates_with_cursor(self):
+        for name in ["Alpha", "Bravo", "Charlie"]:
+            Form.objects.create(name=name, xml_definition="<data />")
+
+        first = self.client.get(self.collection_url, {"limit": 2})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([item["name"] for item in first.json()], ["Alpha", "Bravo"])
+        cursor = first["X-Next-Cursor"]
+
+        second = self.client.get(self.collection_url, {"limit": 2, "cursor": cursor})
+
+        self.assertEqual([item["name"] for item in second.json()], ["Charlie"])
+        self.assertFalse(second.has_header("X-Next-Cursor"))
+
+    def test_list_forms_rejects_invalid_cursor(self):
+        response = self.client.get(self.collection_url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_forms_projects_requested_fields(self):
+        Form.objects.create(name="Water", version="v2", xml_definition="<data />")
+
+        response = self.client.get(self.collection_url, {"fields": "id,version"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()[0]), {"id", "version"})
+
+        response = self.client.get(self.collection_url, {"fields": "xml_definition"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_form_xml_streams_definition(self):
+        form = Form.objects.create(name="Water", xml_definition="<data id='water'></data>")
+
+        response = self.client.get(f"{self.collection_url}{form.pk}/xml/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content), b"<data id='water'></data>")
 
 
 class FormDetailViewTests(TestCase):
@@ -167,6 +322,40 @@ class FormDetailViewTests(TestCase):
         self.assertEqual(data["submissions"][0]["username"], None)  # Most recent first (no user)
         self.assertEqual(data["submissions"][1]["username"], "formuser")
 
+    def test_get_form_detail_uses_fixed_number_of_queries(self):
+        for i in range(8):
+            user = User.objects.create_user(username=f"user{i}", password="pass123")
+            FormSubmission.objects.create(
+                form=self.form, user=user, xml_submission=f"<data><n>{i}</n></data>"
+            )
+
+        # One query for the form, one for the submissions joined with their users.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.detail_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["submissions"]), 8)
+
+    def test_get_form_detail_can_omit_or_truncate_submission_bodies(self):
+        FormSubmission.objects.create(
+            form=self.form, user=self.user, xml_submission="<data><test>1234567890</test></data>"
+        )
+
+        response = self.client.get(self.detail_url, {"submission_body": "none"})
+        submission = response.json()["submissions"][0]
+        self.assertIsNone(submission["xml_submission"])
+        self.assertEqual(submission["username"], "formuser")
+
+        response = self.client.get(
+            self.detail_url, {"submission_body": "truncated", "preview_length": 6}
+        )
+        submission = response.json()["submissions"][0]
+        self.assertEqual(submission["xml_submission"], "<data>")
+        self.assertTrue(submission["xml_truncated"])
+
+        response = self.client.get(self.detail_url, {"submissions": 0})
+        self.assertEqual(response.json()["submissions"], [])
+
     def test_patch_updates_form_fields(self):
         payload = {"description": "Updated description."}
         response = self.client.patch(
@@ -206,6 +395,7 @@ class FormDetailViewTests(TestCase):
         response = self.client.delete(self.detail_url)
         self.assertEqual(response.status_code, 204)
         self.assertFalse(Form.objects.filter(pk=self.form.pk).exists())
+        self.assertTrue(Form.all_objects.filter(pk=self.form.pk, deleted_at__isnull=False).exists())
     
     def test_delete_nonexistent_form_returns_not_found(self):
         response = self.client.delete("/api/forms/9999/")
@@ -247,10 +437,11 @@ class FormSubmissionViewTests(TestCase):
         factory = RequestFactory()
         request = factory.post(self.submission_url, data={"xml": self.sample_xml})
         request.user = self.user  # Add user to request
+        request.auser = sync_to_async(lambda: self.user)
         _ = request.POST  # Force parsing so data stays available after overriding body.
         request._body = b"   "
 
-        status_code, payload = submit_form(request, form_id=self.form.pk)
+        status_code, payload = async_to_sync(submit_form)(request, form_id=self.form.pk)
 
         self.assertEqual(status_code, 201)
         self.assertIsInstance(payload, FormSubmissionOut)
@@ -273,9 +464,63 @@ class FormSubmissionViewTests(TestCase):
         self.assertIn("Missing XML", response.json()["detail"])
         self.assertEqual(FormSubmission.objects.count(), 0)
 
-    def test_submission_endpoint_rejects_non_post(self):
-        response = self.client.get(self.submission_url)
+    def test_submission_endpoint_rejects_unsupported_method(self):
+        response = self.client.put(self.submission_url)
         self.assertEqual(response.status_code, 405)
+
+    def test_submit_form_stores_parsed_answers(self):
+        xml = "<data><result>ok</result><group><age>7</age></group></data>"
+
+        self.client.post(self.submission_url, data=xml, content_type="text/xml; charset=utf-8")
+
+        self.assertEqual(
+            FormSubmission.objects.get().data, {"/data/result": "ok", "/data/group/age": "7"}
+        )
+
+    def test_backfill_command_parses_legacy_rows(self):
+        legacy = FormSubmission.objects.create(form=self.form, xml_submission=self.sample_xml)
+
+        call_command("backfill_submission_data", stdout=StringIO())
+
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.data, {"/data/result": "ok"})
+
+    def test_backfill_command_sets_instance_ids_and_collapses_retries(self):
+        def legacy(instance_id=None):
+            meta = f"<meta><instanceID>{instance_id}</instanceID></meta>" if instance_id else ""
+            return FormSubmission.objects.create(
+                form=self.form, xml_submission=f"<data><result>ok</result>{meta}</data>"
+            )
+
+        first, retry, unidentified = legacy("uuid:1"), legacy("uuid:1"), legacy()
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            store_attachment(retry, "photo.jpg", SimpleUploadedFile("photo.jpg", b"jpeg"))
+
+            call_command("backfill_submission_data", "--batch-size", "2", stdout=StringIO())
+
+            self.assertEqual(
+                sorted(FormSubmission.objects.values_list("pk", "instance_id"), key=lambda row: row[0]),
+                [(first.pk, "uuid:1"), (unidentified.pk, None)],
+            )
+            self.assertEqual(list(first.attachments.values_list("name", flat=True)), ["photo.jpg"])
+            _, created = ingest_submission(
+                self.form, "<data><result>ok</result><meta><instanceID>uuid:1</instanceID></meta></data>"
+            )
+            self.assertFalse(created)
+
+    def test_submit_form_records_instance_id(self):
+        xml = (
+            "<data><result>ok</result>"
+            "<meta><instanceID>uuid:1234</instanceID></meta></data>"
+        )
+
+        response = self.client.post(
+            self.submission_url, data=xml, content_type="text/xml; charset=utf-8"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["instance_id"], "uuid:1234")
+        self.assertEqual(FormSubmission.objects.get().instance_id, "uuid:1234")
     
     def test_submit_form_anonymous_user(self):
         # Don't login, submit as anonymous user
@@ -291,3 +536,1563 @@ class FormSubmissionViewTests(TestCase):
         
         response_data = response.json()
         self.assertIsNone(response_data["username"])
+
+
+class FormSubmissionListViewTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.user = User.objects.create_user(username="lister", password="pass123")
+        self.form = Form.objects.create(name="Listing", xml_definition="<data id='listing'></data>")
+        self.list_url = f"/api/forms/{self.form.pk}/submissions/"
+        self.submissions = [
+            FormSubmission.objects.create(
+                form=self.form,
+                user=self.user if i % 2 else None,
+                xml_submission=f"<data><n>{i}</n></data>",
+                instance_id=f"uuid:{i}",
+            )
+            for i in range(5)
+        ]
+
+    def test_list_submissions_paginates_newest_first(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(self.list_url, params)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item["submission_id"] for item in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        expected = [
+            sub.pk
+            for sub in sorted(self.submissions, key=lambda s: (s.submitted_at, s.pk), reverse=True)
+        ]
+        self.assertEqual(seen, expected)
+
+    def test_list_submissions_filters(self):
+        response = self.client.get(self.list_url, {"user_id": self.user.pk})
+        self.assertEqual(len(response.json()), 2)
+        self.assertTrue(all(item["username"] == "lister" for item in response.json()))
+
+        response = self.client.get(self.list_url, {"instance_id": "uuid:3"})
+        self.assertEqual([item["instance_id"] for item in response.json()], ["uuid:3"])
+
+        response = self.client.get(
+            self.list_url, {"submitted_after": "2000-01-01T00:00:00Z", "submitted_before": "2000-01-02T00:00:00Z"}
+        )
+        self.assertEqual(response.json(), [])
+
+    def test_list_submissions_unknown_form_returns_not_found(self):
+        response = self.client.get("/api/forms/9999/submissions/")
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(XFORMS_CONVERSION_WORKERS=0)
+class ConversionCacheTests(TestCase):
+    def setUp(self) -> None:
+        conversion_cache.clear()
+        cache.clear()
+        self.workbook = build_xlsform(("integer", "age", "Age"))
+
+    def tearDown(self) -> None:
+        conversion_cache.clear()
+        cache.clear()
+
+    def test_repeat_conversion_of_same_bytes_is_served_from_cache(self):
+        with mock.patch.object(conversion, "get_xlsform", wraps=conversion.get_xlsform) as convert:
+            first = api._validate_and_convert_xls(xlsform_upload(self.workbook))
+            second = api._validate_and_convert_xls(xlsform_upload(self.workbook))
+
+        self.assertEqual(convert.call_count, 1)
+        self.assertEqual(first[0], second[0])
+        self.assertIn("<?xml", first[0])
+
+    def test_fallback_form_name_comes_from_the_upload_name(self):
+        with mock.patch.object(conversion, "get_xlsform", wraps=conversion.get_xlsform) as convert:
+            first, _, _ = api._validate_and_convert_xls(xlsform_upload(self.workbook, "Household Survey.xlsx"))
+            renamed, _, form_name = api._validate_and_convert_xls(xlsform_upload(self.workbook, "2024 census.xlsx"))
+
+        self.assertEqual(convert.call_count, 2)
+        self.assertEqual(xform_id(first), "Household_Survey")
+        self.assertIn("<h:title>Household_Survey</h:title>", first)
+        self.assertEqual(xform_id(renamed), "_2024_census")
+        self.assertEqual(form_name, "2024 census")
+
+    def test_shared_cache_tier_survives_local_eviction(self):
+        api._validate_and_convert_xls(xlsform_upload(self.workbook))
+        conversion_cache.clear()
+
+        with mock.patch.object(conversion, "get_xlsform") as convert:
+            xml_definition, _, _ = api._validate_and_convert_xls(xlsform_upload(self.workbook))
+
+        convert.assert_not_called()
+        self.assertIn("<?xml", xml_definition)
+
+    def test_changed_workbook_is_converted_again(self):
+        other = build_xlsform(("text", "name", "Name"))
+
+        with mock.patch.object(conversion, "get_xlsform", wraps=conversion.get_xlsform) as convert:
+            api._validate_and_convert_xls(xlsform_upload(self.workbook))
+            api._validate_and_convert_xls(xlsform_upload(other))
+
+        self.assertEqual(convert.call_count, 2)
+
+
+@override_settings(XFORMS_CONVERSION_WORKERS=0)
+class XLSFormConversionTests(TestCase):
+    def setUp(self) -> None:
+        conversion_cache.clear()
+        cache.clear()
+
+    def test_in_memory_upload_is_converted_from_bytes(self):
+        upload = xlsform_upload(build_xlsform(("integer", "age", "Age")))
+
+        with mock.patch.object(conversion, "get_xlsform", wraps=conversion.get_xlsform) as convert, \
+                mock.patch("tempfile.NamedTemporaryFile") as named_temp_file:
+            xml_definition, _, form_name = api._validate_and_convert_xls(upload)
+
+        named_temp_file.assert_not_called()
+        self.assertIsInstance(convert.call_args.kwargs["xlsform"], bytes)
+        self.assertIn("age", xml_definition)
+        self.assertEqual(form_name, "test_form")
+
+    def test_spooled_upload_converts_like_an_in_memory_one(self):
+        from django.core.files.uploadedfile import TemporaryUploadedFile
+
+        workbook = build_xlsform(("text", "village", "Village"))
+        upload = TemporaryUploadedFile("big_form.xlsx", "application/octet-stream", 0, None)
+        self.addCleanup(upload.close)
+        upload.write(workbook)
+        upload.seek(0)
+
+        with mock.patch.object(conversion, "get_xlsform", wraps=conversion.get_xlsform) as convert:
+            spooled, _, _ = api._validate_and_convert_xls(upload)
+        conversion_cache.clear()
+        cache.clear()
+        in_memory, _, _ = api._validate_and_convert_xls(xlsform_upload(workbook, "big_form.xlsx"))
+
+        self.assertIsInstance(convert.call_args.kwargs["xlsform"], bytes)
+        self.assertIn("village", spooled)
+        self.assertEqual(spooled, in_memory)
+        self.assertEqual(xform_id(spooled), "big_form")
+
+    def test_invalid_workbook_returns_bad_request(self):
+        from ninja.errors import HttpError
+
+        with self.assertRaises(HttpError) as ctx, self.assertLogs("forms.api", "ERROR"):
+            api._validate_and_convert_xls(xlsform_upload(b"not a workbook"))
+
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertIn("Failed to convert XLSForm", str(ctx.exception))
+
+
+@override_settings(XFORMS_CONVERSION_WORKERS=1, XFORMS_CONVERSION_QUEUE_SIZE=0)
+class ConversionPoolTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.pool = ConversionPool()
+
+    def tearDown(self) -> None:
+        self.pool.shutdown()
+
+    def test_conversion_runs_in_worker_process(self):
+        xml_definition, _ = self.pool.run(convert_xlsform, build_xlsform(), file_type=".xlsx")
+        self.assertIn("village", xml_definition)
+
+    def test_saturated_pool_fails_fast(self):
+        _, slots = self.pool._ensure_executor(1, 0)
+        slots.acquire()
+        try:
+            with self.assertRaises(ConversionPoolBusy):
+                self.pool.run(convert_xlsform, build_xlsform(), file_type=".xlsx")
+        finally:
+            slots.release()
+
+    @override_settings(XFORMS_CONVERSION_TIMEOUT=0.2)
+    def test_slow_conversion_times_out(self):
+        import time
+
+        with self.assertRaises(ConversionTimeout):
+            self.pool.run(time.sleep, 2)
+
+    def test_api_maps_saturation_to_service_unavailable(self):
+        conversion_cache.clear()
+        upload = xlsform_upload(build_xlsform(("text", "busy", "Busy")))
+
+        with mock.patch.object(api.conversion_pool, "run", side_effect=ConversionPoolBusy()):
+            response = Client().post("/api/forms/preview/", {"file": upload})
+
+        self.assertEqual(response.status_code, 503)
+
+
+@override_settings(XFORMS_CONVERSION_WORKERS=0)
+class ConversionJobTests(TestCase):
+    def setUp(self) -> None:
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.client = Client()
+        conversion_cache.clear()
+        cache.clear()
+
+    def test_async_create_returns_job_and_worker_creates_form(self):
+        response = self.client.post(
+            "/api/forms/?async=1",
+            data={"name": "Queued", "xls_file": xlsform_upload(build_xlsform())},
+        )
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        self.assertEqual(response.json()["status"], "queued")
+        self.assertFalse(Form.objects.exists())
+
+        self.assertEqual(run_pending_jobs(), 1)
+
+        status = self.client.get(f"/api/forms/jobs/{job_id}/").json()
+        self.assertEqual(status["status"], "succeeded")
+        form = Form.objects.get(pk=status["form_id"])
+        self.assertEqual(form.name, "Queued")
+        self.assertIn("village", form.xml_definition)
+        self.assertEqual(form.xform_id, "test_form")
+        self.assertTrue(form.xls_form)
+        self.assertFalse(ConversionJob.objects.get(pk=job_id).xls_file)
+
+    def test_async_update_applies_definition_and_fields(self):
+        form = Form.objects.create(name="Existing", xml_definition="<data />")
+
+        response = self.client.patch(
+            f"/api/forms/{form.pk}/",
+            data=encode_multipart(
+                BOUNDARY,
+                {"description": "Async", "xls_file": xlsform_upload(build_xlsform(("integer", "age", "Age")))},
+            ),
+            content_type=MULTIPART_CONTENT,
+            headers={"Prefer": "respond-async"},
+        )
+
+        self.assertEqual(response.status_code, 202)
+        run_pending_jobs()
+
+        form.refresh_from_db()
+        self.assertIn("age", form.xml_definition)
+        self.assertEqual(form.description, "Async")
+
+    def test_multipart_patch_updates_synchronously(self):
+        form = Form.objects.create(name="Existing", xml_definition="<data />")
+
+        response = self.client.patch(
+            f"/api/forms/{form.pk}/",
+            data=encode_multipart(BOUNDARY, {"name": "Renamed", "xls_file": xlsform_upload(build_xlsform())}),
+            content_type=MULTIPART_CONTENT,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        form.refresh_from_db()
+        self.assertEqual(form.name, "Renamed")
+        self.assertIn("village", form.xml_definition)
+
+    def test_failed_conversion_is_reported_on_the_job(self):
+        response = self.client.post(
+            "/api/forms/?async=1",
+            data={"name": "Broken", "xls_file": xlsform_upload(b"not a workbook")},
+        )
+        job_id = response.json()["job_id"]
+
+        with self.assertLogs("forms.jobs", "ERROR") as logs:
+            call_command("process_conversion_jobs", "--once", stdout=StringIO())
+
+        self.assertIn(f"Conversion job {job_id} failed", logs.output[0])
+        self.assertIn("Traceback", logs.output[0])
+
+        status = self.client.get(f"/api/forms/jobs/{job_id}/").json()
+        self.assertEqual(status["status"], "failed")
+        self.assertIn("Failed to convert XLSForm", status["error"])
+        self.assertFalse(Form.objects.exists())
+
+    def test_unknown_job_returns_not_found(self):
+        self.assertEqual(self.client.get("/api/forms/jobs/9999/").status_code, 404)
+
+    def test_jobs_convert_in_the_bounded_pool(self):
+        self.client.post("/api/forms/?async=1", data={"name": "Slow", "xls_file": xlsform_upload(build_xlsform())})
+
+        with mock.patch.object(
+            jobs.conversion_pool, "run", side_effect=ConversionTimeout("did not finish within 60 seconds.")
+        ) as run:
+            run_pending_jobs()
+
+        run.assert_called_once()
+        job = ConversionJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ConversionJob.STATUS_FAILED, 1))
+        self.assertIn("did not finish", job.error)
+
+    def test_stalled_jobs_fail_after_max_attempts(self):
+        self.client.post("/api/forms/?async=1", data={"name": "Crashy", "xls_file": xlsform_upload(build_xlsform())})
+        job = ConversionJob.objects.get()
+
+        for attempt in range(1, jobs.MAX_JOB_ATTEMPTS + 1):
+            self.assertEqual(claim_next_job().attempts, attempt)
+            # The worker dies mid-conversion.
+            ConversionJob.objects.update(started_at=timezone.now() - timedelta(hours=1))
+            requeued, failed = requeue_stale_jobs(timedelta(minutes=15))
+
+        self.assertEqual((requeued, failed), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ConversionJob.STATUS_FAILED)
+        self.assertIn(f"after {jobs.MAX_JOB_ATTEMPTS} attempts", job.error)
+        self.assertFalse(job.xls_file)
+        self.assertIsNone(claim_next_job())
+
+
+class BulkSubmissionViewTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.form = Form.objects.create(name="Bulk", xml_definition="<data id='bulk'></data>")
+        self.bulk_url = f"/api/forms/{self.form.pk}/submissions/bulk/"
+
+    def test_ndjson_batch_with_partial_failures(self):
+        lines = [
+            json.dumps("<data><n>1</n></data>"),
+            json.dumps({"xml": "<data><n>2</n><meta><instanceID>uuid:2</instanceID></meta></data>"}),
+            json.dumps("<data><n>3</n>"),
+            json.dumps(""),
+        ]
+
+        response = self.client.post(
+            self.bulk_url, data="\n".join(lines), content_type="application/x-ndjson"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual((payload["created"], payload["rejected"]), (2, 2))
+        self.assertEqual(
+            [item["status"] for item in payload["results"]],
+            ["created", "created", "rejected", "rejected"],
+        )
+        self.assertEqual(payload["results"][1]["instance_id"], "uuid:2")
+        self.assertIn("well-formed", payload["results"][2]["error"])
+        self.assertEqual(FormSubmission.objects.filter(form=self.form).count(), 2)
+        created_ids = {item["submission_id"] for item in payload["results"][:2]}
+        self.assertEqual(created_ids, set(FormSubmission.objects.values_list("pk", flat=True)))
+
+    def test_batch_is_written_with_a_single_insert(self):
+        body = "\n".join(json.dumps(f"<data><n>{i}</n></data>") for i in range(20))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(self.bulk_url, data=body, content_type="application/x-ndjson")
+
+        table = FormSubmission._meta.db_table
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith(f'INSERT INTO "{table}"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(FormSubmission.objects.count(), 20)
+
+    def test_multipart_batch_of_files(self):
+        files = [
+            SimpleUploadedFile(f"sub{i}.xml", f"<data><n>{i}</n></data>".encode(), content_type="text/xml")
+            for i in range(3)
+        ]
+
+        response = self.client.post(self.bulk_url, data={"xml_submission_file": files})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 3)
+
+    def test_unsupported_content_type_is_rejected(self):
+        response = self.client.post(self.bulk_url, data="<data/>", content_type="text/xml")
+        self.assertEqual(response.status_code, 415)
+
+    def test_single_submission_rejects_malformed_xml(self):
+        response = self.client.post(
+            f"/api/forms/{self.form.pk}/submissions/", data="<data>", content_type="text/xml"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FormSubmission.objects.exists())
+
+
+class IdempotentSubmissionTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.form = Form.objects.create(name="Retries", xml_definition="<data id='retries'></data>")
+        self.submission_url = f"/api/forms/{self.form.pk}/submissions/"
+
+    @staticmethod
+    def instance(n, instance_id="uuid:1"):
+        return f"<data><n>{n}</n><meta><instanceID>{instance_id}</instanceID></meta></data>"
+
+    def test_resubmitting_an_instance_returns_the_stored_submission(self):
+        first = self.client.post(self.submission_url, data=self.instance(1), content_type="text/xml")
+        retry = self.client.post(self.submission_url, data=self.instance(1), content_type="text/xml")
+
+        self.assertEqual((first.status_code, retry.status_code), (201, 200))
+        self.assertEqual(retry.json()["submission_id"], first.json()["submission_id"])
+        self.assertEqual(FormSubmission.objects.count(), 1)
+
+    def test_different_body_under_same_instance_id_conflicts(self):
+        self.client.post(self.submission_url, data=self.instance(1), content_type="text/xml")
+        response = self.client.post(self.submission_url, data=self.instance(2), content_type="text/xml")
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(FormSubmission.objects.get().data["/data/n"], "1")
+
+    def test_same_instance_id_is_allowed_on_other_forms(self):
+        other = Form.objects.create(name="Other", xml_definition="<data id='other'></data>")
+        for form in (self.form, other):
+            response = self.client.post(
+                f"/api/forms/{form.pk}/submissions/", data=self.instance(1), content_type="text/xml"
+            )
+            self.assertEqual(response.status_code, 201)
+
+    def test_bulk_reports_stored_and_repeated_instances_as_duplicates(self):
+        stored = self.client.post(self.submission_url, data=self.instance(1), content_type="text/xml").json()
+        lines = [
+            self.instance(1),
+            self.instance(2, "uuid:2"),
+            self.instance(2, "uuid:2"),
+            self.instance(9),
+            "<data><n>3</n></data>",
+        ]
+
+        response = self.client.post(
+            f"{self.submission_url}bulk/",
+            data="\n".join(json.dumps(line) for line in lines),
+            content_type="application/x-ndjson",
+        )
+
+        payload = response.json()
+        self.assertEqual(
+            [item["status"] for item in payload["results"]],
+            ["duplicate", "created", "duplicate", "rejected", "created"],
+        )
+        self.assertEqual((payload["created"], payload["duplicates"], payload["rejected"]), (2, 2, 1))
+        self.assertEqual(payload["results"][0]["submission_id"], stored["submission_id"])
+        self.assertEqual(payload["results"][2]["submission_id"], payload["results"][1]["submission_id"])
+        self.assertIn("already exists", payload["results"][3]["error"])
+        self.assertEqual(FormSubmission.objects.count(), 3)
+
+
+class SubmissionExportViewTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.user = User.objects.create_user(username="exporter", password="pass123")
+        self.form = Form.objects.create(name="Household Survey", xml_definition=SAMPLE_XFORM)
+        self.export_url = f"/api/forms/{self.form.pk}/submissions/export/"
+        FormSubmission.objects.create(
+            form=self.form,
+            user=self.user,
+            xml_submission=sample_instance(children=("Abebe", "Sara")),
+            instance_id="uuid:1",
+        )
+        FormSubmission.objects.create(
+            form=self.form,
+            xml_submission=sample_instance(village="Kebele 02", age="51", instance_id="uuid:2"),
+            instance_id="uuid:2",
+        )
+
+    def test_csv_export_flattens_fields_from_definition(self):
+        import csv
+
+        response = self.client.get(self.export_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('filename="household-survey-submissions.csv"', response["Content-Disposition"])
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(
+            rows[0],
+            ["submission_id", "submitted_at", "username", "instance_id",
+             "/data/village", "/data/details/age", "/data/child/child_name", "/data/meta/instanceID"],
+        )
+        self.assertEqual(rows[1][2:], ["exporter", "uuid:1", "Kebele 01", "34", "Abebe; Sara", "uuid:1"])
+        self.assertEqual(rows[2][4:6], ["Kebele 02", "51"])
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.export_url, {"format": "ndjson"})
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["data"]["/data/details/age"], "34")
+        self.assertEqual(records[1]["instance_id"], "uuid:2")
+
+    def test_export_without_parsable_definition_falls_back_to_raw_xml(self):
+        form = Form.objects.create(name="Raw", xml_definition="<data id='raw'></data>")
+        FormSubmission.objects.create(form=form, xml_submission="<data><x>1</x></data>")
+
+        response = self.client.get(f"/api/forms/{form.pk}/submissions/export/")
+
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("xml", content.splitlines()[0])
+        self.assertIn("<data><x>1</x></data>", content)
+
+
+class SubmissionSchemaValidationTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        schema_cache.clear()
+        self.form = Form.objects.create(name="Household", xml_definition=SAMPLE_XFORM)
+        self.submission_url = f"/api/forms/{self.form.pk}/submissions/"
+
+    def post(self, xml):
+        return self.client.post(self.submission_url, data=xml, content_type="text/xml; charset=utf-8")
+
+    def test_compiled_schema_indexes_definition(self):
+        schema = get_form_schema(self.form)
+
+        self.assertEqual((schema.root_tag, schema.form_id), ("data", "household"))
+        self.assertEqual(schema.nodes["/data/details/age"].type, "int")
+        self.assertEqual(schema.repeats, {"/data/child"})
+
+    def test_valid_submission_with_repeats_is_accepted(self):
+        response = self.post(sample_instance(children=("Abebe", "Sara", "Hana")))
+        self.assertEqual(response.status_code, 201)
+
+    def test_submission_not_matching_definition_is_rejected(self):
+        cases = {
+            "<other><village>x</village></other>": "does not match",
+            sample_instance().replace("<village>", "<town>x</town><village>"): "Unexpected element /data/town",
+            sample_instance(age="thirty"): "not a valid int",
+            sample_instance().replace("</details>", "</details><details><age>1</age></details>"): "not a repeat",
+        }
+        for xml, message in cases.items():
+            with self.subTest(message=message):
+                response = self.post(xml)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, response.json()["detail"])
+        self.assertFalse(FormSubmission.objects.exists())
+
+    def test_client_meta_fields_are_allowed(self):
+        xml = sample_instance().replace("</meta>", "<instanceName>HH 1</instanceName></meta>")
+        self.assertEqual(self.post(xml).status_code, 201)
+
+    def test_bulk_path_validates_each_item(self):
+        body = "\n".join([json.dumps(sample_instance()), json.dumps(sample_instance(age="x"))])
+
+        response = self.client.post(
+            f"/api/forms/{self.form.pk}/submissions/bulk/", data=body, content_type="application/x-ndjson"
+        )
+
+        self.assertEqual([item["status"] for item in response.json()["results"]], ["created", "rejected"])
+
+    def test_schema_is_compiled_once_and_invalidated_on_save(self):
+        with mock.patch.object(schema_module, "compile_schema", wraps=schema_module.compile_schema) as compile_:
+            self.post(sample_instance(instance_id="uuid:a"))
+            self.post(sample_instance(instance_id="uuid:b"))
+            self.assertEqual(compile_.call_count, 1)
+
+            self.form.xml_definition = SAMPLE_XFORM.replace("<village/>", "<village/><town/>")
+            self.form.save()
+            response = self.post(sample_instance().replace("<village>", "<town>x</town><village>"))
+
+        self.assertEqual(compile_.call_count, 2)
+        self.assertEqual(response.status_code, 201)
+
+
+class OpenRosaViewTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.form = Form.objects.create(name="Household", xml_definition=SAMPLE_XFORM, version="2024010101")
+
+    def submit(self, xml=None, *media):
+        files = [SimpleUploadedFile("submission.xml", (xml or sample_instance()).encode(), content_type="text/xml")]
+        return self.client.post(
+            "/openrosa/submission",
+            data={"xml_submission_file": files[0], **{f"media{i}": upload for i, upload in enumerate(media)}},
+        )
+
+    def test_form_list_describes_forms(self):
+        Form.objects.create(name="No instance", xml_definition="<data/>")
+
+        response = self.client.get("/openrosa/formList")
+
+        self.assertEqual(response["X-OpenRosa-Version"], "1.0")
+        ns = {"x": "http://openrosa.org/xforms/xformsList"}
+        items = ET.fromstring(response.content).findall("x:xform", ns)
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].findtext("x:formID", namespaces=ns), "household")
+        self.assertTrue(items[0].findtext("x:hash", namespaces=ns).startswith("md5:"))
+        download = self.client.get(items[0].findtext("x:downloadUrl", namespaces=ns))
+        self.assertEqual(download.content.decode(), SAMPLE_XFORM)
+
+    @override_settings(XFORMS_CONVERSION_WORKERS=0)
+    def test_settings_less_workbooks_can_share_a_form_id(self):
+        first = self.client.post(
+            "/api/forms/", data={"name": "Survey A", "xls_file": xlsform_upload(build_xlsform(), "survey.xlsx")}
+        )
+        second = self.client.post(
+            "/api/forms/",
+            data={"name": "Survey B", "xls_file": xlsform_upload(build_xlsform(("text", "town", "Town")), "survey.xlsx")},
+        )
+
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        shared = Form.objects.get(name="Survey A").xform_id
+        self.assertEqual(Form.objects.get(name="Survey B").xform_id, shared)
+        self.assertNotIn(f"<formID>{shared}</formID>".encode(), self.client.get("/openrosa/formList").content)
+
+    def test_shared_form_ids_are_never_guessed(self):
+        Form.objects.create(name="Household copy", xml_definition=SAMPLE_XFORM)
+        listed = self.client.get("/openrosa/formList")
+        response = self.submit()
+
+        self.assertNotIn(b"household", listed.content)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(FormSubmission.objects.exists())
+
+    def test_head_preflight_advertises_accepted_length(self):
+        with override_settings(XFORMS_OPENROSA_MAX_CONTENT_LENGTH=1234):
+            response = self.client.head("/openrosa/submission")
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response["X-OpenRosa-Accept-Content-Length"], "1234")
+
+    def test_submission_with_attachments_split_across_requests(self):
+        photo = SimpleUploadedFile("photo.jpg", b"jpeg-bytes", content_type="image/jpeg")
+        audio = SimpleUploadedFile("audio.m4a", b"m4a-bytes", content_type="audio/mp4")
+
+        first = self.submit(None, photo)
+        second = self.submit(None, audio)
+
+        self.assertEqual((first.status_code, second.status_code), (201, 202))
+        submission = FormSubmission.objects.get()
+        self.assertEqual((submission.form, submission.instance_id), (self.form, "uuid:1"))
+        self.assertEqual(
+            list(SubmissionAttachment.objects.values_list("name", "size")),
+            [("audio.m4a", 9), ("photo.jpg", 10)],
+        )
+        self.assertIn(b"submit_success", second.content)
+
+    def test_retry_of_an_archived_submission_drops_its_media(self):
+        self.submit()
+        FormSubmission.objects.update(submitted_at=timezone.now() - timedelta(days=400))
+        archive_submissions(timedelta(days=30))
+
+        response = self.submit(None, SimpleUploadedFile("photo.jpg", b"jpeg-bytes", content_type="image/jpeg"))
+
+        self.assertEqual(response.status_code, 202)
+        self.assertIn(b"submit_success", response.content)
+        self.assertFalse(FormSubmission.objects.exists())
+        self.assertFalse(SubmissionAttachment.objects.exists())
+
+    def test_submission_errors(self):
+        unknown = self.submit(sample_instance().replace('id="household"', 'id="other"'))
+        self.assertEqual(unknown.status_code, 404)
+
+        not_multipart = self.client.post("/openrosa/submission", data=sample_instance(), content_type="text/xml")
+        self.assertEqual(not_multipart.status_code, 400)
+
+        with override_settings(XFORMS_OPENROSA_MAX_CONTENT_LENGTH=10):
+            too_large = self.submit()
+        self.assertEqual(too_large.status_code, 413)
+        self.assertFalse(FormSubmission.objects.exists())
+
+
+class SubmissionAttachmentTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.form = Form.objects.create(name="Media", xml_definition="<data id='media'></data>")
+        self.submission = FormSubmission.objects.create(form=self.form, xml_submission="<data/>")
+        self.attachments_url = f"/api/forms/{self.form.pk}/submissions/{self.submission.pk}/attachments/"
+
+    def start(self, name, size, submission_url=None):
+        return self.client.post(
+            submission_url or self.attachments_url,
+            data={"name": name, "size": size, "content_type": "image/jpeg"},
+            content_type="application/json",
+        )
+
+    def send(self, upload_url, offset, chunk):
+        return self.client.patch(
+            upload_url, data=chunk, content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def upload(self, name, content, submission_url=None):
+        upload_url = self.start(name, len(content), submission_url).json()["upload_url"]
+        return self.send(upload_url, 0, content).json()
+
+    def test_chunked_upload_can_resume_after_interruption(self):
+        content = bytes(range(256)) * 40
+        started = self.start("photo.jpg", len(content))
+        self.assertEqual(started.status_code, 201)
+        upload_url = started.json()["upload_url"]
+
+        first = self.send(upload_url, 0, content[:4000])
+        self.assertEqual((first.json()["offset"], first["Upload-Offset"]), (4000, "4000"))
+
+        # The client lost track of progress: a stale offset is refused with the real one.
+        stale = self.send(upload_url, 1000, content[1000:2000])
+        self.assertEqual((stale.status_code, stale.json()["offset"]), (409, 4000))
+        resumed = self.start("photo.jpg", len(content)).json()
+        self.assertEqual((resumed["upload_url"], resumed["offset"]), (upload_url, 4000))
+
+        last = self.send(upload_url, 4000, content[4000:])
+        self.assertTrue(last.json()["complete"])
+        attachment = SubmissionAttachment.objects.get()
+        self.assertEqual((attachment.size, attachment.content_type), (len(content), "image/jpeg"))
+        self.assertEqual(attachment.file.read(), content)
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertFalse(any((Path(self.media_root.name) / "partial_uploads").iterdir()))
+
+    def test_identical_media_is_stored_once(self):
+        other = FormSubmission.objects.create(form=self.form, xml_submission="<data/>")
+        other_url = f"/api/forms/{self.form.pk}/submissions/{other.pk}/attachments/"
+
+        self.upload("a.jpg", b"same bytes")
+        self.upload("b.jpg", b"same bytes", other_url)
+
+        first, second = SubmissionAttachment.objects.order_by("pk")
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(first.content_hash, second.content_hash)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(second.file.storage.exists(second.file.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(second.file.storage.exists(second.file.name))
+
+    def test_download_supports_range_requests(self):
+        content = b"0123456789" * 10
+        self.upload("clip.m4a", content)
+        download_url = self.client.get(self.attachments_url).json()[0]["download_url"]
+
+        full = self.client.get(download_url)
+        self.assertEqual(b"".join(full.streaming_content), content)
+        self.assertEqual(full["Accept-Ranges"], "bytes")
+
+        partial = self.client.get(download_url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(b"".join(partial.streaming_content), content[10:20])
+
+        suffix = self.client.get(download_url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(suffix.streaming_content), content[-5:])
+
+        unsatisfiable = self.client.get(download_url, HTTP_RANGE="bytes=200-")
+        self.assertEqual(unsatisfiable.status_code, 416)
+
+    def test_chunk_past_declared_size_is_rejected(self):
+        upload_url = self.start("photo.jpg", 4).json()["upload_url"]
+        response = self.send(upload_url, 0, b"too long")
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalFormDeliveryTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.form = Form.objects.create(name="Household", xml_definition=SAMPLE_XFORM)
+        self.detail_url = f"/api/forms/{self.form.pk}/"
+
+    def test_unchanged_form_detail_answers_not_modified(self):
+        first = self.client.get(self.detail_url)
+        self.assertTrue(first["ETag"].startswith('W/"'))
+        self.assertIn("no-cache", first["Cache-Control"])
+
+        repeat = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.content, b"")
+
+        FormSubmission.objects.create(form=self.form, xml_submission=sample_instance())
+        after_submission = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(after_submission.status_code, 200)
+
+        self.form.description = "Edited"
+        self.form.save()
+        after_edit = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=after_submission["ETag"])
+        self.assertEqual(after_edit.status_code, 200)
+
+    def test_counter_changes_invalidate_detail_without_embedded_submissions(self):
+        first = self.client.get(self.detail_url, {"submissions": 0})
+
+        submission, _ = ingest_submission(self.form, sample_instance())
+        after_ingest = self.client.get(self.detail_url, {"submissions": 0}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(after_ingest.status_code, 200)
+        self.assertEqual(after_ingest.json()["submission_count"], 1)
+
+        submission.delete()
+        after_delete = self.client.get(
+            self.detail_url, {"submissions": 0}, HTTP_IF_NONE_MATCH=after_ingest["ETag"]
+        )
+        self.assertEqual(after_delete.status_code, 200)
+        self.assertEqual(after_delete.json()["submission_count"], 0)
+
+    def test_definition_etag_is_the_stored_hash(self):
+        self.assertEqual(self.form.xml_hash, hashlib.md5(SAMPLE_XFORM.encode()).hexdigest())
+        xml_url = f"{self.detail_url}xml/"
+
+        first = self.client.get(xml_url)
+        self.assertEqual(first["ETag"], f'"{self.form.xml_hash}"')
+
+        # Only the validators are read when the client's copy is current.
+        with self.assertNumQueries(1):
+            repeat = self.client.get(xml_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(repeat.status_code, 304)
+
+        since = self.client.get(xml_url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+        download = self.client.get(
+            f"/openrosa/forms/{self.form.pk}/form.xml", HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(download.status_code, 304)
+
+    def test_large_definitions_are_compressed(self):
+        response = self.client.get(self.detail_url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(response.content))["xml_definition"], SAMPLE_XFORM)
+
+    def test_brotli_is_preferred_when_available(self):
+        fake_brotli = SimpleNamespace(compress=zlib.compress)
+        with mock.patch.object(middleware, "brotli", fake_brotli):
+            response = self.client.get(self.detail_url, HTTP_ACCEPT_ENCODING="gzip, br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+    def test_responses_carrying_secrets_are_never_brotli_compressed(self):
+        body = "<form>" + "x" * 500 + "</form>"
+        cookie_response = HttpResponse(body)
+        cookie_response.set_cookie("csrftoken", "secret")
+        session_response = HttpResponse(body)
+        session_response["Vary"] = "Cookie"
+
+        with mock.patch.object(middleware, "brotli", SimpleNamespace(compress=zlib.compress)):
+            for response in (cookie_response, session_response):
+                request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, br")
+                compressed = middleware.CompressionMiddleware(lambda request: response)(request)
+                self.assertEqual(compressed["Content-Encoding"], "gzip")
+
+
+@override_settings(XFORMS_CONVERSION_WORKERS=0)
+class FormVersionTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        conversion_cache.clear()
+        cache.clear()
+        schema_cache.clear()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def create_form(self, workbook: bytes) -> Form:
+        response = self.client.post("/api/forms/", data={"name": "Versioned", "xls_file": xlsform_upload(workbook)})
+        self.assertEqual(response.status_code, 201)
+        return Form.objects.get(pk=response.json()["id"])
+
+    def patch_workbook(self, form: Form, workbook: bytes):
+        return self.client.patch(
+            f"/api/forms/{form.pk}/",
+            data=encode_multipart(BOUNDARY, {"xls_file": xlsform_upload(workbook)}),
+            content_type=MULTIPART_CONTENT,
+        )
+
+    def test_identical_reupload_is_a_no_op(self):
+        workbook = build_xlsform(("text", "village", "Village"))
+        form = self.create_form(workbook)
+        version = form.current_version
+        self.assertEqual(version.xls_form.name, f"xlsforms/{version.xls_hash[:2]}/{version.xls_hash}.xlsx")
+
+        storage = FormVersion._meta.get_field("xls_form").storage
+        with mock.patch.object(storage, "save", wraps=storage.save) as save:
+            response = self.patch_workbook(form, workbook)
+
+        self.assertEqual(response.status_code, 200)
+        save.assert_not_called()
+        refreshed = Form.objects.get(pk=form.pk)
+        self.assertEqual(refreshed.updated_at, form.updated_at)
+        self.assertEqual(FormVersion.objects.count(), 1)
+
+    def test_upload_name_is_kept_alongside_the_hashed_file(self):
+        form = self.create_form(build_xlsform(("text", "village", "Village")))
+        self.client.patch(
+            f"/api/forms/{form.pk}/",
+            data=encode_multipart(
+                BOUNDARY, {"xls_file": xlsform_upload(build_xlsform(("integer", "age", "Age")), "Household v2.xlsx")}
+            ),
+            content_type=MULTIPART_CONTENT,
+        )
+
+        detail = self.client.get(f"/api/forms/{form.pk}/").json()
+        versions = self.client.get(f"/api/forms/{form.pk}/versions/").json()
+        listed = self.client.get("/api/forms/", {"fields": "name,xls_name"}).json()
+
+        self.assertEqual(detail["xls_name"], "Household v2.xlsx")
+        self.assertNotIn("Household", detail["xls_form"])
+        self.assertEqual([v["xls_name"] for v in versions], ["Household v2.xlsx", "test_form.xlsx"])
+        self.assertEqual(listed, [{"name": "Versioned", "xls_name": "Household v2.xlsx"}])
+
+    def test_changed_workbook_adds_a_version(self):
+        form = self.create_form(build_xlsform(("text", "village", "Village")))
+        first_version = form.current_version_id
+
+        self.patch_workbook(form, build_xlsform(("text", "village", "Village"), ("integer", "age", "Age")))
+
+        versions = self.client.get(f"/api/forms/{form.pk}/versions/").json()
+        self.assertEqual(len(versions), 2)
+        self.assertEqual([v["is_current"] for v in versions], [True, False])
+        self.assertEqual(versions[1]["version_id"], first_version)
+        old = self.client.get(f"/api/forms/{form.pk}/versions/{first_version}/").json()
+        self.assertNotIn("/data/age", old["xml_definition"])
+
+    def test_submissions_are_validated_against_their_own_version(self):
+        form = Form.objects.create(name="Household", xml_definition=SAMPLE_XFORM)
+        set_definition(form, SAMPLE_XFORM, "2024010101")
+        old_version = form.current_version
+        set_definition(
+            form,
+            SAMPLE_XFORM.replace("2024010101", "2024020202").replace("<village/>", "<town/>")
+            .replace('nodeset="/data/village"', 'nodeset="/data/town"'),
+            "2024020202",
+        )
+        submit_url = f"/api/forms/{form.pk}/submissions/"
+
+        old_response = self.client.post(submit_url, data=sample_instance(), content_type="text/xml")
+        current_xml = sample_instance(instance_id="uuid:2").replace("2024010101", "2024020202")
+        current_response = self.client.post(submit_url, data=current_xml, content_type="text/xml")
+
+        self.assertEqual(old_response.status_code, 201)
+        self.assertEqual(FormSubmission.objects.get().form_version, old_version)
+        self.assertEqual(current_response.status_code, 400)
+        self.assertIn("/data/village", current_response.json()["detail"])
+
+
+class SubmissionCounterTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.form = Form.objects.create(name="Counted", xml_definition="<data id='counted'></data>")
+        self.submission_url = f"/api/forms/{self.form.pk}/submissions/"
+
+    def post(self, n):
+        return self.client.post(
+            self.submission_url,
+            data=f"<data><n>{n}</n><meta><instanceID>uuid:{n}</instanceID></meta></data>",
+            content_type="text/xml",
+        )
+
+    def test_ingest_and_delete_maintain_counters(self):
+        self.post(1)
+        self.post(1)  # retried duplicate is not counted
+        self.client.post(
+            f"{self.submission_url}bulk/",
+            data="\n".join(json.dumps(f"<data><n>{n}</n></data>") for n in range(3)),
+            content_type="application/x-ndjson",
+        )
+
+        self.form.refresh_from_db()
+        newest = FormSubmission.objects.order_by("-submitted_at").first()
+        self.assertEqual(self.form.submission_count, 4)
+        self.assertEqual(self.form.last_submitted_at, newest.submitted_at)
+
+        newest.delete()
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.submission_count, 3)
+        self.assertEqual(
+            self.form.last_submitted_at, FormSubmission.objects.order_by("-submitted_at").first().submitted_at
+        )
+
+    def test_list_forms_returns_counters_without_aggregating(self):
+        self.post(1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/forms/", {"fields": "name,submission_count,last_submitted_at"})
+
+        item = response.json()[0]
+        self.assertEqual(item["submission_count"], 1)
+        self.assertIsNotNone(item["last_submitted_at"])
+
+    def test_rebuild_repairs_drifted_counters(self):
+        self.post(1)
+        self.post(2)
+        Form.objects.filter(pk=self.form.pk).update(submission_count=99, last_submitted_at=None)
+
+        out = StringIO()
+        call_command("rebuild_submission_counters", stdout=out)
+
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.submission_count, 2)
+        self.assertIsNotNone(self.form.last_submitted_at)
+        self.assertIn("1 form", out.getvalue())
+        self.assertEqual(rebuild_counters([self.form.pk]), 1)
+
+
+class SubmissionStatsTests(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.form = Form.objects.create(name="Stats", xml_definition="<data id='stats'></data>")
+        self.stats_url = f"/api/forms/{self.form.pk}/stats/"
+        self.user = User.objects.create_user(username="enumerator", password="pass123")
+
+    def submit(self, n, user=None):
+        submission, _ = ingest_submission(
+            self.form, f"<data><n>{n}</n><meta><instanceID>uuid:{n}</instanceID></meta></data>", user
+        )
+        return submission
+
+    def test_ingest_and_delete_maintain_rollups(self):
+        first = self.submit(1)
+        self.submit(2)
+        self.submit(3, self.user)
+        ingest_batch(self.form, ["<data><n>4</n></data>", "<data><n>5</n></data>"], self.user)
+
+        bucket = hour_bucket(first.submitted_at)
+        counts = dict(SubmissionRollup.objects.filter(form=self.form).values_list("user_id", "count"))
+        self.assertEqual(counts, {None: 2, self.user.pk: 3})
+        self.assertEqual(set(SubmissionRollup.objects.values_list("bucket_start", flat=True)), {bucket})
+
+        first.delete()
+        self.assertEqual(SubmissionRollup.objects.get(form=self.form, user=None).count, 1)
+
+    def test_stats_series_and_users(self):
+        self.submit(1)
+        self.submit(2, self.user)
+        self.submit(3, self.user)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.stats_url, {"interval": "hour"})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["total"], 3)
+        self.assertEqual([point["count"] for point in body["series"]], [3])
+        self.assertEqual(
+            body["users"],
+            [
+                {"user_id": self.user.pk, "username": "enumerator", "count": 2},
+                {"user_id": None, "username": None, "count": 1},
+            ],
+        )
+
+    def test_stats_truncates_days_in_requested_zone(self):
+        SubmissionRollup.objects.bulk_create(
+            [
+                SubmissionRollup(form=self.form, bucket_start=datetime(2026, 3, 1, 22, tzinfo=dt_timezone.utc), count=2),
+                SubmissionRollup(form=self.form, bucket_start=datetime(2026, 3, 2, 1, tzinfo=dt_timezone.utc), count=3),
+            ]
+        )
+        params = {"interval": "day", "start": "2026-03-01T00:00:00Z", "end": "2026-03-03T00:00:00Z"}
+
+        utc = self.client.get(self.stats_url, params).json()
+        tokyo = self.client.get(self.stats_url, {**params, "tz": "Asia/Tokyo"}).json()
+
+        self.assertEqual([point["count"] for point in utc["series"]], [2, 3])
+        self.assertEqual([point["count"] for point in tokyo["series"]], [5])
+
+    def test_stats_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get(self.stats_url, {"tz": "Mars/Olympus"}).status_code, 400)
+        self.assertEqual(
+            self.client.get(self.stats_url, {"start": "2026-03-02T00:00:00Z", "end": "2026-03-01T00:00:00Z"}).status_code,
+            400,
+        )
+        self.assertEqual(
+            self.client.get(self.stats_url, {"interval": "hour", "start": "2020-01-01T00:00:00Z"}).status_code, 400
+        )
+        self.assertEqual(self.client.get("/api/forms/999999/stats/").status_code, 404)
+
+    def test_rebuild_rollups(self):
+        self.submit(1)
+        self.submit(2, self.user)
+        SubmissionRollup.objects.update(count=42)
+
+        self.assertEqual(rebuild_rollups([self.form.pk]), 2)
+        self.assertEqual(sum(SubmissionRollup.objects.values_list("count", flat=True)), 2)
+
+
+class FormDeletionTests(TestCase):
+    def setUp(self) -> None:
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media_root.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.client = Client()
+        self.form = Form.objects.create(name="Doomed", xml_definition="<data id='doomed'></data>")
+        self.other = Form.objects.create(name="Kept", xml_definition="<data id='kept'></data>")
+        ingest_batch(self.form, [f"<data><n>{n}</n></data>" for n in range(5)])
+        ingest_submission(self.other, "<data><n>1</n></data>")
+        self.submission = FormSubmission.objects.filter(form=self.form).first()
+        self.attachment, _ = store_attachment(self.submission, "photo.jpg", SimpleUploadedFile("photo.jpg", b"jpeg"))
+
+    def test_delete_hides_form_and_frees_its_name(self):
+        response = self.client.delete(f"/api/forms/{self.form.pk}/")
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(f"/api/forms/{self.form.pk}/").status_code, 404)
+        self.assertEqual(FormSubmission.objects.filter(form=self.form).count(), 5)
+        self.assertNotIn(b"doomed", self.client.get("/openrosa/formList").content)
+        Form.objects.create(name="Doomed", xml_definition="<data id='doomed'></data>")
+
+    def test_attachment_endpoints_hide_deleted_forms(self):
+        base = f"/api/forms/{self.form.pk}/submissions/{self.submission.pk}/attachments/"
+        started = self.client.post(
+            base, data=json.dumps({"name": "audio.m4a", "size": 4}), content_type="application/json"
+        )
+        self.assertEqual(started.status_code, 201)
+        upload_url = started.json()["upload_url"]
+
+        soft_delete_form(self.form)
+
+        self.assertEqual(self.client.get(base).status_code, 404)
+        self.assertEqual(self.client.get(f"{base}photo.jpg").status_code, 404)
+        self.assertEqual(
+            self.client.post(
+                base, data=json.dumps({"name": "video.mp4", "size": 4}), content_type="application/json"
+            ).status_code,
+            404,
+        )
+        self.assertEqual(self.client.get(upload_url).status_code, 404)
+        self.assertEqual(
+            self.client.patch(
+                upload_url, data=b"m4a!", content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET="0"
+            ).status_code,
+            404,
+        )
+        self.assertEqual(AttachmentUpload.objects.filter(name="video.mp4").count(), 0)
+
+    def test_reaper_removes_data_in_bounded_batches(self):
+        soft_delete_form(self.form)
+        storage = SubmissionAttachment._meta.get_field("file").storage
+        self.assertTrue(storage.exists(self.attachment.file.name))
+
+        self.assertEqual(reap_deleted_forms(batch_size=2, max_batches=1), (0, 2))
+        self.assertTrue(Form.all_objects.filter(pk=self.form.pk).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reap_deleted_forms(batch_size=2), (1, 3))
+
+        self.assertFalse(Form.all_objects.filter(pk=self.form.pk).exists())
+        self.assertFalse(FormSubmission.objects.filter(form_id=self.form.pk).exists())
+        self.assertFalse(SubmissionRollup.objects.filter(form_id=self.form.pk).exists())
+        self.assertFalse(storage.exists(self.attachment.file.name))
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.submission_count, 1)
+
+    def test_reap_command(self):
+        soft_delete_form(self.form)
+        out = StringIO()
+
+        call_command("reap_deleted_forms", "--once", "--pause", "0", stdout=out)
+
+        self.assertIn("Removed 1 form(s) and 5 submission(s).", out.getvalue())
+
+
+class AsyncEndpointTests(TestCase):
+    def setUp(self) -> None:
+        self.form = Form.objects.create(name="Async", xml_definition="<data id='async'></data>")
+
+    async def test_async_submit_and_read_endpoints(self):
+        user = await User.objects.acreate_user(username="mobile", password="pass123")
+        await self.async_client.aforce_login(user)
+        url = f"/api/forms/{self.form.pk}/submissions/"
+        body = "<data><n>1</n><meta><instanceID>uuid:async-1</instanceID></meta></data>"
+
+        created = await self.async_client.post(url, data=body, content_type="text/xml")
+        repeated = await self.async_client.post(url, data=body, content_type="text/xml")
+        listing = await self.async_client.get(url)
+        detail = await self.async_client.get(f"/api/forms/{self.form.pk}/")
+        forms = await self.async_client.get("/api/forms/")
+
+        self.assertEqual((created.status_code, repeated.status_code), (201, 200))
+        self.assertEqual(created.json()["username"], "mobile")
+        self.assertEqual(repeated.json()["username"], "mobile")
+        self.assertEqual([item["instance_id"] for item in listing.json()], ["uuid:async-1"])
+        self.assertEqual(len(detail.json()["submissions"]), 1)
+        self.assertEqual(forms.json()[0]["name"], "Async")
+
+
+    async def test_downloads_stream_without_buffering_under_asgi(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        with override_settings(MEDIA_ROOT=media_root.name):
+            submission, _ = await sync_to_async(ingest_submission)(self.form, "<data><n>1</n></data>")
+            await sync_to_async(store_attachment)(submission, "photo.jpg", SimpleUploadedFile("photo.jpg", b"jpeg"))
+            base = f"/api/forms/{self.form.pk}/"
+            responses = [
+                await self.async_client.get(f"{base}xml/"),
+                await self.async_client.get(f"{base}submissions/export/", {"format": "ndjson"}),
+                await self.async_client.get(f"{base}submissions/{submission.pk}/attachments/photo.jpg"),
+            ]
+            bodies = [b"".join([chunk async for chunk in response.streaming_content]) for response in responses]
+
+        self.assertEqual([response.is_async for response in responses], [True, True, True])
+        self.assertEqual(bodies[0], b"<data id='async'></data>")
+        self.assertEqual(json.loads(bodies[1])["submission_id"], submission.pk)
+        self.assertEqual(bodies[2], b"jpeg")
+
+
+class SQLiteWriteTests(SimpleTestCase):
+    def test_connection_uses_immediate_transactions_and_busy_timeout(self):
+        self.assertEqual(connection.settings_dict["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertIn("PRAGMA journal_mode=WAL", connection.settings_dict["OPTIONS"]["init_command"])
+
+    @mock.patch("forms.writes.time.sleep")
+    def test_serialized_write_retries_locked_database(self, sleep):
+        write = mock.Mock(side_effect=[OperationalError("database is locked"), "stored"])
+
+        self.assertEqual(serialized_write(write)(), "stored")
+        self.assertEqual(write.call_count, 2)
+        sleep.assert_called_once()
+
+    def test_serialized_write_does_not_retry_other_errors(self):
+        write = mock.Mock(side_effect=OperationalError("no such table: forms_form"))
+
+        with self.assertRaises(OperationalError):
+            serialized_write(write)()
+        self.assertEqual(write.call_count, 1)
+
+
+class SubmissionSearchTests(TestCase):
+    definition = """
+        <h:html xmlns="http://www.w3.org/2002/xforms" xmlns:h="http://www.w3.org/1999/xhtml">
+          <h:head><model><instance>
+            <data id="census"><household><village/><head_name/></household><notes/></data>
+          </instance></model></h:head>
+        </h:html>
+    """
+
+    def setUp(self) -> None:
+        self.client = Client()
+        self.form = Form.objects.create(name="Census", xml_definition=self.definition)
+        self.search_url = f"/api/forms/{self.form.pk}/submissions/search/"
+        rows = [("Kibera", "Amina", "roof leaking"), ("Mathare", "Otieno", "new well"), ("Kibera", "Baraka", "")]
+        for village, head, notes in rows:
+            ingest_submission(
+                self.form,
+                f"<data><household><village>{village}</village><head_name>{head}</head_name></household>"
+                f"<notes>{notes}</notes></data>",
+            )
+
+    def names(self, response):
+        return sorted(ET.fromstring(item["xml_submission"]).findtext("household/head_name") for item in response.json())
+
+    def test_field_conditions_by_name_or_path(self):
+        by_name = self.client.get(self.search_url, {"field": "village=Kibera"})
+        by_path = self.client.get(self.search_url, {"field": ["/data/household/village=Kibera", "head_name=Amina"]})
+
+        self.assertEqual(self.names(by_name), ["Amina", "Baraka"])
+        self.assertEqual(self.names(by_path), ["Amina"])
+
+    def test_text_search_is_paginated(self):
+        first = self.client.get(self.search_url, {"q": "kibera", "limit": 1})
+        second = self.client.get(self.search_url, {"q": "kibera", "limit": 1, "cursor": first["X-Next-Cursor"]})
+
+        self.assertEqual(self.names(first) + self.names(second), ["Baraka", "Amina"])
+        self.assertEqual(self.names(self.client.get(self.search_url, {"q": "well"})), ["Otieno"])
+
+    def test_rejects_unknown_fields_and_empty_searches(self):
+        self.assertEqual(self.client.get(self.search_url, {"field": "district=X"}).status_code, 400)
+        self.assertEqual(self.client.get(self.search_url, {"field": "village"}).status_code, 400)
+        self.assertEqual(self.client.get(self.search_url).status_code, 400)
+        self.assertEqual(self.client.get("/api/forms/999999/submissions/search/", {"q": "x"}).status_code, 404)
+
+    def test_postgres_searches_use_indexable_expressions(self):
+        postgres = {"default": SimpleNamespace(vendor="postgresql")}
+        with mock.patch("forms.search.connections", postgres):
+            queryset = search_submissions(
+                FormSubmission.objects.all(), text="roof", fields={"/data/household/village": "Kibera"}
+            )
+
+        data_lookup, text_lookup = queryset.query.where.children
+        self.assertEqual((data_lookup.lhs.target.name, data_lookup.lookup_name), ("data", "contains"))
+        self.assertEqual(data_lookup.rhs, {"/data/household/village": "Kibera"})
+        self.assertIsInstance(text_lookup.lhs, SubmissionDocument)
+
+    def test_admin_search(self):
+        admin_user = User.objects.create_superuser(username="admin", password="pass123")
+        self.client.force_login(admin_user)
+
+        response = self.client.get("/admin/forms/formsubmission/", {"q": "/data/household/village=Kibera roof"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_count, 1)
+
+
+class SubmissionArchiveTests(TestCase):
+    def setUp(self) -> None:
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media_root.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.client = Client()
+        self.form = Form.objects.create(name="Archived", xml_definition="<data id='archived'><n/></data>")
+        self.url = f"/api/forms/{self.form.pk}/submissions/"
+        for n in range(6):
+            submission, _ = ingest_submission(self.form, self.payload(n))
+            days_old = 400 - n if n < 4 else 0
+            FormSubmission.objects.filter(pk=submission.pk).update(
+                submitted_at=timezone.now() - timedelta(days=days_old, minutes=n)
+            )
+        # Old, but kept live because media hangs off it.
+        with_media = FormSubmission.objects.get(instance_id="uuid:3")
+        store_attachment(with_media, "photo.jpg", SimpleUploadedFile("photo.jpg", b"jpeg"))
+
+    def payload(self, n, value=None):
+        return f"<data><n>{n if value is None else value}</n><meta><instanceID>uuid:{n}</instanceID></meta></data>"
+
+    def test_archives_old_rows_without_media(self):
+        moved = archive_submissions(timedelta(days=30), segment_size=2)
+
+        self.assertEqual(moved, 3)
+        self.assertEqual(SubmissionArchive.objects.filter(form=self.form).count(), 2)
+        self.assertEqual(ArchivedSubmission.objects.count(), 3)
+        self.assertEqual(
+            sorted(FormSubmission.objects.values_list("instance_id", flat=True)), ["uuid:3", "uuid:4", "uuid:5"]
+        )
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.submission_count, 6)
+
+    def test_listing_and_export_read_archived_rows(self):
+        expected = [item["instance_id"] for item in self.client.get(self.url, {"limit": 10}).json()]
+        archive_submissions(timedelta(days=30), segment_size=2)
+
+        pages, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get(self.url, params)
+            pages.extend(item["instance_id"] for item in response.json())
+            cursor = response.get("X-Next-Cursor")
+            if not cursor:
+                break
+        exported = self.client.get(f"{self.url}export/", {"format": "ndjson"})
+        lines = [json.loads(line) for line in b"".join(exported.streaming_content).decode().splitlines()]
+
+        self.assertEqual(pages, expected)
+        self.assertEqual(sorted(line["instance_id"] for line in lines), sorted(expected))
+        self.assertEqual(
+            [item["instance_id"] for item in self.client.get(self.url, {"instance_id": "uuid:1"}).json()], ["uuid:1"]
+        )
+
+    def test_resending_an_archived_instance_is_still_idempotent(self):
+        archive_submissions(timedelta(days=30))
+
+        resent = self.client.post(self.url, data=self.payload(0), content_type="text/xml")
+        conflicting = self.client.post(self.url, data=self.payload(0, value=99), content_type="text/xml")
+        batch = ingest_batch(self.form, [self.payload(1), self.payload(9)])
+
+        self.assertEqual(resent.status_code, 200)
+        self.assertEqual(conflicting.status_code, 409)
+        self.assertEqual([result.duplicate for result in batch], [True, False])
+        self.assertFalse(FormSubmission.objects.filter(instance_id="uuid:0").exists())
+
+    def test_rebuilding_counters_keeps_archived_rows(self):
+        def rebuilt():
+            rebuild_counters()
+            rebuild_rollups()
+            self.form.refresh_from_db()
+            rollups = SubmissionRollup.objects.filter(form=self.form).values_list("bucket_start", "user_id", "count")
+            return self.form.submission_count, self.form.last_submitted_at, sorted(rollups)
+
+        expected = rebuilt()
+        archive_submissions(timedelta(days=30), segment_size=2)
+
+        self.assertEqual(expected[0], 6)
+        self.assertEqual(sum(count for *_, count in expected[2]), 6)
+        self.assertEqual(rebuilt(), expected)
+
+        # Only archived rows left: the newest one still sets last_submitted_at.
+        newest_archived = SubmissionArchive.objects.order_by("-period_end").first().period_end
+        FormSubmission.objects.filter(form=self.form).delete()
+        self.assertEqual(rebuilt()[:2], (3, newest_archived))
+
+    def test_reaping_a_form_removes_its_segments(self):
+        archive_submissions(timedelta(days=30))
+        archive = SubmissionArchive.objects.get()
+        storage = archive.file.storage
+        soft_delete_form(self.form)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reap_deleted_forms()
+
+        self.assertFalse(storage.exists(archive.file.name))
+        self.assertFalse(ArchivedSubmission.objects.exists())
+
+
+
+class XMLCompressionTests(TestCase):
+    definition = """
+        <h:html xmlns="http://www.w3.org/2002/xforms" xmlns:h="http://www.w3.org/1999/xhtml">
+          <h:head><model><instance>
+            <data id="visits"><household><village/></household><notes/><meta><instanceID/></meta></data>
+          </instance></model></h:head>
+        </h:html>
+    """
+
+    def setUp(self) -> None:
+        dictionary_cache.clear()
+        self.addCleanup(dictionary_cache.clear)
+        self.client = Client()
+        self.form = Form.objects.create(name="Compressed", xml_definition=self.definition)
+
+    def payload(self, n):
+        return (
+            f"<data><household><village>Kibera</village></household>"
+            f"<notes>household visit number {n} with water point survey</notes>"
+            f"<meta><instanceID>uuid:{n}</instanceID></meta></data>"
+        )
+
+    def stored(self, model, pk, field):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {field} FROM {model._meta.db_table} WHERE id = %s", [pk])
+            return cursor.fetchone()[0]
+
+    def test_values_are_stored_compressed_and_read_back_plain(self):
+        with override_settings(XFORMS_XML_COMPRESSION=True):
+            submission, _ = ingest_submission(self.form, self.payload(1))
+            form = Form.objects.create(name="Other", xml_definition="<data id='other'/>")
+
+        self.assertTrue(self.stored(FormSubmission, submission.pk, "xml_submission").startswith(COMPRESSED_PREFIX))
+        self.assertTrue(self.stored(Form, form.pk, "xml_definition").startswith(COMPRESSED_PREFIX))
+        self.assertEqual(FormSubmission.objects.get(pk=submission.pk).xml_submission, self.payload(1))
+        self.assertEqual(Form.objects.get(pk=form.pk).xml_definition, "<data id='other'/>")
+        # The setting only affects writes.
+        self.assertEqual(FormSubmission.objects.get(pk=submission.pk).xml_submission, self.payload(1))
+
+    def test_form_dictionary_shrinks_submissions(self):
+        samples = [self.payload(n) for n in range(20)]
+        for sample in samples:
+            ingest_submission(self.form, sample)
+
+        call_command("compress_submissions", stdout=StringIO())
+
+        dictionary = CompressionDictionary.objects.get(form=self.form)
+        self.assertEqual(dictionary.sample_count, 20)
+        with override_settings(XFORMS_XML_COMPRESSION=True):
+            submission, _ = ingest_submission(self.form, self.payload(99))
+        stored = self.stored(FormSubmission, submission.pk, "xml_submission")
+        self.assertTrue(stored.startswith(f"{COMPRESSED_PREFIX}{dictionary.pk}:"))
+        self.assertLess(len(stored), len(compress_text(self.payload(99))))
+
+        dictionary_cache.clear()
+        self.assertEqual(
+            sorted(FormSubmission.objects.values_list("xml_submission", flat=True)),
+            sorted(samples + [self.payload(99)]),
+        )
+
+    def test_dictionaries_trained_elsewhere_are_picked_up(self):
+        with mock.patch("forms.compression.time.monotonic", return_value=1000.0):
+            self.assertIsNone(dictionary_cache.current(self.form.pk))
+            # Trained by another process: this one's cache is not told.
+            first = CompressionDictionary.objects.create(form=self.form, data=b"<data>", sample_count=1)
+            self.assertIsNone(dictionary_cache.current(self.form.pk))
+
+        with mock.patch("forms.compression.time.monotonic", return_value=1000.0 + DICTIONARY_RECHECK_SECONDS):
+            self.assertEqual(dictionary_cache.current(self.form.pk), (first.pk, b"<data>"))
+            second = CompressionDictionary.objects.create(form=self.form, data=b"<data><n>", sample_count=2)
+
+        with mock.patch("forms.compression.time.monotonic", return_value=1000.0 + 2 * DICTIONARY_RECHECK_SECONDS):
+            self.assertEqual(dictionary_cache.current(self.form.pk), (second.pk, b"<data><n>"))
+
+    def test_command_compresses_existing_rows(self):
+        submission, _ = ingest_submission(self.form, self.payload(1))
+        version = FormVersion.objects.create(
+            form=self.form, version="1", xml_definition=self.form.xml_definition, xml_hash="0" * 32
+        )
+
+        call_command("compress_submissions", "--no-train", stdout=StringIO())
+
+        self.assertFalse(CompressionDictionary.objects.exists())
+        self.assertTrue(self.stored(FormSubmission, submission.pk, "xml_submission").startswith(f"{COMPRESSED_PREFIX}0:"))
+        self.assertTrue(self.stored(Form, self.form.pk, "xml_definition").startswith(COMPRESSED_PREFIX))
+        self.assertTrue(self.stored(FormVersion, version.pk, "xml_definition").startswith(COMPRESSED_PREFIX))
+        self.assertEqual(FormVersion.objects.get(pk=version.pk).xml_definition, self.form.xml_definition)
+
+    def test_reads_and_search_work_on_compressed_rows(self):
+        with override_settings(XFORMS_XML_COMPRESSION=True):
+            ingest_submission(self.form, self.payload(1))
+        detail_url = f"/api/forms/{self.form.pk}/"
+
+        with self.assertNumQueries(2):
+            truncated = self.client.get(detail_url, {"submission_body": "truncated", "preview_length": 15})
+        found = self.client.get(f"{detail_url}submissions/search/", {"q": "water", "field": "village=Kibera"})
+
+        self.assertEqual(truncated.json()["xml_definition"], self.form.xml_definition)
+        self.assertEqual(truncated.json()["submissions"][0]["xml_submission"], "<data><househol")
+        self.assertTrue(truncated.json()["submissions"][0]["xml_truncated"])
+        self.assertEqual([item["xml_submission"] for item in found.json()], [self.payload(1)])
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        self.form = Form.objects.create(name="Cached", xml_definition="<data id='cached'><n/></data>")
+        Form.objects.create(name="Other", xml_definition="<data id='other'><n/></data>")
+        self.detail_url = f"/api/forms/{self.form.pk}/"
+
+    def test_list_pages_are_served_from_cache(self):
+        first = self.client.get("/api/forms/", {"limit": 1})
+
+        with self.assertNumQueries(0):
+            cached = self.client.get("/api/forms/", {"limit": 1})
+
+        self.assertEqual(cached.json(), first.json())
+        self.assertEqual(cached["X-Next-Cursor"], first["X-Next-Cursor"])
+
+    def test_detail_is_served_from_cache_with_validators(self):
+        first = self.client.get(self.detail_url)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.detail_url)
+            revalidated = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(cached.json(), first.json())
+        self.assertEqual(cached["ETag"], first["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_form_and_submission_changes_invalidate_cached_responses(self):
+        self.client.get("/api/forms/")
+        self.client.get(self.detail_url)
+
+        self.form.description = "Renamed"
+        self.form.save()
+        ingest_submission(self.form, "<data><n>1</n></data>")
+
+        listed = {item["name"]: item for item in self.client.get("/api/forms/").json()}
+        detail = self.client.get(self.detail_url).json()
+        self.assertEqual(listed["Cached"]["description"], "Renamed")
+        self.assertEqual(listed["Cached"]["submission_count"], 1)
+        self.assertEqual(len(detail["submissions"]), 1)
+
+        soft_delete_form(self.form)
+        self.assertEqual(self.client.get(self.detail_url).status_code, 404)
+        self.assertEqual([item["name"] for item in self.client.get("/api/forms/").json()], ["Other"])
+
+    def test_changes_are_invalidated_again_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            ingest_batch(self.form, ["<data><n>1</n></data>", "<data><n>2</n></data>"])
+        # Stands in for a read made before the batch committed.
+        self.client.get(self.detail_url)
+        for callback in callbacks:
+            callback()
+
+        with self.assertNumQueries(2):
+            self.client.get(self.detail_url)
+
+    def test_spa_shell_is_rendered_once_per_build(self):
+        with mock.patch("config.views._manifest_version", return_value=1), mock.patch(
+            "config.views.render_to_string", return_value="<html>shell</html>"
+        ) as render:
+            responses = [self.client.get(path) for path in ("/", "/xlsplay", "/forms/1")]
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual({response.content for response in responses}, {b"<html>shell</html>"})
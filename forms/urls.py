@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import openrosa
+
+# OpenRosa endpoints, mounted under /openrosa/ (see config/urls.py).
+urlpatterns = [
+    path("formList", openrosa.form_list, name="openrosa-form-list"),
+    path("forms/<int:form_id>/form.xml", openrosa.form_download, name="openrosa-form-download"),
+    path("submission", openrosa.submission, name="openrosa-submission"),
+]
@@ -0,0 +1,120 @@
+"""Form version history and hash-based deduplication of definitions.
+
+Each distinct XForm definition a form has had is kept as a
+:class:`~forms.models.FormVersion`, keyed by the MD5 of the definition.
+``Form.xml_definition`` / ``version`` / ``xls_form`` mirror the current
+version so existing readers are unaffected, and submissions record the
+version they were filled in with.
+
+Uploading a workbook that converts to the current definition is a no-op:
+no version row, no form save and no file write. Workbooks are stored
+content-addressed (``xlsforms/<aa>/<sha256><ext>``), so identical bytes are
+stored once however many versions reference them; the name each was uploaded
+under is kept in ``xls_name``.
+"""
+
+from __future__ import annotations
+
+import os
+
+from django.db import IntegrityError, transaction
+
+from .conversion import hash_upload
+from .models import Form, FormVersion
+from .xforms import definition_hash
+
+
+def workbook_name(xls_hash: str, filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    return f"xlsforms/{xls_hash[:2]}/{xls_hash}{extension}"
+
+
+def _store_workbook(xls_file, xls_hash: str) -> str:
+    shared = (
+        FormVersion.objects.filter(xls_hash=xls_hash)
+        .exclude(xls_form="")
+        .exclude(xls_form=None)
+        .values_list("xls_form", flat=True)
+        .first()
+    )
+    if shared:
+        return shared
+    storage = FormVersion._meta.get_field("xls_form").storage
+    name = workbook_name(xls_hash, xls_file.name)
+    if storage.exists(name):
+        return name
+    xls_file.seek(0)
+    return storage.save(name, xls_file)
+
+
+def release_workbook(name: str) -> None:
+    """Delete a stored workbook once no form or version references it."""
+    if not name:
+        return
+    if FormVersion.objects.filter(xls_form=name).exists() or Form.all_objects.filter(xls_form=name).exists():
+        return
+    FormVersion._meta.get_field("xls_form").storage.delete(name)
+
+
+def set_definition(form: Form, xml_definition: str, version: str, *, xls_file=None) -> bool:
+    """Make ``xml_definition`` the form's current definition and save the form.
+
+    Returns False, without writing anything, when it already is the
+    current definition. Switching back to an earlier definition reuses its
+    FormVersion. Other pending changes on ``form`` (name, description) are
+    saved along with it; IntegrityError from the form save propagates.
+    """
+    xml_hash = definition_hash(xml_definition)
+    if form.current_version_id is not None and form.xml_hash == xml_hash:
+        return False
+
+    with transaction.atomic():
+        if form.pk is None:
+            form.xml_definition, form.version = xml_definition, version
+            form.save()
+
+        form_version = FormVersion.objects.filter(form=form, xml_hash=xml_hash).first()
+        if form_version is None:
+            form_version = FormVersion(
+                form=form,
+                version=version,
+                xml_definition=xml_definition,
+                xml_hash=xml_hash,
+                xls_hash=hash_upload(xls_file) if xls_file is not None else "",
+            )
+            if xls_file is not None:
+                form_version.xls_form.name = _store_workbook(xls_file, form_version.xls_hash)
+                form_version.xls_name = os.path.basename(xls_file.name)
+            try:
+                with transaction.atomic():
+                    form_version.save()
+            except IntegrityError:
+                # A concurrent upload of the same definition created it first.
+                form_version = FormVersion.objects.get(form=form, xml_hash=xml_hash)
+
+        form.current_version = form_version
+        form.xml_definition = xml_definition
+        if version or not form.version:
+            form.version = version
+        if form_version.xls_form:
+            form.xls_form.name = form_version.xls_form.name
+            form.xls_name = form_version.xls_name
+        form.save()
+    return True
+
+
+def version_for_submission(form: Form, submitted_version: str | None, cache: dict | None = None) -> FormVersion | None:
+    """Return the older FormVersion a submission's ``version`` attribute names, if any.
+
+    Returns None for the current version (use ``form.current_version_id``)
+    and for versions this server never had. ``cache`` memoizes lookups
+    across a batch.
+    """
+    if not submitted_version or submitted_version == form.version:
+        return None
+    if cache is not None and submitted_version in cache:
+        return cache[submitted_version]
+    form_version = FormVersion.objects.filter(form=form, version=submitted_version).order_by("-created_at", "-id").first()
+    if cache is not None:
+        cache[submitted_version] = form_version
+    return form_version
@@ -0,0 +1,50 @@
+"""Write serialization for SQLite deployments.
+
+SQLite allows one writer at a time. With ``BEGIN IMMEDIATE`` and a busy
+timeout (see ``config.settings``), concurrent writers already wait for the
+lock instead of failing mid-transaction, but threads of one process would
+still poll the lock in SQLite's busy handler. :func:`serialized_write` makes
+them queue on an in-process lock instead, and retries the rare
+``database is locked`` that outlasts the busy timeout (e.g. behind a long
+write from another process). On other databases it does nothing.
+"""
+
+from __future__ import annotations
+
+from functools import wraps
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+
+LOCKED_RETRIES = 3
+LOCKED_BACKOFF = 0.1
+
+_write_lock = threading.Lock()
+
+
+def _is_locked_error(exc: OperationalError) -> bool:
+    return "database is locked" in str(exc) or "database table is locked" in str(exc)
+
+
+def serialized_write(func):
+    """Run ``func`` (which should open its own transaction) as a queued SQLite write."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != "sqlite":
+            return func(*args, **kwargs)
+
+        for attempt in range(LOCKED_RETRIES + 1):
+            try:
+                with _write_lock:
+                    return func(*args, **kwargs)
+            except OperationalError as exc:
+                # Inside an outer transaction the work cannot be redone here.
+                if not _is_locked_error(exc) or attempt == LOCKED_RETRIES or connection.in_atomic_block:
+                    raise
+            time.sleep(LOCKED_BACKOFF * 2**attempt)
+
+    return wrapper
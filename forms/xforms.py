@@ -0,0 +1,104 @@
+"""Helpers for reading XForm definitions and submitted XForm instances."""
+
+from __future__ import annotations
+
+import hashlib
+import xml.etree.ElementTree as ET
+
+
+def local_name(tag: str) -> str:
+    """Strip any ``{namespace}`` prefix from an ElementTree tag."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def extract_instance_id(xml_submission: str | ET.Element) -> str | None:
+    """Return the OpenRosa ``meta/instanceID`` of a submission, if present.
+
+    Accepts the raw XML or an already parsed root element. Namespaces are
+    ignored so both ``<meta>`` and ``<orx:meta>`` are accepted. Returns None
+    for unparsable payloads or instances without an instanceID.
+    """
+    if isinstance(xml_submission, ET.Element):
+        root = xml_submission
+    else:
+        try:
+            root = ET.fromstring(xml_submission)
+        except ET.ParseError:
+            return None
+
+    for child in root:
+        if local_name(child.tag) != "meta":
+            continue
+        for meta_child in child:
+            if local_name(meta_child.tag) == "instanceID":
+                value = (meta_child.text or "").strip()
+                return value or None
+    return None
+
+
+REPEAT_VALUE_SEPARATOR = "; "
+
+
+def _leaf_paths(element: ET.Element, prefix: str = ""):
+    path = f"{prefix}/{local_name(element.tag)}"
+    children = list(element)
+    if not children:
+        yield path, element
+        return
+    for child in children:
+        yield from _leaf_paths(child, path)
+
+
+def primary_instance_root(xml_definition: str | ET.Element) -> ET.Element | None:
+    """Return the root element of an XForm's primary (first, unnamed) instance.
+
+    Accepts the raw definition or its parsed document element. Returns None
+    when the definition is not a parsable XForm with a model.
+    """
+    if isinstance(xml_definition, ET.Element):
+        document = xml_definition
+    else:
+        try:
+            document = ET.fromstring(xml_definition)
+        except ET.ParseError:
+            return None
+
+    for element in document.iter():
+        if local_name(element.tag) != "model":
+            continue
+        for instance in element:
+            if local_name(instance.tag) == "instance" and "id" not in instance.attrib:
+                roots = list(instance)
+                return roots[0] if roots else None
+    return None
+
+
+def definition_hash(xml_definition: str) -> str:
+    """MD5 hex digest of a definition, as used for OpenRosa form hashes and ETags."""
+    return hashlib.md5(xml_definition.encode("utf-8")).hexdigest()
+
+
+def xform_id(xml_definition: str) -> str | None:
+    """Return the ``id`` attribute of a definition's primary instance (the OpenRosa formID)."""
+    root = primary_instance_root(xml_definition)
+    return root.get("id") if root is not None else None
+
+
+def definition_field_paths(xml_definition: str) -> list[str]:
+    """List the leaf XPaths (``/data/group/question``) of a form's primary instance, in document order."""
+    root = primary_instance_root(xml_definition)
+    if root is None:
+        return []
+    return list(dict.fromkeys(path for path, _ in _leaf_paths(root)))
+
+
+def flatten_instance(root: ET.Element) -> dict[str, str]:
+    """Flatten a submitted instance into ``{xpath: value}`` for its leaf nodes.
+
+    Repeat indices are dropped, so a question answered in several repeat
+    instances maps to one path with the values joined by ``"; "``.
+    """
+    values: dict[str, list[str]] = {}
+    for path, element in _leaf_paths(root):
+        values.setdefault(path, []).append((element.text or "").strip())
+    return {path: REPEAT_VALUE_SEPARATOR.join(parts) for path, parts in values.items()}
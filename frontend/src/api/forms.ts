@@ -6,13 +6,25 @@ export interface FormSubmission {
   xml_submission: string
 }
 
+export interface SubmissionAttachment {
+  name: string
+  content_type: string
+  size: number
+  content_hash: string
+  created_at: string
+  download_url: string
+}
+
 export interface Form {
   id: number
   name: string
   description: string
   xls_form: string | null
+  xls_name?: string
   version: string
   xml_definition: string
+  submission_count?: number
+  last_submitted_at?: string | null
   created_at: string
   updated_at: string
   submissions?: FormSubmission[]
@@ -70,9 +82,23 @@ async function handleResponse<T>(response: Response): Promise<T> {
   }
 }
 
+// The list endpoint returns metadata only (no xml_definition) and is
+// cursor-paginated: follow X-Next-Cursor until the last page.
 export async function listForms(): Promise<Form[]> {
-  const response = await fetch(`${API_BASE}/`)
-  return handleResponse<Form[]>(response)
+  const forms: Form[] = []
+  let url = `${API_BASE}/`
+
+  for (;;) {
+    const response = await fetch(url)
+    const page = await handleResponse<Form[]>(response)
+    forms.push(...(page ?? []))
+
+    const nextCursor = response.headers?.get('X-Next-Cursor')
+    if (!nextCursor) {
+      return forms
+    }
+    url = `${API_BASE}/?cursor=${encodeURIComponent(nextCursor)}`
+  }
 }
 
 export async function createForm(payload: CreateFormPayload): Promise<Form> {
@@ -112,6 +138,14 @@ export async function submitForm(
   return handleResponse<FormSubmissionResponse>(response)
 }
 
+export async function listSubmissionAttachments(
+  formId: number,
+  submissionId: number,
+): Promise<SubmissionAttachment[]> {
+  const response = await fetch(`${API_BASE}/${formId}/submissions/${submissionId}/attachments/`)
+  return (await handleResponse<SubmissionAttachment[]>(response)) ?? []
+}
+
 export async function updateForm(
   formId: number,
   payload: UpdateFormPayload,
@@ -35,7 +35,8 @@ const mockForm: Form = {
   id: 1,
   name: 'Test Form',
   description: 'Test description',
-  xls_form: '/media/xlsforms/test.xlsx',
+  xls_form: '/media/xlsforms/3f/3f2a9c0e5b7d4a1c8e6f0b2d4a6c8e0f1a3b5c7d9e1f3a5b7c9d1e3f5a7b9c1d.xlsx',
+  xls_name: 'test.xlsx',
   version: '1.0',
   xml_definition: '<form></form>',
   created_at: '2025-10-01T10:00:00Z',
@@ -62,6 +63,7 @@ describe('FormEditView', () => {
     expect((wrapper.find('input[type="text"]').element as HTMLInputElement).value).toBe('Test Form')
     expect((wrapper.find('textarea').element as HTMLTextAreaElement).value).toBe('Test description')
     expect(wrapper.text()).toContain('test.xlsx')
+    expect(wrapper.text()).not.toContain('3f2a9c0e')
   })
 
   it('displays loading state initially', () => {